@@ -1,57 +1,180 @@
 import os
 import logging
+from collections.abc import Mapping
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.middleware.proxy_fix import ProxyFix
-from core.hunt_manager import HuntManager
-from core.apt_manager import APTManager
-from core.mitre_parser import MitreAttackParser 
-from core.sigma_loader import SigmaLoader
-from core.field_mapper import FieldMapper
-from core.splunk_query import SplunkQueryExecutor
-from core.ttp_mapper import TTPMapper
-from core.field_profiler import FieldProfiler
-from core.visualizer import Visualizer
-from core.ai_assistant import AIAssistant
 
 import config
-from core.mitre_parser import MitreAttackParser
-from core.sigma_loader import SigmaLoader
-from core.splunk_query import SplunkQueryExecutor
-from core.field_mapper import FieldMapper
-from core.ttp_mapper import TTPMapper
-from core.field_profiler import FieldProfiler
-from core.visualizer import Visualizer
-from core.ai_assistant import AIAssistant
+from core.service_registry import ServiceRegistry
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+class JSONProvider(DefaultJSONProvider):
+    """JSON provider that also serializes read-only mappings such as Sigma rule views"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Mapping):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+
 # Initialize the Flask app
 app = Flask(__name__)
+app.json = JSONProvider(app)
 app.secret_key = os.environ.get("SESSION_SECRET", "default-secret-key-for-development")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# Initialize core components
-mitre_parser = MitreAttackParser()
-sigma_loader = SigmaLoader()
-field_mapper = FieldMapper()
-splunk_query = SplunkQueryExecutor()
-ttp_mapper = TTPMapper(mitre_parser)
-hunt_manager = HuntManager()
-apt_manager = APTManager()
-field_profiler = FieldProfiler(sigma_loader, field_mapper, splunk_query)
-visualizer = Visualizer()
-ai_assistant = AIAssistant()
-
-# Try to connect to Splunk but don't block app startup
-try:
-    splunk_connected = splunk_query.connect()
-    if not splunk_connected:
-        logger.warning("Failed to connect to Splunk on startup - continuing in limited mode")
-except Exception as e:
-    logger.warning(f"Error connecting to Splunk on startup: {e} - continuing in limited mode")
-    splunk_connected = False
+# Core components are built on first use (or by the warm-up thread below), so importing
+# the app and serving requests that do not need them stays fast. Heavy modules are
+# imported inside the factories for the same reason.
+services = ServiceRegistry()
+
+def _shared_snapshot():
+    """Snapshot built by the gunicorn master (see gunicorn.conf.py), if workers should attach to it"""
+    if os.environ.get("SHARED_SNAPSHOT_ATTACH", "false").lower() != "true":
+        return None
+    from core.shared_snapshot import SharedSnapshot
+    return SharedSnapshot.open(config.SHARED_SNAPSHOT_FILE)
+
+def _mitre_parser():
+    from core.mitre_parser import MitreAttackParser
+    shared_snapshot = services.get('shared_snapshot')
+    if shared_snapshot is not None:
+        return MitreAttackParser.from_snapshot(shared_snapshot)
+    return MitreAttackParser()
+
+def _sigma_loader():
+    from core.sigma_loader import SigmaLoader
+    shared_snapshot = services.get('shared_snapshot')
+    if shared_snapshot is not None:
+        loader = SigmaLoader(rule_snapshot=shared_snapshot.rules)
+    else:
+        loader = SigmaLoader()
+    if config.SIGMA_WATCH_RULES:
+        loader.start_watching()
+    return loader
+
+def _field_mapper():
+    from core.field_mapper import FieldMapper
+    return FieldMapper()
+
+def _result_cache():
+    if not config.RESULT_CACHE_ENABLED:
+        return None
+    from core.result_cache import ResultCache
+    return ResultCache(disk_dir=config.RESULT_CACHE_DIR if config.RESULT_CACHE_DISK else None)
+
+def _query_rewriter():
+    if not config.QUERY_REWRITE_ENABLED:
+        return None
+    from core.query_rewriter import QueryRewriter
+    return QueryRewriter()
+
+def _search_governor():
+    if not config.SEARCH_GOVERNOR_ENABLED:
+        return None
+    from core.search_governor import SearchGovernor
+    return SearchGovernor()
+
+def _splunk_query():
+    result_cache = services.get('result_cache')
+    query_rewriter = services.get('query_rewriter')
+    governor = services.get('search_governor')
+    if config.SPLUNK_ASYNC_EXECUTOR:
+        from core.async_splunk_query import SyncSplunkQueryExecutor
+        return SyncSplunkQueryExecutor(result_cache=result_cache, query_rewriter=query_rewriter, governor=governor)
+    from core.splunk_query import SplunkQueryExecutor
+    return SplunkQueryExecutor(result_cache=result_cache, query_rewriter=query_rewriter, governor=governor)
+
+def _splunk_connection():
+    """Connect the shared executor to Splunk; a failed attempt leaves the app in limited mode"""
+    connected = services.get('splunk_query').connect()
+    if not connected:
+        logger.warning("Failed to connect to Splunk - continuing in limited mode")
+    return connected
+
+def _ttp_mapper():
+    from core.ttp_mapper import TTPMapper
+    shared_snapshot = services.get('shared_snapshot')
+    if shared_snapshot is not None:
+        return TTPMapper.from_snapshot(shared_snapshot, services.get('mitre_parser'))
+    return TTPMapper(services.get('mitre_parser'))
+
+def _hunt_manager():
+    from core.hunt_manager import HuntManager
+    return HuntManager()
+
+def _hunt_engine():
+    from core.hunt_engine import HuntEngine
+    return HuntEngine(services.get('splunk_query'), services.get('hunt_manager'))
+
+def _hunt_scheduler():
+    from core.hunt_scheduler import HuntScheduler
+    return HuntScheduler(services.get('hunt_manager'), services.get('hunt_engine'),
+                         services.get('sigma_loader'), services.get('mitre_parser'))
+
+def _result_store():
+    from core.result_store import ResultStore
+    return ResultStore()
+
+def _apt_manager():
+    from core.apt_manager import APTManager
+    return APTManager()
+
+def _field_profiler():
+    from core.field_profiler import FieldProfiler
+    return FieldProfiler(services.get('sigma_loader'), services.get('field_mapper'), services.get('splunk_query'))
+
+def _visualizer():
+    from core.visualizer import Visualizer
+    return Visualizer()
+
+def _ai_assistant():
+    from core.ai_assistant import AIAssistant
+    return AIAssistant()
+
+# Registration order is warm-up order: cheap and frequently used components first
+services.register('shared_snapshot', _shared_snapshot)
+services.register('field_mapper', _field_mapper)
+services.register('hunt_manager', _hunt_manager)
+services.register('result_cache', _result_cache)
+services.register('query_rewriter', _query_rewriter)
+services.register('search_governor', _search_governor)
+services.register('splunk_query', _splunk_query)
+services.register('splunk_connection', _splunk_connection)
+services.register('hunt_engine', _hunt_engine)
+services.register('result_store', _result_store)
+services.register('sigma_loader', _sigma_loader)
+services.register('mitre_parser', _mitre_parser)
+services.register('hunt_scheduler', _hunt_scheduler)
+services.register('apt_manager', _apt_manager)
+services.register('field_profiler', _field_profiler)
+services.register('ttp_mapper', _ttp_mapper)
+services.register('visualizer', _visualizer)
+services.register('ai_assistant', _ai_assistant)
+
+mitre_parser = services.proxy('mitre_parser')
+sigma_loader = services.proxy('sigma_loader')
+field_mapper = services.proxy('field_mapper')
+splunk_query = services.proxy('splunk_query')
+ttp_mapper = services.proxy('ttp_mapper')
+hunt_manager = services.proxy('hunt_manager')
+hunt_engine = services.proxy('hunt_engine')
+hunt_scheduler = services.proxy('hunt_scheduler')
+result_store = services.proxy('result_store')
+apt_manager = services.proxy('apt_manager')
+field_profiler = services.proxy('field_profiler')
+visualizer = services.proxy('visualizer')
+ai_assistant = services.proxy('ai_assistant')
+
+# Updated by routes.check_splunk_status once the background connection attempt finishes
+splunk_connected = False
+
+if config.SERVICE_WARM_UP:
+    services.warm_up()
 
 # Add a favicon route to prevent 404 errors
 @app.route('/favicon.ico')
@@ -59,6 +182,16 @@ def favicon():
     return send_from_directory(os.path.join(app.root_path, 'static'),
                                'favicon.ico', mimetype='image/vnd.microsoft.icon')
 
+@app.route('/api/ready')
+def readiness():
+    """Readiness probe: 200 once every component is initialized, 503 while warming up or degraded"""
+    ready = services.ready()
+    return jsonify({
+        'ready': ready,
+        'splunk_connected': services.is_ready('splunk_query') and splunk_query.connected,
+        'services': services.status()
+    }), 200 if ready else 503
+
 # Register routes
 from routes import *
 
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Load test hunts against the local Splunk stand-in (splunk_standin.py): several users
+start hunts at once, and the benchmark reports search throughput and the latency
+percentiles of searches and whole hunts.
+
+Every run uses the same synthetic events and rules (or a recorded dataset), the same
+job durations and the same request latency, so runs are comparable across changes to
+the executors, the hunt engine, fusion and caching.
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List
+
+import config
+from core.hunt_engine import HuntEngine
+from core.result_cache import ResultCache
+from splunk_standin import SplunkStandin, load_dataset, start_standin
+
+BENCHMARK_INDEX = "benchmark"
+PROCESSES = ["cmd.exe", "powershell.exe", "rundll32.exe", "regsvr32.exe", "mshta.exe", "wmic.exe",
+             "certutil.exe", "bitsadmin.exe", "schtasks.exe", "net.exe", "whoami.exe", "psexec.exe"]
+
+
+def synthetic_events(count: int, seed: int) -> List[Dict[str, Any]]:
+    """Windows process creation and logon events with a fixed seed"""
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        process = rng.choice(PROCESSES)
+        event = {
+            'index': BENCHMARK_INDEX,
+            'sourcetype': 'WinEventLog:Security',
+            'host': f"ws{rng.randrange(200):03d}",
+            'EventCode': rng.choice(['4688', '4688', '4688', '4624', '4625']),
+            'Image': f"C:\\Windows\\System32\\{process}",
+            'CommandLine': f"{process} /c task{rng.randrange(500)}",
+            'User': f"user{rng.randrange(50)}",
+        }
+        event['_raw'] = " ".join(f"{key}={value}" for key, value in event.items())
+        events.append(event)
+    return events
+
+
+def synthetic_rules(count: int) -> List[Dict[str, Any]]:
+    """Rule searches shaped like converted Sigma rules; every fifth one aggregates and runs alone"""
+    rules = []
+    for i in range(count):
+        process = PROCESSES[i % len(PROCESSES)]
+        query = (f'search index={BENCHMARK_INDEX} sourcetype="WinEventLog:Security" EventCode=4688 '
+                 f'Image="*\\\\{process}" CommandLine="*task{i % 500}*"')
+        if i % 5 == 4:
+            query += " | stats count by host"
+        rules.append({'query_id': f"rule-{i}", 'query': query,
+                      'logsource': {'product': 'windows', 'category': 'process_creation'}})
+    return rules
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+class TimedExecutor:
+    """Records how long each execute_query call of the wrapped executor takes"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.durations: List[float] = []
+        self._lock = threading.Lock()
+
+    def execute_query(self, query: str, **kwargs) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            return self.executor.execute_query(query, **kwargs)
+        finally:
+            with self._lock:
+                self.durations.append(time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self.executor, name)
+
+
+def build_executor(kind: str, port: int, use_cache: bool):
+    result_cache = ResultCache() if use_cache else None
+    if kind == "async":
+        from core.async_splunk_query import SyncSplunkQueryExecutor
+        executor = SyncSplunkQueryExecutor(result_cache=result_cache, host="127.0.0.1", port=port, scheme="http")
+        connected = executor.connect()
+    else:
+        from core.splunk_query import SplunkQueryExecutor
+        executor = SplunkQueryExecutor(result_cache=result_cache)
+        connected = executor.connect(host="127.0.0.1", port=port, scheme="http")
+    if not connected:
+        raise SystemExit(f"Could not connect to the stand-in on port {port}")
+    return executor
+
+
+def rule_matches(engine, rules: List[Dict[str, Any]], fuse: bool, max_count: int) -> Dict[str, set]:
+    """Run one hunt without the cache and collect the events each rule matched"""
+    matches: Dict[str, set] = {}
+    lock = threading.Lock()
+
+    def on_result(search, result):
+        with lock:
+            matches[search['query_id']] = {json.dumps(event, sort_keys=True) for event in result.get('results', [])}
+
+    engine.run_hunt(None, rules, user="fusion-check", on_result=on_result,
+                    fuse=fuse, use_cache=False, max_count=max_count).wait()
+    return matches
+
+
+def check_fusion(engine, rules: List[Dict[str, Any]], max_count: int) -> bool:
+    """Check that every rule matches the same events in a fused hunt as when run alone"""
+    fused = rule_matches(engine, rules, True, max_count)
+    unfused = rule_matches(engine, rules, False, max_count)
+    differing = [rule['query_id'] for rule in rules if fused.get(rule['query_id']) != unfused.get(rule['query_id'])]
+    if differing:
+        print(f"Fusion check:       {len(differing)} of {len(rules)} rules match different events when fused: "
+              + ", ".join(differing[:10]))
+    else:
+        print(f"Fusion check:       all {len(rules)} rules match the same events fused and unfused")
+    return not differing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hunt throughput and latency against the Splunk stand-in")
+    parser.add_argument("--dataset", action="append", help="NDJSON events to search instead of synthetic ones")
+    parser.add_argument("--query-file", help="File of rule queries, one per line, instead of synthetic rules")
+    parser.add_argument("--events", type=int, default=10000, help="Synthetic events")
+    parser.add_argument("--rules", type=int, default=100, help="Synthetic rules per hunt")
+    parser.add_argument("--users", type=int, default=4, help="Users starting hunts at once")
+    parser.add_argument("--hunts", type=int, default=2, help="Hunts per user")
+    parser.add_argument("--executor", choices=["sync", "async"], default="sync",
+                        help="splunklib executor or the asyncio REST executor")
+    parser.add_argument("--max-concurrent", type=int, default=config.HUNT_MAX_CONCURRENT_SEARCHES,
+                        help="Searches the hunt engine runs at once")
+    parser.add_argument("--latency", type=float, default=0.005, help="Stand-in latency per request in seconds")
+    parser.add_argument("--job-duration", type=float, default=0.3, help="Stand-in search job duration in seconds")
+    parser.add_argument("--scan-rate", type=float, default=0.0,
+                        help="Events the stand-in scans per second, lengthening jobs (0 disables)")
+    parser.add_argument("--max-running-jobs", type=int, default=0,
+                        help="Jobs the stand-in runs at once before queueing (0 for no limit)")
+    parser.add_argument("--no-fusion", action="store_true", help="Run every rule as its own search")
+    parser.add_argument("--no-cache", action="store_true", help="Run without the result cache")
+    parser.add_argument("--max-count", type=int, default=1000, help="Maximum results per rule search")
+    parser.add_argument("--check-fusion", action="store_true",
+                        help="Also check that fused and unfused hunts match the same events per rule")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the synthetic events")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    events = load_dataset(args.dataset) if args.dataset else synthetic_events(args.events, args.seed)
+    if args.query_file:
+        with open(args.query_file) as f:
+            rules = [{'query_id': f"rule-{i}", 'query': line.strip()} for i, line in enumerate(f) if line.strip()]
+    else:
+        rules = synthetic_rules(args.rules)
+
+    standin = SplunkStandin(events, latency=args.latency, job_duration=args.job_duration,
+                            scan_rate=args.scan_rate, max_running_jobs=args.max_running_jobs)
+    server = start_standin(standin)
+    port = server.server_address[1]
+
+    executor = TimedExecutor(build_executor(args.executor, port, not args.no_cache))
+    engine = HuntEngine(executor, max_concurrent=args.max_concurrent)
+
+    rule_results = []
+    results_lock = threading.Lock()
+
+    def on_result(search, result):
+        with results_lock:
+            rule_results.append(result.get('status'))
+
+    print(f"{len(events)} events, {len(rules)} rules x {args.hunts} hunts x {args.users} users, "
+          f"{args.executor} executor, fusion {'off' if args.no_fusion else 'on'}, "
+          f"cache {'off' if args.no_cache else 'on'}")
+
+    start = time.perf_counter()
+    executions = [engine.run_hunt(None, rules, user=f"user{user}", on_result=on_result,
+                                  fuse=not args.no_fusion, use_cache=not args.no_cache, max_count=args.max_count)
+                  for _ in range(args.hunts) for user in range(args.users)]
+    for execution in executions:
+        execution.wait()
+    elapsed = time.perf_counter() - start
+
+    searches = executor.durations
+    hunts = [execution.end_time - execution.start_time for execution in executions]
+    failed = sum(1 for status in rule_results if status != 'success')
+
+    print(f"\nWall time:          {elapsed:.2f}s")
+    print(f"Rule searches:      {len(rule_results)} ({failed} failed), {len(rule_results) / elapsed:.1f}/s")
+    print(f"Splunk searches:    {len(searches)}, {len(searches) / elapsed:.1f}/s")
+    print(f"Jobs dispatched:    {standin.requests['create']}")
+    print(f"Events scanned:     {standin.events_scanned}")
+    print(f"\n{'Latency':<10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for label, values in (("search", searches), ("hunt", hunts)):
+        print(f"{label:<10} " + " ".join(f"{percentile(values, pct) * 1000:>6.0f}ms" for pct in (50, 95, 99, 100)))
+    print("\nStand-in requests: " + ", ".join(f"{name} {count}" for name, count in sorted(standin.requests.items())))
+
+    fusion_ok = check_fusion(engine, rules, args.max_count) if args.check_fusion else True
+    engine.shutdown()
+    server.shutdown()
+    if not fusion_ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
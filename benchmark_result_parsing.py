@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Compare decoding Splunk search results from XML with splunklib's ResultsReader
+against decoding the same results from JSON (output_mode=json) in one call.
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+import warnings
+from xml.sax.saxutils import escape, quoteattr
+
+from splunklib.results import ResultsReader
+
+import config
+
+SAMPLE_RESULTS_FILE = os.path.join(config.RESULTS_DIR, "sample.json")
+
+
+def build_xml_payload(results) -> bytes:
+    """Encode results the way Splunk's results endpoint does with output_mode=xml"""
+    fields = []
+    for result in results:
+        for name in result:
+            if name not in fields:
+                fields.append(name)
+
+    parts = ["<?xml version='1.0' encoding='UTF-8'?>\n<results preview='0'>\n<meta>\n<fieldOrder>\n"]
+    parts.extend(f"<field>{escape(name)}</field>\n" for name in fields)
+    parts.append("</fieldOrder>\n</meta>\n")
+    for offset, result in enumerate(results):
+        parts.append(f"<result offset='{offset}'>\n")
+        for name, value in result.items():
+            values = value if isinstance(value, list) else [value]
+            if name == "_raw":
+                parts.append(f"<field k={quoteattr(name)}><v xml:space='preserve' trunc='0'>"
+                             f"{escape(str(value))}</v></field>\n")
+                continue
+            parts.append(f"<field k={quoteattr(name)}>")
+            parts.extend(f"<value><text>{escape(str(v))}</text></value>" for v in values)
+            parts.append("</field>\n")
+        parts.append("</result>\n")
+    parts.append("</results>\n")
+    return "".join(parts).encode("utf-8")
+
+
+def build_json_payload(results) -> bytes:
+    """Encode results the way Splunk's results endpoint does with output_mode=json"""
+    return json.dumps({"preview": False, "init_offset": 0, "messages": [],
+                       "fields": [{"name": name} for name in (results[0] if results else {})],
+                       "results": results}).encode("utf-8")
+
+
+def decode_xml(payload: bytes):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # ResultsReader is deprecated, which is the point
+        return [result for result in ResultsReader(io.BytesIO(payload)) if isinstance(result, dict)]
+
+
+def decode_json(payload: bytes):
+    return json.loads(payload)["results"]
+
+
+def time_decode(decode, payload: bytes, repeat: int) -> float:
+    """Best time of several runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(payload)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark XML and JSON decoding of Splunk search results")
+    parser.add_argument("--results", default=SAMPLE_RESULTS_FILE,
+                        help="Saved query result (JSON with a 'results' list) to build payloads from")
+    parser.add_argument("--xml", help="Recorded XML results payload to decode instead")
+    parser.add_argument("--json", help="Recorded JSON results payload to decode instead")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated result counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    if bool(args.xml) != bool(args.json):
+        parser.error("--xml and --json must be given together")
+
+    if args.xml:
+        with open(args.xml, "rb") as f:
+            xml_payload = f.read()
+        with open(args.json, "rb") as f:
+            json_payload = f.read()
+        payloads = [("recorded", xml_payload, json_payload)]
+    else:
+        with open(args.results) as f:
+            base = json.load(f)["results"]
+        payloads = []
+        for size in (int(size) for size in args.sizes.split(",")):
+            results = [dict(base[i % len(base)], _cd=f"0:{i}") for i in range(size)]
+            payloads.append((str(size), build_xml_payload(results), build_json_payload(results)))
+
+    print(f"{'Results':>9} {'XML size':>10} {'JSON size':>10} {'XML decode':>11} {'JSON decode':>12} "
+          f"{'XML res/s':>11} {'JSON res/s':>11} {'Speedup':>8}")
+    for label, xml_payload, json_payload in payloads:
+        xml_results = decode_xml(xml_payload)
+        json_results = decode_json(json_payload)
+        if [dict(r) for r in xml_results] != json_results:
+            print(f"Warning: XML and JSON payloads of {label} results decode differently")
+
+        xml_time = time_decode(decode_xml, xml_payload, args.repeat)
+        json_time = time_decode(decode_json, json_payload, args.repeat)
+        count = len(json_results)
+        print(f"{label:>9} {len(xml_payload) / 1024:>8.0f}KB {len(json_payload) / 1024:>8.0f}KB "
+              f"{xml_time * 1000:>9.1f}ms {json_time * 1000:>10.1f}ms "
+              f"{count / xml_time:>11.0f} {count / json_time:>11.0f} {xml_time / json_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Compare the memory used by Sigma rules held as plain YAML dicts with the
+compact RuleRecord representation used by SigmaLoader.
+"""
+
+import argparse
+import gc
+import logging
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+
+import config
+from core import rule_model
+from core.rule_cache import RuleCache
+from core.rule_model import RuleRecord
+from core.sigma_loader import SigmaLoader
+
+
+def measure(build):
+    """
+    Measure the memory retained by the object returned from build().
+
+    Args:
+        build: Callable building the structure to measure
+
+    Returns:
+        Tuple of (built object, retained bytes, seconds taken)
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Sigma rule memory usage")
+    parser.add_argument("--rules-dir", default=config.SIGMA_RULES_DIR, help="Directory containing Sigma rules")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_file = os.path.join(tmp_dir, "sigma_rules.cache")
+
+        # Build the rule cache, then reload it the way a freshly started worker does
+        loader = SigmaLoader(args.rules_dir, cache_file=cache_file, conversion_cache_file=None)
+        rule_cache = RuleCache(cache_file)
+        rule_cache.load()
+
+        files = {}  # file path -> [(rule ID, position)]
+        for rule_id, record in loader.rules.items():
+            files.setdefault(record.file_path, []).append((rule_id, record._position))
+        print(f"Rules: {len(loader.rules)} from {len(files)} files")
+        del loader
+
+        def iter_parsed():
+            # Fresh parsed rules, as yaml.load would return them
+            for file_path, positions in files.items():
+                blob = rule_cache.get_blob(file_path)
+                content = pickle.loads(blob)
+                rules = content['rules'] if content.get('type') == 'group' else [content]
+                for rule_id, position in positions:
+                    yield rule_id, file_path, rules[position], blob, position
+
+        def old_rules():
+            # What SigmaLoader.rules used to hold: the full YAML dict of every rule
+            rules = {}
+            for rule_id, file_path, rule, _, _ in iter_parsed():
+                rule['file_path'] = file_path
+                rules[rule_id] = rule
+            return rules
+
+        def compact_inline():
+            return {rule_id: RuleRecord(rule, file_path)
+                    for rule_id, file_path, rule, _, _ in iter_parsed()}
+
+        def compact_lazy():
+            return {rule_id: RuleRecord(rule, file_path, blob, position)
+                    for rule_id, file_path, rule, blob, position in iter_parsed()}
+
+        rows = []
+        for name, build in (("YAML dicts (old)", old_rules),
+                            ("Compact records, inline body", compact_inline),
+                            ("Compact records, lazy body", compact_lazy)):
+            rule_model._shared.clear()
+            rules, retained, elapsed = measure(build)
+            rows.append((name, retained, elapsed))
+            if name.startswith("Compact records, lazy"):
+                lazy_rules = rules
+            del rules
+
+        baseline = rows[0][1]
+        print(f"{'Representation':<32} {'Memory':>10} {'vs old':>8} {'Build':>8}")
+        for name, retained, elapsed in rows:
+            print(f"{name:<32} {retained / 1024 / 1024:>8.1f}MB {retained / baseline:>7.0%} {elapsed:>7.2f}s")
+        print("(lazy bodies live in the memory-mapped rule cache, shared by all worker processes)")
+
+        # Cost of reading a detection through a view, which loads the body from the cache blob
+        start = time.perf_counter()
+        for record in lazy_rules.values():
+            record.view().get('detection')
+        elapsed = time.perf_counter() - start
+        print(f"Lazy detection access: {elapsed / len(lazy_rules) * 1e6:.1f}us per rule")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Compare worker boot time and memory when every worker builds the Sigma rules,
+ATT&CK data and TF-IDF model itself against workers attaching to a shared snapshot.
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import config
+
+
+def read_memory() -> dict:
+    """Read this process's RSS and PSS in kB (Linux only)"""
+    memory = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('Rss', 'Pss'):
+                    memory[name.lower()] = int(value.split()[0])
+    except OSError:
+        pass
+    return memory
+
+
+def run_worker(mode: str, snapshot_file: str, mitre_file: str):
+    """Boot the components like app.py does, report, then wait so memory is measured while all workers live"""
+    from core.mitre_parser import MitreAttackParser
+    from core.shared_snapshot import SharedSnapshot
+    from core.sigma_loader import SigmaLoader
+    from core.ttp_mapper import TTPMapper
+
+    start = time.perf_counter()
+    if mode == 'attach':
+        shared_snapshot = SharedSnapshot(snapshot_file)
+        mitre_parser = MitreAttackParser.from_snapshot(shared_snapshot)
+        sigma_loader = SigmaLoader(conversion_cache_file=None, rule_snapshot=shared_snapshot.rules)
+        ttp_mapper = TTPMapper.from_snapshot(shared_snapshot, mitre_parser)
+    else:
+        mitre_parser = MitreAttackParser(local_file_path=mitre_file)
+        sigma_loader = SigmaLoader(conversion_cache_file=None)
+        ttp_mapper = TTPMapper(mitre_parser)
+    boot = time.perf_counter() - start
+
+    print(json.dumps({'boot': boot}), flush=True)
+    sys.stdin.readline()
+    print(json.dumps(read_memory()), flush=True)
+
+
+def run_mode(mode: str, workers: int, snapshot_file: str, mitre_file: str) -> dict:
+    """Start workers concurrently and collect their boot times and memory"""
+    command = [sys.executable, os.path.abspath(__file__), '--worker', mode,
+               '--snapshot', snapshot_file, '--mitre-file', mitre_file]
+    procs = [subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+
+    boots = [json.loads(proc.stdout.readline())['boot'] for proc in procs]
+    memory = []
+    for proc in procs:
+        proc.stdin.write("\n")
+        proc.stdin.flush()
+        memory.append(json.loads(proc.stdout.readline()))
+    for proc in procs:
+        proc.wait()
+
+    return {
+        'boot_avg': sum(boots) / len(boots),
+        'rss_total': sum(m.get('rss', 0) for m in memory),
+        'pss_total': sum(m.get('pss', 0) for m in memory),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worker boot with and without the shared snapshot")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent workers")
+    parser.add_argument("--mitre-file", default=config.MITRE_LOCAL_FILE, help="ATT&CK STIX bundle to load")
+    parser.add_argument("--worker", choices=['build', 'attach'], help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    if args.worker:
+        run_worker(args.worker, args.snapshot, args.mitre_file)
+        return
+
+    from core.mitre_parser import MitreAttackParser
+    from core.shared_snapshot import build_shared_snapshot
+    from core.sigma_loader import SigmaLoader
+    from core.ttp_mapper import TTPMapper
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_file = os.path.join(tmp_dir, "shared_snapshot.bin")
+        start = time.perf_counter()
+        mitre_parser = MitreAttackParser(local_file_path=args.mitre_file)
+        if not build_shared_snapshot(snapshot_file, mitre_parser, SigmaLoader(conversion_cache_file=None),
+                                     TTPMapper(mitre_parser)):
+            sys.exit("Could not build the shared snapshot")
+        print(f"Snapshot built in {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(snapshot_file) / 1024 / 1024:.1f}MB)")
+
+        print(f"{'Mode':<8} {'Workers':>7} {'Boot/worker':>12} {'Total RSS':>10} {'Total PSS':>10}")
+        for workers in sorted({1, args.workers}):
+            for mode in ('build', 'attach'):
+                result = run_mode(mode, workers, snapshot_file, args.mitre_file)
+                print(f"{mode:<8} {workers:>7} {result['boot_avg']:>11.2f}s "
+                      f"{result['rss_total'] / 1024:>8.0f}MB {result['pss_total'] / 1024:>8.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
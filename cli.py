@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 import argparse
+import getpass
 import json
 import logging
 import os
 import sys
+import threading
 from typing import Dict, List, Optional, Any
 
 # Add parent directory to PATH for imports
@@ -13,6 +15,7 @@ from core.mitre_parser import MitreAttackParser
 from core.sigma_loader import SigmaLoader
 from core.splunk_query import SplunkQueryExecutor
 from core.field_mapper import FieldMapper
+from core.hunt_engine import HuntEngine
 import config
 
 logger = logging.getLogger("cli")
@@ -61,7 +64,8 @@ class SecurityHunterCLI:
         # Sigma - List rules
         list_parser = sigma_subparsers.add_parser("list", help="List Sigma rules")
         list_parser.add_argument("--technique", "-t", help="Filter by technique ID")
-        list_parser.add_argument("--search", "-s", help="Search in rule title and description")
+        list_parser.add_argument("--search", "-s", 
+                                 help="Search rules (supports scoped terms like field:CommandLine or logsource:windows)")
         
         # Sigma - Show rule
         show_parser = sigma_subparsers.add_parser("show", help="Show a Sigma rule")
@@ -71,6 +75,10 @@ class SecurityHunterCLI:
         convert_parser = sigma_subparsers.add_parser("convert", help="Convert a Sigma rule to Splunk SPL")
         convert_parser.add_argument("rule_id", help="Rule ID")
         
+        # Sigma - Precompile all rules to Splunk queries
+        precompile_parser = sigma_subparsers.add_parser("precompile", 
+                                                        help="Convert all Sigma rules and store them in the SPL cache")
+        
         # Splunk commands
         splunk_parser = subparsers.add_parser("splunk", help="Work with Splunk")
         splunk_subparsers = splunk_parser.add_subparsers(dest="splunk_command", help="Splunk command")
@@ -163,6 +171,8 @@ class SecurityHunterCLI:
                 self._show_sigma_rule(args.rule_id)
             elif args.sigma_command == "convert":
                 self._convert_sigma_rule(args.rule_id)
+            elif args.sigma_command == "precompile":
+                self._precompile_sigma_rules()
         
         # Handle Splunk commands
         elif args.command == "splunk":
@@ -369,6 +379,17 @@ class SecurityHunterCLI:
         print("-" * 80)
         print(splunk_query)
     
+    def _precompile_sigma_rules(self):
+        """Convert all Sigma rules to Splunk SPL and store them in the SPL cache"""
+        print(f"Precompiling {len(self.sigma_loader.get_all_rules())} Sigma rules...")
+        
+        stats = self.sigma_loader.precompile_rules()
+        
+        print(f"\nRules: {stats['total']}")
+        print(f"Already cached: {stats['cached']}")
+        print(f"Converted: {stats['converted']}")
+        print(f"Failed: {stats['failed']}")
+    
     def _test_splunk_connection(self):
         """Test the connection to Splunk"""
         print(f"Testing connection to Splunk at {config.SPLUNK_HOST}:{config.SPLUNK_PORT}...")
@@ -592,50 +613,64 @@ class SecurityHunterCLI:
         
         print(f"Found {len(sigma_rules)} Sigma rules for this technique")
         
-        # Execute each rule
-        results = []
+        # Convert all rules for the technique in one batch
+        queries = self.sigma_loader.convert_technique_to_splunk(technique_id)['queries']
         
+        searches = []
         for rule in sigma_rules:
             rule_id = rule.get('id')
-            
-            print(f"\nExecuting rule: {rule.get('title')} ({rule_id})")
-            
-            # Convert to Splunk query
-            splunk_query = self.sigma_loader.convert_rule_to_splunk(rule_id)
+            splunk_query = queries.get(rule_id)
             
             if not splunk_query:
                 print(f"Failed to convert rule {rule_id} to Splunk query")
                 continue
             
-            print(f"Splunk query: {splunk_query}")
-            
-            # Execute query
-            result = self.splunk_query.execute_query(
-                query=splunk_query,
-                earliest_time=earliest,
-                latest_time=latest,
-                max_count=count
-            )
-            
-            if result["status"] == "error":
-                print(f"Error: {result['error']}")
-                continue
-            elif result["status"] == "timeout":
-                print(f"Timeout: {result['error']}")
-                continue
-            
-            print(f"Results: {result['result_count']} (out of {result.get('total_result_count', 'unknown')})")
-            
-            # Store results for summary
-            results.append({
-                "rule_id": rule_id,
-                "rule_title": rule.get('title'),
-                "query": splunk_query,
-                "result_count": result["result_count"],
-                "total_result_count": result.get("total_result_count", 0),
-                "status": result["status"],
-                "execution_time": result["execution_time"]
-            })
+            searches.append({"query_id": rule_id, "rule_title": rule.get('title'), "query": splunk_query,
+                             "logsource": rule.get('logsource')})
+        
+        # Execute the rules concurrently, printing each result as it arrives
+        results = []
+        failed = []
+        print_lock = threading.Lock()
+        
+        def on_result(search: Dict[str, Any], result: Dict[str, Any]):
+            with print_lock:
+                print(f"\nRule: {search['rule_title']} ({search['query_id']})")
+                print(f"Splunk query: {search['query']}")
+                
+                # error, timeout, busy (search governor) or unavailable (Splunk unreachable)
+                if result.get("status") != "success":
+                    print(f"{str(result.get('status')).capitalize()}: {result.get('error')}")
+                    failed.append(search['query_id'])
+                    return
+                
+                print(f"Results: {result['result_count']} (out of {result.get('total_result_count', 'unknown')})")
+                
+                # Store results for summary
+                results.append({
+                    "rule_id": search['query_id'],
+                    "rule_title": search['rule_title'],
+                    "query": search['query'],
+                    "result_count": result["result_count"],
+                    "total_result_count": result.get("total_result_count", 0),
+                    "status": result["status"],
+                    "execution_time": result.get("execution_time")
+                })
+        
+        hunt_engine = HuntEngine(self.splunk_query)
+        execution = hunt_engine.run_hunt(
+            None, searches,
+            user=getpass.getuser(),
+            on_result=on_result,
+            earliest_time=earliest,
+            latest_time=latest,
+            max_count=count
+        )
+        execution.wait()
+        hunt_engine.shutdown()
+        
+        if execution.fusion and execution.fusion['searches_saved']:
+            print(f"\nFused {execution.fusion['rules']} rules into {execution.fusion['searches']} Splunk searches")
         
         # Print summary
         print("\nHunt Summary:")
@@ -644,6 +679,8 @@ class SecurityHunterCLI:
         print(f"Technique: {technique['name']} ({technique_id})")
         print(f"Time range: {earliest} to {latest}")
         print(f"Rules executed: {len(results)}")
+        if failed:
+            print(f"Rules failed: {len(failed)}")
         
         total_findings = sum(r["result_count"] for r in results)
         print(f"Total findings: {total_findings}")
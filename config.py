@@ -1,4 +1,5 @@
 import os
+import json
 import logging
 
 # Logging configuration
@@ -15,6 +16,41 @@ SPLUNK_OWNER = os.environ.get("SPLUNK_OWNER", "nobody")
 SPLUNK_SCHEME = os.environ.get("SPLUNK_SCHEME", "http")  # Using http for development
 SPLUNK_INDEX = os.environ.get("SPLUNK_INDEX", "botsv2")
 SPLUNK_VERIFY_SSL = False  # Disable SSL verification for development
+SPLUNK_ASYNC_EXECUTOR = os.environ.get("SPLUNK_ASYNC_EXECUTOR", "false").lower() == "true"  # Run searches on one asyncio loop over the REST API
+SPLUNK_POLL_INITIAL = float(os.environ.get("SPLUNK_POLL_INITIAL", 0.05))  # First delay between search job status checks
+SPLUNK_POLL_MAX = float(os.environ.get("SPLUNK_POLL_MAX", 5.0))  # Longest delay between search job status checks
+SPLUNK_RESULT_PAGE_SIZE = int(os.environ.get("SPLUNK_RESULT_PAGE_SIZE", 5000))  # Results fetched per request from a finished job
+SPLUNK_MAX_CONNECTIONS = int(os.environ.get("SPLUNK_MAX_CONNECTIONS", 100))  # HTTP connection pool size of the asyncio executor
+SPLUNK_JOB_REUSE_TTL = float(os.environ.get("SPLUNK_JOB_REUSE_TTL", 120))  # Seconds identical searches reattach to a finished job (Splunk keeps them 600s)
+SPLUNK_REQUEST_TIMEOUT = float(os.environ.get("SPLUNK_REQUEST_TIMEOUT", 30))  # Socket timeout of each REST request, in seconds
+SPLUNK_POOL_SIZE = int(os.environ.get("SPLUNK_POOL_SIZE", 10))  # Authenticated sessions searches check out, each with one kept-alive connection
+SPLUNK_POOL_ACQUIRE_TIMEOUT = float(os.environ.get("SPLUNK_POOL_ACQUIRE_TIMEOUT", 60))  # Seconds a search waits for a free session
+SPLUNK_HEALTH_CHECK_INTERVAL = float(os.environ.get("SPLUNK_HEALTH_CHECK_INTERVAL", 60))  # Idle seconds after which a session is checked before reuse
+SPLUNK_BREAKER_FAILURES = int(os.environ.get("SPLUNK_BREAKER_FAILURES", 3))  # Consecutive connection failures after which searches fail fast until Splunk answers again (0 disables)
+SPLUNK_BREAKER_PROBE_INTERVAL = float(os.environ.get("SPLUNK_BREAKER_PROBE_INTERVAL", 5))  # Seconds before the first reconnection attempt while Splunk is unreachable
+SPLUNK_BREAKER_MAX_PROBE_INTERVAL = float(os.environ.get("SPLUNK_BREAKER_MAX_PROBE_INTERVAL", 60))  # Longest delay between reconnection attempts
+SEARCH_GOVERNOR_ENABLED = os.environ.get("SEARCH_GOVERNOR_ENABLED", "true").lower() == "true"  # Queue searches by priority instead of exceeding Splunk's search quota
+SPLUNK_MAX_CONCURRENT_SEARCHES = int(os.environ.get("SPLUNK_MAX_CONCURRENT_SEARCHES", 8))  # Searches run on Splunk at once (keep below the role's srchJobsQuota and SPLUNK_POOL_SIZE)
+SPLUNK_INTERACTIVE_RESERVED = int(os.environ.get("SPLUNK_INTERACTIVE_RESERVED", 2))  # Search slots only interactive searches may use
+SPLUNK_SEARCH_QUEUE_TIMEOUT = float(os.environ.get("SPLUNK_SEARCH_QUEUE_TIMEOUT", 300))  # Seconds a search waits for a slot before it is rejected
+SPLUNK_SEARCH_QUEUE_LIMITS = json.loads(os.environ.get("SPLUNK_SEARCH_QUEUE_LIMITS", '{"interactive": 50, "hunt": 1000, "profiling": 200, "background": 200}'))  # Searches each priority class may queue before new ones are turned away
+
+# tstats rewriting of stats-by-field queries (field profiling, field value lookups)
+QUERY_REWRITE_ENABLED = os.environ.get("QUERY_REWRITE_ENABLED", "true").lower() == "true"  # Answer count-by-field queries from indexed data
+QUERY_REWRITE_VERIFY = os.environ.get("QUERY_REWRITE_VERIFY", "false").lower() == "true"  # Also run each rewritten query once as the raw search, comparing counts per group and measuring the speedup (the rewrite report has none without it)
+TSTATS_INDEXED_FIELDS = [field.strip() for field in os.environ.get(
+    "TSTATS_INDEXED_FIELDS", "index,sourcetype,source,host").split(",") if field.strip()]  # Fields indexed at ingest time
+TSTATS_DATAMODEL_FIELDS = json.loads(os.environ.get("TSTATS_DATAMODEL_FIELDS", "{}"))  # Raw field -> accelerated data model field, e.g. {"process_name": "Endpoint.Processes.process_name"}
+
+# Hunt execution configuration (Splunk's default quotas allow 3 concurrent searches per user role)
+HUNT_MAX_CONCURRENT_SEARCHES = int(os.environ.get("HUNT_MAX_CONCURRENT_SEARCHES", 6))  # Searches running at once on this instance
+HUNT_MAX_SEARCHES_PER_USER = int(os.environ.get("HUNT_MAX_SEARCHES_PER_USER", 3))  # Searches running at once for one user
+HUNT_MAX_PAUSE = float(os.environ.get("HUNT_MAX_PAUSE", 3600))  # Seconds hunts wait for an unreachable Splunk before their remaining searches fail
+INCREMENTAL_HUNT_OVERLAP = int(os.environ.get("INCREMENTAL_HUNT_OVERLAP", 300))  # Seconds before the last run's end an incremental hunt searches again, for late-indexed events
+INCREMENTAL_HUNT_MAX_MATCHES = int(os.environ.get("INCREMENTAL_HUNT_MAX_MATCHES", 10000))  # Matches of a rule kept across the runs of an incremental hunt (newest first)
+HUNT_SCHEDULER_USER = os.environ.get("HUNT_SCHEDULER_USER", "scheduler")  # User scheduled hunts count against in the hunt engine
+HUNT_SEARCH_FUSION = os.environ.get("HUNT_SEARCH_FUSION", "true").lower() == "true"  # Combine rules over the same data into one search
+HUNT_FUSION_MAX_RULES = int(os.environ.get("HUNT_FUSION_MAX_RULES", 25))  # Rules combined into one fused search
 
 # MITRE ATT&CK configuration
 MITRE_ENTERPRISE_URL = "https://raw.githubusercontent.com/mitre/cti/master/enterprise-attack/enterprise-attack.json"
@@ -23,6 +59,32 @@ MITRE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mitre")
 
 # Sigma configuration
 SIGMA_RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sigma_rules")
+SIGMA_LOAD_WORKERS = int(os.environ.get("SIGMA_LOAD_WORKERS", os.cpu_count() or 1))  # Processes used to parse rules on a cold cache
+SIGMA_CONVERT_WORKERS = int(os.environ.get("SIGMA_CONVERT_WORKERS", 1))  # Processes used for batch SPL conversion
+SIGMA_WATCH_RULES = os.environ.get("SIGMA_WATCH_RULES", "true").lower() == "true"  # Reload rule files as they change
+SIGMA_WATCH_INTERVAL = float(os.environ.get("SIGMA_WATCH_INTERVAL", 2.0))  # Seconds between scans without inotify
+SIGMA_WATCH_DEBOUNCE = float(os.environ.get("SIGMA_WATCH_DEBOUNCE", 0.5))  # Quiet period before applying a batch of edits
+
+# Cache configuration
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cache")
+SIGMA_RULE_CACHE_FILE = os.environ.get("SIGMA_RULE_CACHE_FILE", os.path.join(CACHE_DIR, "sigma_rules.cache"))
+SPL_CACHE_FILE = os.environ.get("SPL_CACHE_FILE", os.path.join(CACHE_DIR, "spl_conversions.json"))
+RESULTS_DIR = os.environ.get("RESULTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "results"))
+SHARED_SNAPSHOT_FILE = os.environ.get("SHARED_SNAPSHOT_FILE", os.path.join(CACHE_DIR, "shared_snapshot.bin"))
+
+# Search result cache configuration
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "true").lower() == "true"  # Reuse results of identical searches
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", 256))  # Result sets kept in memory
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))  # Approximate memory used by cached result sets
+RESULT_CACHE_RELATIVE_TTL = float(os.environ.get("RESULT_CACHE_RELATIVE_TTL", 300))  # Seconds to reuse searches over relative windows (-24h to now)
+RESULT_CACHE_ABSOLUTE_TTL = float(os.environ.get("RESULT_CACHE_ABSOLUTE_TTL", 86400))  # Seconds to reuse searches over absolute windows in the past
+RESULT_CACHE_SETTLE_TIME = float(os.environ.get("RESULT_CACHE_SETTLE_TIME", 900))  # Absolute windows ending this recently may still receive events
+RESULT_CACHE_DISK = os.environ.get("RESULT_CACHE_DISK", "false").lower() == "true"  # Keep cached result sets on disk as well
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", os.path.join(CACHE_DIR, "results"))
+RESULT_CACHE_DISK_MAX_BYTES = int(os.environ.get("RESULT_CACHE_DISK_MAX_BYTES", 1024 * 1024 * 1024))  # Disk used by the on-disk tier
+
+# Startup configuration
+SERVICE_WARM_UP = os.environ.get("SERVICE_WARM_UP", "true").lower() == "true"  # Initialize components in the background after startup
 
 # Field mapping configuration
 FIELD_MAPPING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mappings", "fieldmap.json")
@@ -30,6 +92,7 @@ FIELD_MAPPING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "m
 # Ensure directories exist
 os.makedirs(MITRE_DIR, exist_ok=True)
 os.makedirs(SIGMA_RULES_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
 os.makedirs(os.path.dirname(FIELD_MAPPING_FILE), exist_ok=True)
 
 # Default field mappings if file doesn't exist
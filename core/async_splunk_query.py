@@ -0,0 +1,677 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+
+import config
+from core.result_cache import search_fingerprint
+from core.search_governor import PRIORITY_INTERACTIVE
+from core.splunk_query import AdaptivePoller, RecentJobs, SplunkQueryExecutor, choose_exec_mode, summarize_results
+
+logger = logging.getLogger(__name__)
+
+
+class SplunkRequestError(Exception):
+    """Raised when the Splunk REST API rejects a request"""
+
+
+class SplunkLoginError(SplunkRequestError):
+    """Raised when Splunk rejects the login"""
+
+
+def _is_unreachable(error: Exception) -> bool:
+    """
+    Check whether a search failed because Splunk could not be reached, rather than on the search itself.
+
+    Only failures to connect or log in count; a read timeout of a slow search does not.
+    """
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, SplunkLoginError))
+
+
+class AsyncSplunkQueryExecutor:
+    """
+    Execute queries against the Splunk REST API with asyncio.
+
+    All searches share one HTTP connection pool, so a single event loop can drive
+    many concurrent searches without a thread per search. Results have the same
+    shape as SplunkQueryExecutor.execute_query.
+    """
+
+    def __init__(self, host: str = config.SPLUNK_HOST,
+                 port: int = config.SPLUNK_PORT,
+                 username: str = config.SPLUNK_USERNAME,
+                 password: str = config.SPLUNK_PASSWORD,
+                 scheme: str = config.SPLUNK_SCHEME,
+                 app: str = config.SPLUNK_APP,
+                 owner: str = config.SPLUNK_OWNER,
+                 verify_ssl: bool = getattr(config, 'SPLUNK_VERIFY_SSL', True),
+                 max_connections: int = config.SPLUNK_MAX_CONNECTIONS,
+                 request_timeout: float = config.SPLUNK_REQUEST_TIMEOUT,
+                 poll_initial: float = config.SPLUNK_POLL_INITIAL,
+                 poll_max: float = config.SPLUNK_POLL_MAX):
+        """
+        Initialize the executor.
+
+        Args:
+            host: Splunk host
+            port: Splunk management port
+            username: Splunk username
+            password: Splunk password
+            scheme: Connection scheme (http/https)
+            app: Splunk app context
+            owner: Splunk owner context
+            verify_ssl: Whether to verify SSL certificates
+            max_connections: Size of the shared HTTP connection pool
+            request_timeout: Timeout of each HTTP request in seconds
+            poll_initial: First delay between job status checks in seconds
+            poll_max: Longest delay between job status checks in seconds
+        """
+        self.base_url = f"{scheme}://{host}:{port}"
+        self.username = username
+        self.password = password
+        self.verify_ssl = verify_ssl
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.jobs_path = f"/servicesNS/{owner}/{app}/search/jobs"
+        self.recent_jobs = RecentJobs()
+
+        self.client: Optional[httpx.AsyncClient] = None
+        self.session_key = None
+        self.connected = False
+        self._login_lock = None
+
+    async def connect(self) -> bool:
+        """
+        Log in to Splunk and open the connection pool.
+
+        Returns:
+            True if connection successful, False otherwise
+        """
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                verify=self.verify_ssl,
+                timeout=self.request_timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+            self._login_lock = asyncio.Lock()
+
+        try:
+            logger.info(f"Attempting to connect to Splunk REST API at {self.base_url}...")
+            await self._login()
+            self.connected = True
+            logger.info(f"Successfully connected to Splunk at {self.base_url}")
+            return True
+        except httpx.TimeoutException:
+            logger.error(f"Connection to Splunk timed out after {self.request_timeout} seconds")
+        except httpx.ConnectError as e:
+            logger.error(f"Cannot connect to Splunk at {self.base_url}: {str(e)}")
+        except Exception as e:
+            logger.error(f"Failed to connect to Splunk: {str(e)}")
+        self.connected = False
+        return False
+
+    async def close(self):
+        """Close the connection pool"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+        self.connected = False
+
+    async def _login(self):
+        """Get a session key for the configured user"""
+        response = await self.client.post("/services/auth/login", data={
+            'username': self.username,
+            'password': self.password,
+            'output_mode': 'json'
+        })
+        if response.status_code != 200:
+            raise SplunkLoginError(f"Login failed with HTTP {response.status_code}")
+        self.session_key = response.json()['sessionKey']
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Send an authenticated request, logging in again once if the session expired.
+
+        Raises:
+            SplunkRequestError: If Splunk answers with an error status
+        """
+        for attempt in range(2):
+            session_key = self.session_key
+            response = await self.client.request(
+                method, path, headers={'Authorization': f"Splunk {session_key}"}, **kwargs)
+            if response.status_code == 401 and attempt == 0:
+                async with self._login_lock:
+                    # Another search may have logged in again meanwhile
+                    if self.session_key == session_key:
+                        await self._login()
+                continue
+            if response.status_code >= 400:
+                raise SplunkRequestError(_error_message(response))
+            return response
+        raise SplunkRequestError("Splunk rejected the session after logging in again")
+
+    async def execute_query(self, query: str, earliest_time: Optional[str] = "-24h",
+                            latest_time: Optional[str] = "now",
+                            exec_mode: str = "auto",
+                            index: str = config.SPLUNK_INDEX,
+                            max_count: int = 1000,
+                            timeout: int = 300,
+                            reuse_job: bool = True) -> Dict[str, Any]:
+        """
+        Execute a Splunk search query.
+
+        Args:
+            query: Splunk SPL query string
+            earliest_time: Search time range start
+            latest_time: Search time range end
+            exec_mode: Execution mode (auto/normal/blocking/oneshot); auto runs bounded
+                searches as oneshot and everything else as normal jobs
+            index: Splunk index to search
+            max_count: Maximum number of results to return
+            timeout: Query timeout in seconds
+            reuse_job: Reattach to the running or recently finished job of an identical
+                search instead of dispatching a new one
+
+        Returns:
+            Dictionary with query results and metadata, including a "timing" breakdown
+            of dispatch, wait, fetch and summary time. Errors connecting to Splunk, as
+            opposed to errors of the search, are marked "unreachable".
+        """
+        if not self.connected or self.client is None:
+            success = await self.connect()
+            if not success:
+                return {
+                    "status": "error",
+                    "error": "Not connected to Splunk",
+                    "query": query,
+                    "results": [],
+                    "unreachable": True
+                }
+
+        # Ensure query begins with 'search', unless it starts with a generating command such as | tstats
+        if not query.strip().lower().startswith(('search ', '|')):
+            query = f"search {query}"
+
+        if exec_mode == "auto":
+            exec_mode = choose_exec_mode(query, max_count)
+
+        logger.info(f"Executing Splunk query ({exec_mode}): {query}")
+        start_time = time.time()
+        timing = {"exec_mode": exec_mode, "dispatch": 0.0, "wait": 0.0, "fetch": 0.0, "summary": 0.0, "polls": 0}
+
+        try:
+            job_params = {'search': query, 'exec_mode': exec_mode, 'output_mode': 'json'}
+            if earliest_time is not None:
+                job_params['earliest_time'] = earliest_time
+            if latest_time is not None:
+                job_params['latest_time'] = latest_time
+
+            if exec_mode == "oneshot":
+                return await self._execute_oneshot(query, job_params, max_count, timeout, start_time, timing)
+
+            fingerprint = search_fingerprint(query, earliest_time, latest_time)
+            sid = await self._reattach_job(fingerprint) if reuse_job and fingerprint else None
+            reused = sid is not None
+            if sid is None:
+                try:
+                    # A blocking create only returns once the search is done
+                    response = await self._request('POST', self.jobs_path, data=job_params,
+                                                   **self._search_timeout(exec_mode, timeout))
+                except httpx.ReadTimeout:
+                    if exec_mode != "blocking":
+                        raise
+                    return {
+                        "status": "timeout",
+                        "error": f"Query timed out after {timeout} seconds",
+                        "query": query,
+                        "results": [],
+                        "timing": timing
+                    }
+                sid = response.json()['sid']
+                if fingerprint:
+                    self.recent_jobs.add(fingerprint, sid)
+            timing["dispatch"] = time.time() - start_time
+            timing["sid"] = sid
+            timing["reused_job"] = reused
+
+            # Wait for the job to complete or timeout, see AdaptivePoller
+            poller = AdaptivePoller(self.poll_initial, self.poll_max)
+            while True:
+                timing["polls"] += 1
+                job = await self._get_job(sid)
+                elapsed = time.time() - start_time
+                if _is_done(job) or elapsed >= timeout:
+                    break
+                delay = poller.next_delay(elapsed, float(job.get('doneProgress') or 0))
+                await asyncio.sleep(min(delay, timeout - elapsed))
+            timing["wait"] = time.time() - start_time - timing["dispatch"]
+
+            if fingerprint:
+                if _is_done(job) and not job.get('isFailed'):
+                    self.recent_jobs.finished(fingerprint, sid)
+                else:
+                    self.recent_jobs.discard(fingerprint, sid)
+
+            if not _is_done(job):
+                # A reattached job belongs to the search that dispatched it, which may still be waiting
+                if not reused:
+                    await self._cancel_job(sid)
+                return {
+                    "status": "timeout",
+                    "error": f"Query timed out after {timeout} seconds",
+                    "query": query,
+                    "results": [],
+                    "timing": timing
+                }
+
+            if job.get('isFailed'):
+                messages = [m.get('text', '') for m in job.get('messages', []) if isinstance(m, dict)]
+                raise SplunkRequestError('; '.join(messages) or "Search job failed")
+
+            total_result_count = int(job.get('resultCount', 0))
+            if total_result_count == 0:
+                return {
+                    "status": "success",
+                    "message": "Query completed successfully but returned no results",
+                    "query": query,
+                    "results": [],
+                    "result_count": 0,
+                    "execution_time": time.time() - start_time,
+                    "timing": timing
+                }
+
+            if total_result_count > max_count:
+                logger.warning(f"Query returned {total_result_count} results, limiting to {max_count}")
+
+            fetch_start = time.time()
+            query_results = [result async for result in
+                             self.stream_job_results(sid, max_count=min(total_result_count, max_count))]
+            timing["fetch"] = time.time() - fetch_start
+
+            summary_start = time.time()
+            field_summary = await self._get_field_summary(sid) if query_results else {}
+            timing["summary"] = time.time() - summary_start
+            _log_timing(timing, time.time() - start_time)
+
+            return {
+                "status": "success",
+                "message": "Query completed successfully",
+                "query": query,
+                "results": query_results,
+                "result_count": len(query_results),
+                "total_result_count": total_result_count,
+                "execution_time": time.time() - start_time,
+                "scan_count": int(job.get('scanCount', 0)),
+                "event_count": int(job.get('eventCount', 0)),
+                "field_summary": field_summary,
+                "timing": timing
+            }
+
+        except Exception as e:
+            logger.error(f"Error executing Splunk query: {str(e)}")
+            return {
+                "status": "error",
+                "error": str(e),
+                "query": query,
+                "results": [],
+                "timing": timing,
+                "unreachable": _is_unreachable(e)
+            }
+
+    def _search_timeout(self, exec_mode: str, timeout: float) -> Dict[str, Any]:
+        """Request arguments giving a request that stays open while its search runs the search's timeout"""
+        if exec_mode not in ("oneshot", "blocking") or self.request_timeout is None:
+            return {}
+        return {'timeout': httpx.Timeout(self.request_timeout, read=max(timeout, self.request_timeout))}
+
+    async def _execute_oneshot(self, query: str, job_params: Dict[str, Any], max_count: int, timeout: float,
+                               start_time: float, timing: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a bounded search as a oneshot, getting its results in the same round trip"""
+        try:
+            response = await self._request('POST', self.jobs_path, data={**job_params, 'count': max_count},
+                                           **self._search_timeout("oneshot", timeout))
+        except httpx.ReadTimeout:
+            return {
+                "status": "timeout",
+                "error": f"Query timed out after {timeout} seconds",
+                "query": query,
+                "results": [],
+                "timing": timing
+            }
+        timing["wait"] = time.time() - start_time
+
+        fetch_start = time.time()
+        query_results = response.json().get('results', [])[:max_count]
+        timing["fetch"] = time.time() - fetch_start
+
+        # A oneshot leaves no job to ask for a summary, so summarize the results themselves
+        summary_start = time.time()
+        field_summary = summarize_results(query_results)
+        timing["summary"] = time.time() - summary_start
+        _log_timing(timing, time.time() - start_time)
+
+        if not query_results:
+            return {
+                "status": "success",
+                "message": "Query completed successfully but returned no results",
+                "query": query,
+                "results": [],
+                "result_count": 0,
+                "execution_time": time.time() - start_time,
+                "timing": timing
+            }
+
+        return {
+            "status": "success",
+            "message": "Query completed successfully",
+            "query": query,
+            "results": query_results,
+            "result_count": len(query_results),
+            "total_result_count": len(query_results),
+            "execution_time": time.time() - start_time,
+            "scan_count": 0,
+            "event_count": len(query_results),
+            "field_summary": field_summary,
+            "timing": timing
+        }
+
+    async def execute_queries(self, queries: List[str], max_concurrent: int = config.SPLUNK_MAX_CONNECTIONS,
+                              **kwargs) -> List[Dict[str, Any]]:
+        """
+        Execute many queries concurrently on the shared connection pool.
+
+        Args:
+            queries: Splunk SPL query strings
+            max_concurrent: Maximum number of searches running at once
+            **kwargs: Arguments for execute_query
+
+        Returns:
+            Results in the order of the queries
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrent))
+
+        async def run(query: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.execute_query(query, **kwargs)
+
+        return await asyncio.gather(*(run(query) for query in queries))
+
+    async def stream_query(self, query: str, earliest_time: Optional[str] = "-24h",
+                           latest_time: Optional[str] = "now",
+                           max_count: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the results of a search through the export endpoint.
+
+        Args:
+            query: Splunk SPL query string
+            earliest_time: Search time range start
+            latest_time: Search time range end
+            max_count: Maximum number of results to yield (None for all)
+
+        Yields:
+            Result dictionaries
+
+        Raises:
+            ConnectionError: If not connected to Splunk
+        """
+        if not self.connected or self.client is None:
+            if not await self.connect():
+                raise ConnectionError("Not connected to Splunk")
+
+        if not query.strip().lower().startswith(('search ', '|')):
+            query = f"search {query}"
+
+        params = {'search': query, 'output_mode': 'json', 'preview': 'false'}
+        if earliest_time is not None:
+            params['earliest_time'] = earliest_time
+        if latest_time is not None:
+            params['latest_time'] = latest_time
+
+        logger.info(f"Streaming Splunk query: {query}")
+        # Export responses can stay open for as long as the search runs
+        async with self.client.stream('POST', f"{self.jobs_path}/export", data=params, timeout=None,
+                                      headers={'Authorization': f"Splunk {self.session_key}"}) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                raise SplunkRequestError(_error_message(response))
+
+            count = 0
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                for message in row.get('messages') or []:
+                    if message.get('type') in ('FATAL', 'ERROR'):
+                        raise SplunkRequestError(message.get('text', 'Search failed'))
+                if 'result' not in row or row.get('preview'):
+                    continue
+
+                yield row['result']
+                count += 1
+                if max_count is not None and count >= max_count:
+                    break
+
+    async def stream_job_results(self, sid: str, max_count: Optional[int] = None,
+                                 page_size: int = config.SPLUNK_RESULT_PAGE_SIZE,
+                                 preview: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the results of a search job with paged offset fetches.
+
+        Args:
+            sid: Search job ID
+            max_count: Maximum number of results to yield (None for all)
+            page_size: Results fetched per request
+            preview: Read the results_preview of a job that is still running
+
+        Yields:
+            Result dictionaries
+        """
+        endpoint = 'results_preview' if preview else 'results'
+        offset = 0
+        while max_count is None or offset < max_count:
+            count = page_size if max_count is None else min(page_size, max_count - offset)
+            response = await self._request('GET', f"{self.jobs_path}/{sid}/{endpoint}", params={
+                'output_mode': 'json', 'count': count, 'offset': offset
+            })
+            page = response.json().get('results', [])
+            for result in page:
+                yield result
+            if len(page) < count:
+                break
+            offset += len(page)
+
+    async def _get_job(self, sid: str) -> Dict[str, Any]:
+        """Get the status properties of a search job"""
+        response = await self._request('GET', f"{self.jobs_path}/{sid}", params={'output_mode': 'json'})
+        return response.json()['entry'][0]['content']
+
+    async def _reattach_job(self, fingerprint: str) -> Optional[str]:
+        """
+        Get the SID of the running or recently finished job of an identical search.
+
+        Args:
+            fingerprint: Fingerprint of the search (see search_fingerprint)
+
+        Returns:
+            SID, or None if there is no usable job
+        """
+        sid = self.recent_jobs.get(fingerprint)
+        if sid is None:
+            return None
+        try:
+            job = await self._get_job(sid)
+            if job.get('isFailed') or job.get('dispatchState') in ("FAILED", "INTERNAL_CANCEL", "USER_CANCEL"):
+                raise SplunkRequestError(f"job is {job.get('dispatchState')}")
+        except Exception as e:
+            logger.info(f"Not reusing search job {sid}: {str(e)}")
+            self.recent_jobs.discard(fingerprint, sid)
+            return None
+        logger.info(f"Reattaching to search job {sid}")
+        return sid
+
+    async def _cancel_job(self, sid: str):
+        """Cancel a search job, ignoring errors"""
+        try:
+            await self._request('POST', f"{self.jobs_path}/{sid}/control",
+                                data={'action': 'cancel', 'output_mode': 'json'})
+        except Exception as e:
+            logger.warning(f"Error cancelling Splunk job {sid}: {str(e)}")
+
+    async def _get_field_summary(self, sid: str) -> Dict[str, Any]:
+        """
+        Get summary of fields present in the results.
+
+        Args:
+            sid: Search job ID
+
+        Returns:
+            Dictionary with field summary information
+        """
+        try:
+            response = await self._request('GET', f"{self.jobs_path}/{sid}/summary", params={'output_mode': 'json'})
+            summary = {}
+            for name, field in response.json().get('fields', {}).items():
+                summary[name] = {
+                    "count": field.get("count", 0),
+                    "distinct_count": field.get("distinct_count", 0),
+                    "is_exact": str(field.get("is_exact", "0")) in ("1", "True", "true"),
+                    "min": field.get("min"),
+                    "max": field.get("max"),
+                    "mean": field.get("mean"),
+                    "stdev": field.get("stdev")
+                }
+            return summary
+        except Exception as e:
+            logger.error(f"Error getting field summary: {str(e)}")
+            return {}
+
+
+class SyncSplunkQueryExecutor(SplunkQueryExecutor):
+    """
+    Blocking facade over AsyncSplunkQueryExecutor for existing callers.
+
+    The searches of all calling threads run on one event loop in a background
+    thread and share its connection pool. The field helpers of
+    SplunkQueryExecutor work unchanged on top of execute_query.
+    """
+
+    def __init__(self, result_cache=None, query_rewriter=None, governor=None, **kwargs):
+        """
+        Initialize the facade.
+
+        Args:
+            result_cache: ResultCache consulted by execute_query, or None to always run searches
+            query_rewriter: QueryRewriter used by execute_stats_query, or None to run them as written
+            governor: SearchGovernor admitting searches by priority, or None to run them at once
+            **kwargs: Arguments for AsyncSplunkQueryExecutor
+        """
+        super().__init__(result_cache, query_rewriter, governor)
+        self._settings = kwargs
+        self.executor = AsyncSplunkQueryExecutor(**kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="splunk-async", daemon=True)
+        self._thread.start()
+
+    def _run(self, coroutine):
+        """Run a coroutine on the background loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def connect(self, **kwargs) -> bool:
+        """
+        Connect to Splunk.
+
+        Args:
+            **kwargs: Connection settings overriding the ones given to the constructor
+                (host, port, username, password, scheme, app, owner, verify_ssl)
+
+        Returns:
+            True if connection successful, False otherwise
+        """
+        if kwargs:
+            old = self.executor
+            self._settings = {**self._settings, **kwargs}
+            self.executor = AsyncSplunkQueryExecutor(**self._settings)
+            self._run(old.close())
+        self.connected = self._run(self.executor.connect())
+        return self.connected
+
+    def _execute_query(self, query: str, **kwargs) -> Dict[str, Any]:
+        """Run a search on the background loop; execute_query consults the result cache first"""
+        result = self._run(self.executor.execute_query(query, **kwargs))
+        self.connected = self.executor.connected
+        return result
+
+    def execute_queries(self, queries: List[str], **kwargs) -> List[Dict[str, Any]]:
+        """Execute many queries concurrently; see AsyncSplunkQueryExecutor.execute_queries"""
+        return self._run(self.executor.execute_queries(queries, **kwargs))
+
+    def stream_query(self, query: str, priority: str = PRIORITY_INTERACTIVE, group: Optional[str] = None,
+                     **kwargs) -> Iterator[Dict[str, Any]]:
+        """Stream the results of a search; see SplunkQueryExecutor.stream_query"""
+        return self._govern_stream(query, self._iterate(self.executor.stream_query(query, **kwargs)),
+                                   priority, group)
+
+    def stream_job_results(self, sid: str, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Stream the results of a search job; see SplunkQueryExecutor.stream_job_results"""
+        return self._govern_stream(sid, self._iterate(self.executor.stream_job_results(sid, **kwargs)))
+
+    def _stream_unreachable(self, error: Exception) -> bool:
+        """Check whether a stream failed because Splunk could not be reached; see _is_unreachable"""
+        return _is_unreachable(error) or (isinstance(error, ConnectionError) and not self.executor.connected)
+
+    def _iterate(self, generator: AsyncIterator, batch_size: int = 500) -> Iterator:
+        """Iterate an async generator running on the background loop, a batch of items per hop"""
+        async def take():
+            items = []
+            try:
+                while len(items) < batch_size:
+                    items.append(await generator.__anext__())
+            except StopAsyncIteration:
+                return items, True
+            return items, False
+
+        try:
+            finished = False
+            while not finished:
+                items, finished = self._run(take())
+                yield from items
+        finally:
+            self._run(generator.aclose())
+
+    def close(self):
+        """Close the connection pool and stop the background loop"""
+        if self.breaker is not None:
+            self.breaker.shutdown()
+        self._run(self.executor.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self.connected = False
+
+
+def _is_done(job: Dict[str, Any]) -> bool:
+    return str(job.get('isDone', False)).lower() in ('1', 'true')
+
+
+def _log_timing(timing: Dict[str, Any], total: float):
+    """Log where the time of a query went"""
+    logger.info(f"Query finished in {total:.2f}s ({timing['exec_mode']}): dispatch {timing['dispatch']:.2f}s, "
+                f"wait {timing['wait']:.2f}s over {timing['polls']} polls, "
+                f"fetch {timing['fetch']:.2f}s, summary {timing['summary']:.2f}s")
+
+
+def _error_message(response: httpx.Response) -> str:
+    """Extract Splunk's error text from a failed response"""
+    try:
+        messages = response.json().get('messages', [])
+        text = '; '.join(m.get('text', '') for m in messages if isinstance(m, dict))
+    except ValueError:
+        text = response.text[:200]
+    return f"HTTP {response.status_code}: {text}" if text else f"HTTP {response.status_code}"
+
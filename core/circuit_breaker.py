@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+
+
+class CircuitOpenError(ConnectionError):
+    """A request was refused at once because the circuit breaker is open"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fail fast while Splunk is unreachable instead of waiting out a timeout per search.
+
+    After failure_threshold consecutive connection failures the breaker opens. While
+    open, allow() refuses every search, and a background thread calls probe (e.g. a
+    reconnect) every probe_interval seconds, doubling the interval up to
+    max_probe_interval after each failed attempt. The first successful probe, or any
+    search that still succeeds, closes the breaker again. Listeners are told about
+    every change of state, so queued work can pause and resume with it.
+    """
+
+    def __init__(self, probe: Callable[[], bool],
+                 failure_threshold: int = config.SPLUNK_BREAKER_FAILURES,
+                 probe_interval: float = config.SPLUNK_BREAKER_PROBE_INTERVAL,
+                 max_probe_interval: float = config.SPLUNK_BREAKER_MAX_PROBE_INTERVAL,
+                 name: str = "Splunk"):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            probe: Called in the background while open; returns True once the service is reachable
+            failure_threshold: Consecutive connection failures that open the breaker
+            probe_interval: Seconds before the first probe after opening
+            max_probe_interval: Longest delay between probes
+            name: Name of the guarded service, for log messages
+        """
+        self.probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_interval = probe_interval
+        self.max_probe_interval = max(probe_interval, max_probe_interval)
+        self.name = name
+
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.next_probe_at: Optional[float] = None
+        self._stats = {'opened': 0, 'probes': 0, 'rejected': 0}
+        self._listeners: List[Callable[[str], None]] = []
+        self._closed_event = threading.Event()
+        self._closed_event.set()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Check whether a request may go to the service now.
+
+        Returns:
+            True if the breaker is closed, False (counted as rejected) while it is open
+        """
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return True
+            self._stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        """The service answered; closes the breaker if it was open"""
+        with self._lock:
+            self.failures = 0
+            if self.state == STATE_CLOSED:
+                return
+        self._close()
+
+    def record_failure(self, error: Optional[str] = None):
+        """
+        Count a connection failure, opening the breaker at failure_threshold in a row.
+
+        Args:
+            error: What went wrong, reported by stats while the breaker is open
+        """
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == STATE_OPEN or self.failures < self.failure_threshold:
+                return
+            self.state = STATE_OPEN
+            self.opened_at = time.time()
+            self.next_probe_at = self.opened_at + self.probe_interval
+            self._stats['opened'] += 1
+            self._closed_event.clear()
+        logger.error(f"{self.name} unreachable after {self.failures} failed connections, failing searches fast "
+                     f"until it answers again: {error}")
+        threading.Thread(target=self._probe_loop, name="circuit-breaker-probe", daemon=True).start()
+        self._notify(STATE_OPEN)
+
+    def wait_closed(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the breaker is closed.
+
+        Args:
+            timeout: Seconds to wait at most (None waits indefinitely)
+
+        Returns:
+            True if the breaker is closed
+        """
+        return self._closed_event.wait(timeout)
+
+    def open_for(self) -> float:
+        """Get the seconds the breaker has been open, 0 while closed"""
+        with self._lock:
+            return time.time() - self.opened_at if self.state == STATE_OPEN else 0.0
+
+    def retry_after(self) -> int:
+        """Get the seconds until the next probe, for callers told to try again later"""
+        with self._lock:
+            if self.state == STATE_CLOSED or self.next_probe_at is None:
+                return 0
+            return max(1, round(self.next_probe_at - time.time()))
+
+    def add_listener(self, listener: Callable[[str], None]):
+        """
+        Call a function with the new state (STATE_OPEN or STATE_CLOSED) whenever it changes.
+
+        Args:
+            listener: Called in the thread that changed the state; must not block
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the state of the breaker.
+
+        Returns:
+            Dictionary with the state, consecutive failures, the last error, how long the
+            breaker has been open, and counts of openings, probes and rejected requests
+        """
+        open_for = self.open_for()
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'failure_threshold': self.failure_threshold,
+                'last_error': self.last_error,
+                'open_for': round(open_for, 1),
+                'retry_after': retry_after,
+                **self._stats,
+            }
+
+    def shutdown(self):
+        """Stop probing; the breaker stays in its current state"""
+        self._stop.set()
+
+    def _probe_loop(self):
+        """Probe the service while the breaker is open, backing off after each failed attempt"""
+        delay = self.probe_interval
+        while not self._stop.wait(delay):
+            with self._lock:
+                if self.state == STATE_CLOSED:
+                    return
+                self._stats['probes'] += 1
+            try:
+                reachable = self.probe()
+            except Exception as e:
+                logger.debug(f"{self.name} probe failed: {str(e)}")
+                reachable = False
+            if reachable:
+                self._close()
+                return
+            delay = min(delay * 2, self.max_probe_interval)
+            with self._lock:
+                self.next_probe_at = time.time() + delay
+
+    def _close(self):
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return
+            outage = time.time() - self.opened_at
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.next_probe_at = None
+            self._closed_event.set()
+        logger.info(f"{self.name} reachable again after {outage:.0f}s, resuming searches")
+        self._notify(STATE_CLOSED)
+
+    def _notify(self, state: str):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(state)
+            except Exception as e:
+                logger.error(f"Error in circuit breaker listener: {str(e)}")
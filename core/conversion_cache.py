@@ -0,0 +1,232 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the conversion pipeline in SigmaLoader changes in a way that alters the SPL output
+CONVERSION_PIPELINE_VERSION = 1
+
+# Minimum number of seconds between automatic writes of new entries to disk
+SAVE_INTERVAL = 30
+
+
+class ConversionCache:
+    """Memory and disk cache of Sigma rule to Splunk SPL conversions"""
+
+    def __init__(self, cache_file: str = config.SPL_CACHE_FILE,
+                 mapping_file: str = config.FIELD_MAPPING_FILE):
+        """
+        Initialize the conversion cache.
+
+        Args:
+            cache_file: Path to the JSON file the cache is persisted to
+            mapping_file: Field mapping file whose content invalidates cached conversions
+        """
+        self.cache_file = cache_file
+        self.mapping_file = mapping_file
+        self.entries: Dict[str, Dict[str, Optional[str]]] = {}  # key -> {'query': ..., 'error': ...}
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self._last_save = 0.0
+        self._discarded = set()  # keys dropped since the last save, not to be merged back from disk
+        self._lock = threading.Lock()
+        self._backend_id = None
+        self._mapping_stat = None
+        self._mapping_digest = ""
+        self._load()
+
+    def _load(self):
+        """Load persisted conversions from disk"""
+        if not os.path.exists(self.cache_file):
+            return
+
+        try:
+            with open(self.cache_file, 'r') as f:
+                self.entries = json.load(f)
+            logger.info(f"Loaded {len(self.entries)} cached SPL conversions from {self.cache_file}")
+        except Exception as e:
+            logger.warning(f"SPL conversion cache {self.cache_file} is corrupt ({str(e)}), starting empty")
+            self.entries = {}
+
+    def save(self):
+        """Persist the cache to disk, merging entries written by other processes"""
+        with self._lock:
+            if not self.dirty:
+                return
+
+            try:
+                cache_dir = os.path.dirname(self.cache_file)
+                os.makedirs(cache_dir, exist_ok=True)
+
+                # Other worker processes share the same file, keep their conversions too
+                merged = {}
+                if os.path.exists(self.cache_file):
+                    try:
+                        with open(self.cache_file, 'r') as f:
+                            merged = json.load(f)
+                    except Exception:
+                        merged = {}
+                for key in self._discarded:
+                    merged.pop(key, None)
+                merged.update(self.entries)
+
+                fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".spl_cache_")
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(merged, f)
+                    os.replace(tmp_path, self.cache_file)
+                except Exception:
+                    os.unlink(tmp_path)
+                    raise
+
+                self.dirty = False
+                self._discarded.clear()
+                self._last_save = time.time()
+                logger.debug(f"Saved {len(merged)} SPL conversions to {self.cache_file}")
+            except Exception as e:
+                logger.error(f"Error saving SPL conversion cache: {str(e)}")
+
+    def save_if_due(self):
+        """Persist new entries if the last write is older than SAVE_INTERVAL"""
+        if self.dirty and time.time() - self._last_save >= SAVE_INTERVAL:
+            self.save()
+
+    def key_for(self, rule: Dict[str, Any]) -> str:
+        """
+        Build the cache key for a rule.
+
+        The key covers the rule content, the backend version and the pipeline
+        version (including the current field mappings), so editing any of them
+        yields a fresh conversion.
+
+        Args:
+            rule: The rule dictionary
+
+        Returns:
+            Hex cache key
+        """
+        content = {k: v for k, v in rule.items() if k != 'file_path'}
+        rule_digest = hashlib.sha1(
+            json.dumps(content, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        key_material = f"{rule_digest}:{self.backend_id()}:{self.pipeline_id()}"
+        return hashlib.sha1(key_material.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Optional[str]]:
+        """
+        Look up a conversion.
+
+        Args:
+            key: Cache key from key_for()
+
+        Returns:
+            Tuple of (hit, query); failed conversions are cached with a None query
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, entry.get('query')
+
+    def put(self, key: str, query: Optional[str], error: Optional[str] = None):
+        """
+        Store a conversion result.
+
+        Args:
+            key: Cache key from key_for()
+            query: Converted SPL query, or None if conversion failed
+            error: Conversion error message, if any
+        """
+        with self._lock:
+            self.entries[key] = {'query': query, 'error': error}
+            self.dirty = True
+
+    def discard(self, keys: Iterable[str]):
+        """
+        Drop the given entries, e.g. conversions of rules that were edited or deleted.
+
+        Args:
+            keys: Cache keys to drop
+        """
+        with self._lock:
+            for key in keys:
+                # Other processes may have persisted the key even if it is not loaded here
+                self.entries.pop(key, None)
+                self._discarded.add(key)
+                self.dirty = True
+
+    def prune(self, valid_keys: Iterable[str]):
+        """
+        Drop entries that do not belong to the given keys.
+
+        Args:
+            valid_keys: Keys of the conversions still in use
+        """
+        valid = set(valid_keys)
+        with self._lock:
+            stale = [key for key in self.entries if key not in valid]
+            for key in stale:
+                del self.entries[key]
+            if stale:
+                self.dirty = True
+
+        if stale:
+            # A plain save() would merge the stale entries back from disk
+            self._rewrite()
+
+    def _rewrite(self):
+        """Overwrite the cache file with exactly the in-memory entries"""
+        try:
+            if os.path.exists(self.cache_file):
+                os.unlink(self.cache_file)
+        except OSError as e:
+            logger.error(f"Error removing SPL conversion cache: {str(e)}")
+        self.save()
+
+    def backend_id(self) -> str:
+        """Identify the conversion backend and its version"""
+        if self._backend_id is None:
+            try:
+                from importlib.metadata import version
+                self._backend_id = (f"splunk:{version('pySigma-backend-splunk')}"
+                                    f":pysigma:{version('pySigma')}")
+            except Exception:
+                self._backend_id = "splunk:unknown"
+        return self._backend_id
+
+    def pipeline_id(self) -> str:
+        """Identify the conversion pipeline, including the current field mappings"""
+        try:
+            stat = os.stat(self.mapping_file)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+            if stat_key != self._mapping_stat:
+                with open(self.mapping_file, 'rb') as f:
+                    self._mapping_digest = hashlib.sha1(f.read()).hexdigest()
+                self._mapping_stat = stat_key
+        except OSError:
+            self._mapping_stat = None
+            self._mapping_digest = ""
+        return f"{CONVERSION_PIPELINE_VERSION}:{self._mapping_digest}"
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entry, hit and miss counts
+        """
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -4,6 +4,19 @@ from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+def _event_time(value: Any) -> datetime:
+    """Splunk's _time (epoch seconds or ISO 8601 text) as a naive local datetime, like datetime.now()"""
+    if not isinstance(value, datetime):
+        try:
+            return datetime.fromtimestamp(float(value))
+        except (TypeError, ValueError):
+            pass
+        try:
+            value = datetime.fromisoformat(str(value))
+        except ValueError:
+            return datetime.now()
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
 class CorrelationEngine:
     def __init__(self):
         self.events_cache = []
@@ -12,8 +25,8 @@ class CorrelationEngine:
     def add_events(self, events: List[Dict[str, Any]]):
         """Add new events to correlation engine"""
         for event in events:
-            if '_time' not in event:
-                event['_time'] = datetime.now()
+            # Splunk results carry _time as text; compare it as a datetime
+            event['_time'] = _event_time(event['_time']) if event.get('_time') is not None else datetime.now()
             self.events_cache.append(event)
         self._cleanup_old_events()
 
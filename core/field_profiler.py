@@ -4,6 +4,7 @@ import json
 from typing import Dict, List, Any, Optional, Set, Tuple
 import yaml
 
+from core.search_governor import PRIORITY_PROFILING
 from core.sigma_loader import SigmaLoader
 from core.splunk_query import SplunkQueryExecutor
 from core.field_mapper import FieldMapper
@@ -46,29 +47,12 @@ class FieldProfiler:
         if rule_id in self.field_cache:
             return self.field_cache[rule_id]
             
-        rule = self.sigma_loader.get_rule_by_id(rule_id)
-        if not rule:
+        if not self.sigma_loader.get_rule_by_id(rule_id):
             logger.warning(f"Rule {rule_id} not found")
             return set()
             
-        # Extract fields from detection section
-        fields = set()
-        detection = rule.get('detection', {})
-        
-        # Process all detection sections
-        for section_name, section_content in detection.items():
-            # Skip condition sections which contain the logical operators
-            if section_name == 'condition':
-                continue
-                
-            # Process selection sections
-            if isinstance(section_content, dict):
-                fields.update(section_content.keys())
-            elif isinstance(section_content, list):
-                # Handle list of dicts
-                for item in section_content:
-                    if isinstance(item, dict):
-                        fields.update(item.keys())
+        # Detection field names come straight from the loader's field index
+        fields = set(self.sigma_loader.get_rule_fields(rule_id))
         
         # Apply field mappings to convert generic fields to Splunk-specific fields
         mapped_fields = set()
@@ -113,17 +97,12 @@ class FieldProfiler:
         Returns:
             Dictionary mapping rule IDs to sets of field names
         """
-        # Get Sigma rules for the technique
-        sigma_rules = self.sigma_loader.get_rules_by_technique(technique_id)
-        
-        # Extract fields from each rule
+        # Extract fields from each rule for the technique
         rule_fields = {}
-        for rule in sigma_rules:
-            rule_id = rule.get('id')
-            if rule_id:
-                fields = self.extract_fields_from_rule(rule_id)
-                if fields:
-                    rule_fields[rule_id] = fields
+        for rule_id in self.sigma_loader.get_rule_ids_by_techniques([technique_id]):
+            fields = self.extract_fields_from_rule(rule_id)
+            if fields:
+                rule_fields[rule_id] = fields
         
         return rule_fields
         
@@ -221,11 +200,13 @@ class FieldProfiler:
         
         for query_type, query in queries.items():
             logger.info(f"Executing profiling query: {query_type}")
-            result = self.splunk_query.execute_query(
-                query=query,
+            # Count-by-field queries run as tstats where the data allows it
+            result = self.splunk_query.execute_stats_query(
+                query,
                 earliest_time=earliest_time,
                 latest_time=latest_time,
-                max_count=max_count
+                max_count=max_count,
+                priority=PRIORITY_PROFILING
             )
             
             results[query_type] = result
@@ -357,7 +338,8 @@ class FieldProfiler:
                 query=query_details['query'],
                 earliest_time=earliest_time,
                 latest_time=latest_time,
-                max_count=max_count
+                max_count=max_count,
+                priority=PRIORITY_PROFILING
             )
             
             # Add query details to result
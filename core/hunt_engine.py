@@ -0,0 +1,453 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import config
+from core.circuit_breaker import STATE_CLOSED
+from core.search_fusion import FusedSearch, plan_fusion
+from core.search_governor import PRIORITY_HUNT
+
+logger = logging.getLogger(__name__)
+
+# Times a search is run again after failing because Splunk could not be reached
+_MAX_OUTAGE_RETRIES = 5
+# Times a search the search governor turned away as busy is queued again
+_MAX_BUSY_RETRIES = 5
+
+
+class HuntExecution:
+    """Progress of the searches of one hunt submitted to the HuntEngine"""
+
+    def __init__(self, hunt_id: str, user: str, total: int):
+        self.hunt_id = hunt_id
+        self.user = user
+        self.total = total
+        self.completed = 0
+        self.cancelled = False
+        self.fusion = None  # Searches and events scanned saved by search fusion, if used
+        self.start_time = time.time()
+        self.end_time = None
+        self._done = threading.Event()
+        if total == 0:
+            self._finish()
+
+    @property
+    def progress(self) -> float:
+        """Percentage of searches finished"""
+        return (self.completed / self.total) * 100 if self.total else 100.0
+
+    def done(self) -> bool:
+        """Check whether every search has finished or the hunt was cancelled"""
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the hunt to finish.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the hunt finished
+        """
+        return self._done.wait(timeout)
+
+    def _finish(self):
+        self.end_time = time.time()
+        self._done.set()
+
+
+class _Search:
+    """One converted rule search, or a fused search of several rules, waiting for a slot in the job pool"""
+
+    __slots__ = ('execution', 'search', 'query_kwargs', 'on_result', 'fused', 'retries', 'busy_retries')
+
+    def __init__(self, execution: HuntExecution, search: Dict[str, Any],
+                 query_kwargs: Dict[str, Any], on_result: Optional[Callable],
+                 fused: Optional[FusedSearch] = None):
+        self.execution = execution
+        self.search = search
+        self.query_kwargs = query_kwargs
+        self.on_result = on_result
+        self.fused = fused
+        self.retries = 0
+        self.busy_retries = 0
+
+
+class HuntEngine:
+    """
+    Run the converted rule searches of hunts on a bounded pool of concurrent Splunk jobs.
+
+    At most max_concurrent searches run at once on this instance, and at most
+    max_per_user of them for any one user, so a large hunt cannot take every slot.
+    Each result is recorded with HuntManager.update_hunt_progress as soon as its
+    search finishes. Rules scanning the same data can be fused into one search
+    (see plan_fusion), whose results are split back per rule before recording. A
+    fused search returning as many results as its limit runs again as one search per
+    rule, so a rule matching many events cannot crowd out the matches of the others.
+
+    While the executor's circuit breaker is open (Splunk unreachable), no searches
+    start, and searches that failed because Splunk could not be reached go back to
+    the front of their queue. Hunts resume when the breaker closes; after max_pause
+    seconds of outage their remaining searches run and fail fast instead. Searches
+    the search governor turns away as busy are queued again after the retry_after
+    delay it suggests.
+    """
+
+    def __init__(self, splunk_query, hunt_manager=None,
+                 max_concurrent: int = config.HUNT_MAX_CONCURRENT_SEARCHES,
+                 max_per_user: int = config.HUNT_MAX_SEARCHES_PER_USER,
+                 max_pause: float = config.HUNT_MAX_PAUSE):
+        """
+        Initialize the hunt engine.
+
+        Args:
+            splunk_query: SplunkQueryExecutor used to run the searches
+            hunt_manager: HuntManager receiving the progress of each hunt
+            max_concurrent: Maximum number of searches running at once
+            max_per_user: Maximum number of searches running at once for one user
+            max_pause: Seconds hunts wait for an unreachable Splunk before their searches fail
+        """
+        self.splunk_query = splunk_query
+        self.hunt_manager = hunt_manager
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_user = max(1, min(max_per_user, self.max_concurrent))
+        self.max_pause = max_pause
+        self.breaker = getattr(splunk_query, 'breaker', None)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="hunt-search")
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Deque[_Search]] = {}  # user -> searches waiting for a slot
+        self._running: Dict[str, int] = {}  # user -> searches submitted to the pool
+        self._users: Deque[str] = deque()  # users with pending searches, served round-robin
+        self._fusion_totals = {'rules': 0, 'searches': 0, 'searches_saved': 0, 'fused_searches': 0,
+                               'events_scanned': 0, 'events_scanned_unfused': 0, 'truncated': 0}
+        self._resume_timer: Optional[threading.Timer] = None
+        self._delayed: Dict[threading.Timer, _Search] = {}  # busy searches waiting to be queued again
+        if self.breaker is not None:
+            self.breaker.add_listener(self._on_breaker_change)
+
+    def run_hunt(self, hunt_id: str, searches: List[Dict[str, Any]], user: str = "default",
+                 on_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+                 fuse: bool = config.HUNT_SEARCH_FUSION,
+                 **query_kwargs) -> HuntExecution:
+        """
+        Queue the searches of a hunt and return without waiting for them.
+
+        Args:
+            hunt_id: ID of the hunt (from HuntManager.start_hunt), or None to skip progress tracking
+            searches: Searches to run; each has 'query_id' and 'query' and optionally other keys
+                (e.g. 'technique_id') copied into the progress record. A 'logsource' key (the
+                Sigma rule's logsource) lets fusion group rules by the data they read, and
+                'earliest_time' and 'latest_time' keys (see HuntManager.plan_incremental_searches)
+                override the time range of query_kwargs; only searches over the same time
+                range are fused.
+            user: User the searches count against for the per-user limit
+            on_result: Called with (search, result) in a pool thread after each rule's search
+                finishes, with the rule's share of the results for fused searches
+            fuse: Combine rules over the same data into one search
+            **query_kwargs: Extra arguments for SplunkQueryExecutor.execute_query; searches
+                run with the hunt priority, grouped by hunt, unless priority or group are given
+
+        Returns:
+            HuntExecution tracking the searches
+        """
+        searches = [search for search in searches if search.get('query')]
+        execution = HuntExecution(hunt_id, user, len(searches))
+        if not searches:
+            self._complete(execution)
+            return execution
+
+        # The search governor queues the searches of concurrent hunts side by side
+        query_kwargs.setdefault('priority', PRIORITY_HUNT)
+        query_kwargs.setdefault('group', hunt_id or f"{user}:{id(execution)}")
+
+        # Searches of an incremental hunt may each cover their own time range
+        windows: Dict[tuple, List[Dict[str, Any]]] = {}
+        for search in searches:
+            windows.setdefault((search.get('earliest_time'), search.get('latest_time')), []).append(search)
+
+        items = []
+        for (earliest_time, latest_time), window_searches in windows.items():
+            window_kwargs = dict(query_kwargs)
+            if earliest_time is not None:
+                window_kwargs['earliest_time'] = earliest_time
+            if latest_time is not None:
+                window_kwargs['latest_time'] = latest_time
+            if fuse:
+                plan = plan_fusion(window_searches)
+                stats = plan.stats()
+                if execution.fusion is None:
+                    execution.fusion = dict(stats, events_scanned=0, events_scanned_unfused=0, truncated=0)
+                else:
+                    for key, value in stats.items():
+                        execution.fusion[key] += value
+                items.extend(_Search(execution, {'query_id': f"fused:{len(fused.members)}", 'query': fused.query},
+                                     window_kwargs, on_result, fused) for fused in plan.fused)
+                items.extend(_Search(execution, search, window_kwargs, on_result) for search in plan.single)
+            else:
+                items.extend(_Search(execution, search, window_kwargs, on_result) for search in window_searches)
+
+        logger.info(f"Queued {len(items)} searches for the {len(searches)} rules of hunt {hunt_id} (user {user})")
+        with self._lock:
+            if execution.fusion is not None:
+                for key in ('rules', 'searches', 'searches_saved', 'fused_searches'):
+                    self._fusion_totals[key] += execution.fusion[key]
+            queue = self._pending.setdefault(user, deque())
+            if not queue:
+                self._users.append(user)
+            queue.extend(items)
+            self._dispatch()
+        return execution
+
+    def cancel(self, execution: HuntExecution) -> int:
+        """
+        Drop the searches of a hunt that have not started yet.
+
+        Args:
+            execution: HuntExecution returned by run_hunt
+
+        Returns:
+            Number of searches dropped
+        """
+        with self._lock:
+            queue = self._pending.get(execution.user, deque())
+            items = [item for item in queue if item.execution is execution]
+            for timer in [timer for timer, item in self._delayed.items() if item.execution is execution]:
+                timer.cancel()
+                items.append(self._delayed.pop(timer))
+            if not items:
+                return 0
+            kept = deque(item for item in queue if item.execution is not execution)
+            if kept:
+                self._pending[execution.user] = kept
+            elif execution.user in self._pending:
+                del self._pending[execution.user]
+                self._users.remove(execution.user)
+            dropped = sum(len(item.fused.members) if item.fused else 1 for item in items)
+            execution.cancelled = True
+            execution.total -= dropped
+            finished = execution.completed >= execution.total
+
+        if finished:
+            self._complete(execution)
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the current load of the engine.
+
+        Returns:
+            Dictionary with running and pending searches per user, the limits and the
+            searches and events scanned saved by fusion so far, and the fused searches
+            that hit their result limit and ran again unfused
+        """
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_per_user': self.max_per_user,
+                'paused': self._paused(),
+                'running': dict(self._running),
+                'pending': {user: len(queue) for user, queue in self._pending.items()},
+                'fusion': dict(self._fusion_totals),
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting searches and drop the ones that have not started"""
+        with self._lock:
+            self._pending.clear()
+            self._users.clear()
+            if self._resume_timer is not None:
+                self._resume_timer.cancel()
+                self._resume_timer = None
+            for timer in self._delayed:
+                timer.cancel()
+            self._delayed.clear()
+        self._executor.shutdown(wait=wait)
+
+    def _paused(self) -> bool:
+        """Check whether searches wait for Splunk to become reachable again"""
+        return self.breaker is not None and 0 < self.breaker.open_for() < self.max_pause
+
+    def _on_breaker_change(self, state: str):
+        """Resume the queued searches when Splunk is reachable again"""
+        if state == STATE_CLOSED:
+            with self._lock:
+                self._dispatch()
+
+    def _resume(self):
+        """Give up waiting for Splunk after max_pause, letting the remaining searches fail"""
+        with self._lock:
+            self._resume_timer = None
+            self._dispatch()
+
+    def _dispatch(self):
+        """Submit pending searches while slots are free; the caller holds the lock"""
+        if self._users and self._paused():
+            # Nothing would reach Splunk; hold the queue until the breaker closes or max_pause passes
+            if self._resume_timer is None:
+                self._resume_timer = threading.Timer(self.max_pause - self.breaker.open_for(), self._resume)
+                self._resume_timer.daemon = True
+                self._resume_timer.start()
+                logger.warning(f"Splunk is unreachable, pausing {sum(len(q) for q in self._pending.values())} "
+                               f"queued hunt searches")
+            return
+        running = sum(self._running.values())
+        skipped = 0
+        # Round-robin over users, so a user's long hunt does not starve the others
+        while running < self.max_concurrent and skipped < len(self._users):
+            user = self._users[0]
+            self._users.rotate(-1)
+            if self._running.get(user, 0) >= self.max_per_user:
+                skipped += 1
+                continue
+
+            queue = self._pending[user]
+            item = queue.popleft()
+            if not queue:
+                del self._pending[user]
+                self._users.remove(user)
+
+            self._running[user] = self._running.get(user, 0) + 1
+            running += 1
+            skipped = 0
+            self._executor.submit(self._run_search, item)
+
+    def _run_search(self, item: _Search):
+        """Run one search in a pool thread and record its result"""
+        search = item.search
+        query_kwargs = item.query_kwargs
+        if item.fused is not None:
+            # Every rule of a fused search may need up to max_count results of its own
+            query_kwargs = dict(query_kwargs, max_count=query_kwargs.get('max_count', 1000) * len(item.fused.members))
+        try:
+            result = self.splunk_query.execute_query(search['query'], **query_kwargs)
+        except Exception as e:
+            logger.error(f"Error executing hunt search {search.get('query_id')}: {str(e)}")
+            result = {"status": "error", "error": str(e), "query": search['query'], "results": []}
+
+        # Searches that could not reach Splunk run again once it is back, unless the hunt was cancelled
+        retry = (self.breaker is not None and (result.get('status') == 'unavailable' or result.get('unreachable'))
+                 and not item.execution.cancelled and item.retries < _MAX_OUTAGE_RETRIES
+                 and self.breaker.open_for() < self.max_pause)
+        # Searches the search governor turned away try again once it expects a free slot
+        busy = (not retry and result.get('status') == 'busy' and not item.execution.cancelled
+                and item.busy_retries < _MAX_BUSY_RETRIES)
+        delay = None
+        if retry:
+            item.retries += 1
+            requeue = [item]
+            if not self.breaker.open_for():
+                # Not yet known to be down; trying again at once would only use up the retries
+                requeue, delay = [], self.breaker.probe_interval
+        elif busy:
+            item.busy_retries += 1
+            requeue, delay = [], result.get('retry_after') or 1
+        elif item.fused is not None and self._truncated(item, result, query_kwargs['max_count']):
+            # One noisy rule may have used up the shared limit; each rule runs again on its own
+            logger.warning(f"Fused search of {len(item.fused.members)} rules hit its limit of "
+                           f"{query_kwargs['max_count']} results, running the rules unfused")
+            requeue = [_Search(item.execution, member, item.query_kwargs, item.on_result)
+                       for member in item.fused.members]
+        else:
+            requeue = []
+        with self._lock:
+            self._running[item.execution.user] -= 1
+            if not self._running[item.execution.user]:
+                del self._running[item.execution.user]
+            if requeue:
+                queue = self._pending.setdefault(item.execution.user, deque())
+                if not queue:
+                    self._users.append(item.execution.user)
+                queue.extendleft(reversed(requeue))
+            if item.fused is not None and not retry and not busy:
+                scanned = result.get('scan_count', 0)
+                for fusion in (item.execution.fusion, self._fusion_totals):
+                    fusion['events_scanned'] += scanned
+                    fusion['events_scanned_unfused'] += scanned * len(item.fused.members)
+                    fusion['truncated'] += bool(requeue)
+            if delay is not None:
+                self._requeue_later(item, delay)
+            self._dispatch()
+
+        if requeue or delay is not None:
+            return
+        if item.fused is None:
+            self._record(item, search, result)
+            return
+
+        split = item.fused.split_results(result, item.query_kwargs.get('max_count'))
+        for member in item.fused.members:
+            self._record(item, member, split[member['query_id']])
+
+    def _requeue_later(self, item: _Search, delay: float):
+        """Queue a search again at the front of its user's queue after delay seconds; the caller holds the lock"""
+        def requeue():
+            with self._lock:
+                if self._delayed.pop(timer, None) is None:
+                    return  # Cancelled with its hunt, or the engine shut down
+                queue = self._pending.setdefault(item.execution.user, deque())
+                if not queue:
+                    self._users.append(item.execution.user)
+                queue.appendleft(item)
+                self._dispatch()
+
+        timer = threading.Timer(delay, requeue)
+        timer.daemon = True
+        self._delayed[timer] = item
+        timer.start()
+
+    @staticmethod
+    def _truncated(item: _Search, result: Dict[str, Any], max_count: int) -> bool:
+        """Check whether a fused search returned only part of its matches"""
+        if result.get('status') != 'success' or item.execution.cancelled:
+            return False
+        return max(result.get('total_result_count', 0), result.get('result_count', 0)) >= max_count
+
+    def _record(self, item: _Search, search: Dict[str, Any], result: Dict[str, Any]):
+        """Stream the result of a rule's search into the hunt progress and the caller's callback"""
+        execution = item.execution
+        with self._lock:
+            execution.completed += 1
+            finished = execution.completed >= execution.total
+
+        try:
+            if self.hunt_manager is not None and execution.hunt_id is not None:
+                progress = dict(search)
+                progress.update({
+                    'matches': result.get('results', []),
+                    'status': result.get('status'),
+                    'error': result.get('error'),
+                    'result_count': result.get('result_count', 0),
+                    'total_result_count': result.get('total_result_count', result.get('result_count', 0)),
+                    'execution_time': result.get('execution_time'),
+                    'progress': execution.progress,
+                })
+                self.hunt_manager.update_hunt_progress(execution.hunt_id, progress)
+            if item.on_result is not None:
+                item.on_result(search, result)
+        except Exception as e:
+            logger.error(f"Error recording result of hunt search {search.get('query_id')}: {str(e)}")
+
+        if finished:
+            self._complete(execution)
+
+    def _complete(self, execution: HuntExecution):
+        """Mark a hunt finished, recording it before waiters are released"""
+        if self.hunt_manager is not None and execution.hunt_id is not None:
+            try:
+                self.hunt_manager.complete_hunt(execution.hunt_id,
+                                                status="cancelled" if execution.cancelled else "completed")
+            except Exception as e:
+                logger.error(f"Error completing hunt {execution.hunt_id}: {str(e)}")
+        execution._finish()
+        logger.info(f"Hunt {execution.hunt_id} finished {execution.completed} searches in "
+                    f"{execution.end_time - execution.start_time:.2f}s")
+        if execution.fusion and execution.fusion['searches_saved']:
+            fusion = execution.fusion
+            logger.info(f"Hunt {execution.hunt_id} fused {fusion['rules']} rules into {fusion['searches']} searches, "
+                        f"scanning {fusion['events_scanned']} events instead of about "
+                        f"{fusion['events_scanned_unfused']}")
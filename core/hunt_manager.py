@@ -1,7 +1,11 @@
 import asyncio
+import hashlib
 import json
 import datetime
-from typing import Dict, List, Optional
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 import sqlite3
 import threading
@@ -9,6 +13,69 @@ from queue import Queue
 
 from dataclasses import dataclass, field
 
+import config
+from core.correlation_engine import CorrelationEngine
+
+logger = logging.getLogger(__name__)
+
+# Commands whose output over a time range is not the union of their output over its parts,
+# so rules using them search their whole time range on every run of an incremental hunt
+_NON_INCREMENTAL_COMMANDS = re.compile(
+    r'\|\s*(stats|tstats|chart|timechart|top|rare|eventstats|streamstats|transaction|dedup|head|tail|sort'
+    r'|fieldsummary|append|join)\b', re.IGNORECASE)
+# Fields that differ between searches returning the same event
+_VOLATILE_FIELDS = ('_serial',)
+
+
+def hunt_target(hunt_type: str, target_id: str, filters: Optional[Dict] = None) -> str:
+    """Key of what a hunt searches for; repeated hunts of the same target share high-water marks"""
+    return json.dumps([hunt_type, target_id, filters or {}], sort_keys=True)
+
+
+def query_hash(query: str) -> str:
+    """Hash of a rule's query; a changed rule starts over instead of using its old high-water mark"""
+    return hashlib.sha1(" ".join(query.split()).encode('utf-8')).hexdigest()[:16]
+
+
+def is_incremental_query(query: str) -> bool:
+    """Check whether a query's matches over new time ranges can be merged into earlier ones"""
+    return _NON_INCREMENTAL_COMMANDS.search(query or '') is None
+
+
+def event_identity(event: Dict[str, Any]) -> str:
+    """
+    Identity of a matched event across searches.
+
+    Raw events are identified by Splunk's _cd (bucket and offset) within their index and
+    indexer; other results, such as table rows, by their field values.
+    """
+    if event.get('_cd'):
+        return f"{event.get('splunk_server', '')}|{event.get('index', '')}|{event['_cd']}"
+    stable = {key: value for key, value in event.items() if key not in _VOLATILE_FIELDS}
+    return hashlib.sha1(json.dumps(stable, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def merge_matches(accumulated: List[Dict], new: List[Dict], max_matches: int) -> Tuple[List[Dict], int]:
+    """
+    Merge the matches of a run into those of earlier runs, dropping events seen before.
+
+    Args:
+        accumulated: Matches of earlier runs, newest first
+        new: Matches of this run
+        max_matches: Matches kept; the oldest are dropped beyond it
+
+    Returns:
+        Tuple of the merged matches (newest first) and the number of new ones
+    """
+    seen = {event_identity(event) for event in accumulated}
+    added = []
+    for event in new:
+        identity = event_identity(event)
+        if identity not in seen:
+            seen.add(identity)
+            added.append(event)
+    return (added + accumulated)[:max_matches], len(added)
+
 @dataclass
 class HuntResult:
     id: str
@@ -36,7 +103,12 @@ class HuntManager:
     def __init__(self, db_path="data/hunts.db"):
         self.db_path = db_path
         self.current_hunts: Dict[str, HuntResult] = {}
+        self.correlation_engines: Dict[str, CorrelationEngine] = {}
         self.result_queue = Queue()
+        # Hunt ID -> target and end of the time range of an incremental run
+        self.incremental_runs: Dict[str, Dict[str, Any]] = {}
+        # Results of one hunt arrive concurrently from the hunt engine's search threads
+        self._lock = threading.RLock()
         self.init_db()
 
         # Start background thread for result processing
@@ -58,53 +130,203 @@ class HuntManager:
                     status TEXT
                 )
             """)
+            # Per rule of a hunt target: the end of the time range searched so far and its matches
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS hunt_watermarks (
+                    target TEXT,
+                    query_id TEXT,
+                    query_hash TEXT,
+                    latest_time INTEGER,
+                    matches TEXT,
+                    updated TEXT,
+                    PRIMARY KEY (target, query_id)
+                )
+            """)
 
     def start_hunt(self, hunt_type: str, target_id: str, target_name: str,
-                  strict_mode: bool = True, filters: Dict = None) -> str:
-        """Start a new hunt and return its ID"""
-        hunt_id = f"hunt_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        hunt = HuntResult(
-            id=hunt_id,
-            type=hunt_type,
-            target_id=target_id,
-            target_name=target_name,
-            start_time=datetime.datetime.now().isoformat(),
-            end_time=None,
-            total_queries=0,
-            matched_queries=0,
-            results={},
-            status="running",
-            strict_mode=strict_mode,
-            filters=filters or {},
-            priority_queue=[],
-            correlated_events=[]
-        )
-
-        self.current_hunts[hunt_id] = hunt
-        self._save_hunt(hunt)
+                  strict_mode: bool = True, filters: Dict = None, incremental: bool = False) -> str:
+        """
+        Start a new hunt and return its ID.
+
+        An incremental hunt only searches the time since the last run of the same target
+        (type, target and filters); see plan_incremental_searches.
+        """
+        with self._lock:
+            base_id = f"hunt_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            # Scheduled hunts of several targets may start within the same second
+            hunt_id, suffix = base_id, 1
+            while hunt_id in self.current_hunts:
+                suffix += 1
+                hunt_id = f"{base_id}_{suffix}"
+            hunt = HuntResult(
+                id=hunt_id,
+                type=hunt_type,
+                target_id=target_id,
+                target_name=target_name,
+                start_time=datetime.datetime.now().isoformat(),
+                end_time=None,
+                total_queries=0,
+                matched_queries=0,
+                results={},
+                status="running",
+                strict_mode=strict_mode,
+                filters=filters or {},
+                priority_queue=[],
+                correlated_events=[]
+            )
+
+            self.current_hunts[hunt_id] = hunt
+            if incremental:
+                self.incremental_runs[hunt_id] = {'target': hunt_target(hunt_type, target_id, filters),
+                                                  'latest_time': int(time.time())}
+            self._save_hunt(hunt)
         return hunt_id
 
+    def plan_incremental_searches(self, hunt_id: str, searches: List[Dict],
+                                  earliest_time: str = "-24h") -> List[Dict]:
+        """
+        Give each search of an incremental hunt the time range it has not searched yet.
+
+        A rule searched by an earlier run of the hunt's target searches from its high-water
+        mark (less INCREMENTAL_HUNT_OVERLAP seconds, for late-indexed events) to the start
+        of this run. New rules, rules whose query changed and rules aggregating their
+        matches (stats, head, ...) search from earliest_time.
+
+        Args:
+            hunt_id: ID of a hunt started with incremental=True
+            searches: Searches for HuntEngine.run_hunt, each with 'query_id' and 'query'
+            earliest_time: Start of the time range of rules searched in full
+
+        Returns:
+            Copies of the searches with 'earliest_time', 'latest_time' and 'incremental' keys,
+            or the searches unchanged if the hunt is not incremental
+        """
+        run = self.incremental_runs.get(hunt_id)
+        if run is None:
+            return searches
+
+        watermarks = self.get_watermarks(run['target'])
+        planned = []
+        for search in searches:
+            search = dict(search, latest_time=str(run['latest_time']), incremental=False,
+                          earliest_time=earliest_time)
+            watermark = watermarks.get(str(search['query_id']))
+            if (watermark and watermark['query_hash'] == query_hash(search['query'])
+                    and is_incremental_query(search['query'])):
+                search['earliest_time'] = str(watermark['latest_time'] - config.INCREMENTAL_HUNT_OVERLAP)
+                search['incremental'] = True
+            planned.append(search)
+
+        resumed = sum(1 for search in planned if search['incremental'])
+        logger.info(f"Hunt {hunt_id} searches {resumed} of {len(planned)} rules from their last run")
+        return planned
+
+    def get_watermarks(self, target: str) -> Dict[str, Dict]:
+        """
+        Get how far each rule of a hunt target has been searched.
+
+        Args:
+            target: Hunt target from hunt_target()
+
+        Returns:
+            Dictionary of query_id -> query_hash, latest_time (epoch seconds), match_count and updated
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute("""
+                SELECT query_id, query_hash, latest_time, json_array_length(matches), updated
+                FROM hunt_watermarks WHERE target = ?
+            """, (target,)).fetchall()
+        return {row[0]: {'query_hash': row[1], 'latest_time': row[2], 'match_count': row[3], 'updated': row[4]}
+                for row in rows}
+
+    def reset_watermarks(self, target: str) -> int:
+        """Forget the high-water marks and matches of a hunt target, so its next run searches in full"""
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute("DELETE FROM hunt_watermarks WHERE target = ?", (target,)).rowcount
+
+    def _merge_incremental(self, run: Dict[str, Any], query_result: Dict) -> Dict:
+        """
+        Merge a rule's new matches into those of earlier runs and advance its high-water mark.
+
+        A search cut off at its result limit returned only the newest of its matches, so
+        the high-water mark stays where it was and the next run searches the range again.
+        """
+        query_id = str(query_result['query_id'])
+        current_hash = query_hash(query_result['query'])
+        new_matches = query_result.get('matches', [])
+        truncated = query_result.get('total_result_count', 0) > len(new_matches)
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT query_hash, latest_time, matches FROM hunt_watermarks "
+                               "WHERE target = ? AND query_id = ?", (run['target'], query_id)).fetchone()
+            known = row is not None and row[0] == current_hash
+            accumulated = json.loads(row[2]) if known else []
+            matches, added = merge_matches(accumulated, new_matches, config.INCREMENTAL_HUNT_MAX_MATCHES)
+            if truncated:
+                logger.warning(f"Rule {query_id} returned {len(new_matches)} of "
+                               f"{query_result['total_result_count']} matches, keeping its high-water mark")
+            if not truncated or known:
+                conn.execute("INSERT OR REPLACE INTO hunt_watermarks VALUES (?, ?, ?, ?, ?, ?)", (
+                    run['target'],
+                    query_id,
+                    current_hash,
+                    row[1] if truncated else run['latest_time'],
+                    json.dumps(matches),
+                    datetime.datetime.now().isoformat()
+                ))
+        return dict(query_result, matches=matches, new_matches=added)
+
     def update_hunt_progress(self, hunt_id: str, query_result: Dict):
-        """Update hunt progress with new query results"""
-        if hunt_id not in self.current_hunts:
-            return
-
-        hunt = self.current_hunts[hunt_id]
-        hunt.total_queries += 1
-
-        if query_result.get('matches', []):
-            hunt.matched_queries += 1
-            hunt.results[query_result['query_id']] = query_result
-            
-            # Correlate events and update timeline
-            correlation_engine = CorrelationEngine()
-            correlated_data = correlation_engine.correlate_events(query_result.get('matches', []))
-            hunt.correlated_events = correlated_data['chains']
-            hunt.attack_timeline = correlated_data['timeline']
-
-        self._save_hunt(hunt)
+        """
+        Update hunt progress with new query results.
+
+        In an incremental hunt, the matches of each successful rule search are merged into
+        those of earlier runs of its target, and its high-water mark moves to this run's end
+        unless the search returned only part of its matches.
+        """
+        with self._lock:
+            if hunt_id not in self.current_hunts:
+                return
+
+            run = self.incremental_runs.get(hunt_id)
+            if (run is not None and query_result.get('status') == 'success'
+                    and is_incremental_query(query_result.get('query'))):
+                try:
+                    query_result = self._merge_incremental(run, query_result)
+                except Exception as e:
+                    logger.error(f"Error merging incremental results of hunt {hunt_id}: {str(e)}")
+
+            hunt = self.current_hunts[hunt_id]
+            hunt.total_queries += 1
+
+            if query_result.get('matches', []):
+                hunt.matched_queries += 1
+                hunt.results[query_result['query_id']] = query_result
+
+                # Correlate the events of all results of the hunt so far
+                correlation_engine = self.correlation_engines.setdefault(hunt_id, CorrelationEngine())
+                try:
+                    # Copies, since the engine annotates events that are also saved as results
+                    correlation_engine.add_events([dict(event) for event in query_result['matches']])
+                    hunt.correlated_events = correlation_engine.correlate_events()
+                except Exception as e:
+                    logger.warning(f"Error correlating events of hunt {hunt_id}: {str(e)}")
+
+            self._save_hunt(hunt)
         self.result_queue.put((hunt_id, query_result))
 
+    def complete_hunt(self, hunt_id: str, status: str = "completed"):
+        """Mark a hunt as finished once all of its queries have run"""
+        with self._lock:
+            hunt = self.current_hunts.get(hunt_id)
+            if hunt is None:
+                return
+
+            hunt.status = status
+            hunt.end_time = datetime.datetime.now().isoformat()
+            self._save_hunt(hunt)
+            self.correlation_engines.pop(hunt_id, None)
+            self.incremental_runs.pop(hunt_id, None)
+
     def _save_hunt(self, hunt: HuntResult):
         """Save hunt to database"""
         with sqlite3.connect(self.db_path) as conn:
@@ -1,58 +1,279 @@
-
-import schedule
-import time
+import logging
+import re
 import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
+
+import schedule
+
+import config
+from core.search_governor import PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+_INTERVAL = re.compile(r'^\s*(\d+)\s*([smhdw]?)\s*$', re.IGNORECASE)
+_UNIT_SECONDS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_interval(interval: Union[int, str]) -> int:
+    """
+    Parse a schedule interval.
+
+    Args:
+        interval: Seconds, or a number with a unit such as '90s', '30m', '6h', '1d' or '1w'
+
+    Returns:
+        Interval in seconds
+
+    Raises:
+        ValueError: If the interval is not understood or not positive
+    """
+    match = _INTERVAL.match(str(interval))
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid hunt interval {interval!r}; expected e.g. 3600, '30m', '6h' or '1d'")
+    return int(match.group(1)) * _UNIT_SECONDS[match.group(2).lower()]
+
+
+def build_hunt_searches(sigma_loader, mitre_parser, hunt_type: str, target_id: str,
+                        filters: Optional[Dict] = None) -> List[Dict[str, Any]]:
+    """
+    Convert the Sigma rules of a tactic or technique hunt into searches for HuntEngine.run_hunt.
+
+    Args:
+        sigma_loader: SigmaLoader with the rules
+        mitre_parser: MitreParser resolving a tactic to its techniques
+        hunt_type: 'tactic' or 'technique'
+        target_id: Tactic or technique ID
+        filters: Rule attribute filters for SigmaLoader.find_rule_ids
+
+    Returns:
+        Searches with 'query_id', 'query' and the rule's 'logsource'
+    """
+    if hunt_type == 'tactic':
+        techniques = mitre_parser.get_techniques(target_id)
+        rule_ids = sigma_loader.get_rule_ids_by_techniques([t['id'] for t in techniques])
+    else:
+        rule_ids = sigma_loader.get_rule_ids_by_techniques([target_id])
+
+    if filters:
+        allowed = set(sigma_loader.find_rule_ids(**filters))
+        rule_ids = [rule_id for rule_id in rule_ids if rule_id in allowed]
+
+    queries = sigma_loader.convert_rules_to_splunk(rule_ids)['queries']
+    return [{'query_id': rule_id, 'query': queries[rule_id],
+             'logsource': (sigma_loader.get_rule_by_id(rule_id) or {}).get('logsource')}
+            for rule_id in rule_ids if queries.get(rule_id)]
+
 
 class HuntScheduler:
-    def __init__(self, hunt_manager):
+    """
+    Run tactic and technique hunts again at fixed intervals.
+
+    Scheduled runs are incremental (see HuntManager.plan_incremental_searches): each
+    searches only the time since the previous run of the same target and merges its
+    matches into the earlier ones. They bypass the result cache and run in the
+    background priority class of the search governor, behind interactive searches and
+    hunts started by users. A run still going when the next one is due is not doubled.
+    """
+
+    def __init__(self, hunt_manager, hunt_engine, sigma_loader, mitre_parser,
+                 user: str = config.HUNT_SCHEDULER_USER):
+        """
+        Initialize the scheduler and start its thread.
+
+        Args:
+            hunt_manager: HuntManager recording the runs and their high-water marks
+            hunt_engine: HuntEngine running the searches
+            sigma_loader: SigmaLoader converting the rules of each run
+            mitre_parser: MitreParser resolving tactics to techniques
+            user: User scheduled searches count against in the hunt engine
+        """
         self.hunt_manager = hunt_manager
-        self.scheduled_hunts = {}
+        self.hunt_engine = hunt_engine
+        self.sigma_loader = sigma_loader
+        self.mitre_parser = mitre_parser
+        self.user = user
+        self.scheduled_hunts: Dict[str, Dict[str, Any]] = {}
+
+        self._scheduler = schedule.Scheduler()
+        self._jobs: Dict[str, schedule.Job] = {}
+        self._executions: Dict[str, Any] = {}
+        self._due: List[str] = []  # hunts whose jobs came due, started outside the lock
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stop = False
         self._start_scheduler()
-    
-    def schedule_hunt(self, hunt_id: str, interval: str, filters: Dict = None, max_iterations: int = None) -> bool:
-        """Schedule a hunt to run periodically with improved management"""
-        if not self.hunt_manager.get_hunt(hunt_id):
+
+    def schedule_hunt(self, hunt_id: str, interval: Union[int, str], filters: Dict = None,
+                      max_iterations: int = None, earliest_time: str = "-24h") -> bool:
+        """
+        Schedule the target of a hunt to be hunted periodically.
+
+        Args:
+            hunt_id: ID of a tactic or technique hunt whose target is hunted
+            interval: Seconds between runs, or e.g. '30m', '6h', '1d'
+            filters: Rule attribute filters, replacing those of the hunt
+            max_iterations: Runs after which the schedule ends (None for no limit)
+            earliest_time: Time range start of the first run, and of rules that cannot
+                be searched incrementally
+
+        Returns:
+            True if the hunt was scheduled
+        """
+        # Hunts of this process still have their filters, which the database does not keep
+        hunt = self.hunt_manager.current_hunts.get(hunt_id) or self.hunt_manager.get_hunt(hunt_id)
+        if not hunt:
+            return False
+        if hunt.type not in ('tactic', 'technique'):
+            logger.error(f"Cannot schedule hunt {hunt_id}: only tactic and technique hunts can be scheduled")
+            return False
+        try:
+            seconds = parse_interval(interval)
+        except ValueError as e:
+            logger.error(f"Cannot schedule hunt {hunt_id}: {str(e)}")
             return False
-            
-        def run_scheduled_hunt():
-            try:
-                hunt = self.hunt_manager.get_hunt(hunt_id)
-                if not hunt:
-                    return False
-                    
-                new_hunt_id = self.hunt_manager.start_hunt(
-                    hunt_type=hunt.type,
-                    target_id=hunt.target_id,
-                    target_name=hunt.target_name,
-                    filters=filters or hunt.filters
-                )
-                return new_hunt_id
-            except Exception as e:
-                logger.error(f"Error in scheduled hunt {hunt_id}: {str(e)}")
-                return False
-            
-        def run_scheduled_hunt():
-            hunt = self.hunt_manager.get_hunt(hunt_id)
+
+        with self._lock:
+            self._cancel(hunt_id)
+            self.scheduled_hunts[hunt_id] = {
+                'hunt_id': hunt_id,
+                'type': hunt.type,
+                'target_id': hunt.target_id,
+                'target_name': hunt.target_name,
+                'filters': filters if filters is not None else hunt.filters,
+                'interval': seconds,
+                'max_iterations': max_iterations,
+                'earliest_time': earliest_time,
+                'runs': 0,
+                'last_run': None,
+                'last_hunt_id': None,
+                'last_error': None,
+            }
+            self._jobs[hunt_id] = self._scheduler.every(seconds).seconds.do(self._due.append, hunt_id)
+        self._wakeup.set()
+        logger.info(f"Scheduled {hunt.type} hunt of {hunt.target_name} every {seconds}s")
+        return True
+
+    def unschedule_hunt(self, hunt_id: str) -> bool:
+        """Stop running a scheduled hunt; a run in progress finishes"""
+        with self._lock:
+            return self._cancel(hunt_id)
+
+    def run_now(self, hunt_id: str) -> Optional[str]:
+        """
+        Run a scheduled hunt at once, outside its interval.
+
+        Returns:
+            ID of the new hunt, or None if the hunt is not scheduled or a run is still going
+        """
+        with self._lock:
+            if hunt_id not in self.scheduled_hunts:
+                return None
+        return self._start_run(hunt_id)
+
+    def get_scheduled_hunts(self) -> List[Dict[str, Any]]:
+        """
+        Get the scheduled hunts.
+
+        Returns:
+            One dictionary per schedule with its target, interval, runs so far, the last
+            run's hunt ID and time, the error of the last run that failed to start, whether
+            a run is in progress and the next run's time
+        """
+        with self._lock:
+            scheduled = []
+            for hunt_id, entry in self.scheduled_hunts.items():
+                execution = self._executions.get(hunt_id)
+                job = self._jobs.get(hunt_id)
+                scheduled.append(dict(entry,
+                                      running=execution is not None and not execution.done(),
+                                      next_run=job.next_run.isoformat() if job and job.next_run else None))
+            return scheduled
+
+    def shutdown(self):
+        """Stop the scheduler thread; runs in progress finish"""
+        with self._lock:
+            self._stop = True
+            self._scheduler.clear()
+        self._wakeup.set()
+
+    def _cancel(self, hunt_id: str) -> bool:
+        """Remove a schedule; the caller holds the lock"""
+        job = self._jobs.pop(hunt_id, None)
+        if job is not None:
+            self._scheduler.cancel_job(job)
+        return self.scheduled_hunts.pop(hunt_id, None) is not None
+
+    def _run_scheduled_hunt(self, hunt_id: str):
+        self._start_run(hunt_id)
+        with self._lock:
+            entry = self.scheduled_hunts.get(hunt_id)
+            if entry is not None and entry['max_iterations'] is not None and entry['runs'] >= entry['max_iterations']:
+                logger.info(f"Schedule of hunt {hunt_id} finished after {entry['runs']} runs")
+                self._cancel(hunt_id)
+
+    def _start_run(self, hunt_id: str) -> Optional[str]:
+        """Start an incremental run of a scheduled hunt's target"""
+        with self._lock:
+            entry = self.scheduled_hunts.get(hunt_id)
+            execution = self._executions.get(hunt_id)
+            if entry is None:
+                return None
+            if execution is not None and not execution.done():
+                logger.warning(f"Skipping scheduled run of hunt {hunt_id}: the previous run has not finished")
+                return None
+            entry = dict(entry)
+
+        new_hunt_id = None
+        try:
+            # Built before the hunt is recorded, so a rule conversion error leaves no hunt behind
+            searches = build_hunt_searches(self.sigma_loader, self.mitre_parser, entry['type'],
+                                           entry['target_id'], entry['filters'])
             new_hunt_id = self.hunt_manager.start_hunt(
-                hunt_type=hunt.type,
-                target_id=hunt.target_id,
-                target_name=hunt.target_name,
-                filters=filters or hunt.filters
+                hunt_type=entry['type'],
+                target_id=entry['target_id'],
+                target_name=entry['target_name'],
+                filters=entry['filters'],
+                incremental=True
             )
-            return new_hunt_id
-            
-        schedule.every().interval = interval
-        schedule.every().interval.do(run_scheduled_hunt)
-        self.scheduled_hunts[hunt_id] = interval
-        return True
-    
+            searches = self.hunt_manager.plan_incremental_searches(new_hunt_id, searches, entry['earliest_time'])
+            execution = self.hunt_engine.run_hunt(new_hunt_id, searches, user=self.user,
+                                                  use_cache=False, priority=PRIORITY_BACKGROUND)
+        except Exception as e:
+            logger.error(f"Error in scheduled hunt {hunt_id}: {str(e)}")
+            if new_hunt_id is not None:
+                self.hunt_manager.complete_hunt(new_hunt_id, status="error")
+            with self._lock:
+                if hunt_id in self.scheduled_hunts:
+                    self.scheduled_hunts[hunt_id]['last_error'] = str(e)
+            return None
+
+        with self._lock:
+            self._executions[hunt_id] = execution
+            if hunt_id in self.scheduled_hunts:
+                self.scheduled_hunts[hunt_id].update(runs=self.scheduled_hunts[hunt_id]['runs'] + 1,
+                                                     last_run=datetime.now().isoformat(),
+                                                     last_hunt_id=new_hunt_id,
+                                                     last_error=None)
+        return new_hunt_id
+
     def _start_scheduler(self):
         def run_scheduler():
             while True:
-                schedule.run_pending()
-                time.sleep(60)
-        
-        thread = threading.Thread(target=run_scheduler, daemon=True)
+                with self._lock:
+                    if self._stop:
+                        return
+                    # Due jobs only note their hunt; building and planning a run takes too long to hold the lock
+                    self._scheduler.run_pending()
+                    due = list(self._due)
+                    self._due.clear()
+                for hunt_id in due:
+                    self._run_scheduled_hunt(hunt_id)
+                with self._lock:
+                    idle = self._scheduler.idle_seconds
+                # Woken early when a hunt is scheduled
+                self._wakeup.wait(60 if idle is None else min(60, max(1, idle)))
+                self._wakeup.clear()
+
+        thread = threading.Thread(target=run_scheduler, name="hunt-scheduler", daemon=True)
         thread.start()
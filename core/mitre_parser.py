@@ -32,6 +32,29 @@ class MitreAttackParser:
         self._techniques = None
         self._load_attack_data()
     
+    @classmethod
+    def from_snapshot(cls, shared_snapshot) -> 'MitreAttackParser':
+        """
+        Create a parser from the tactics and techniques of a shared snapshot,
+        without loading the ATT&CK bundle.
+        
+        Args:
+            shared_snapshot: SharedSnapshot built with a MitreAttackParser
+        
+        Returns:
+            MitreAttackParser instance
+        """
+        parser = cls.__new__(cls)
+        parser.local_file_path = config.MITRE_LOCAL_FILE
+        parser.remote_url = config.MITRE_ENTERPRISE_URL
+        parser.cache_duration = 86400
+        parser.attack_data = None
+        parser._tactics = shared_snapshot.mitre['tactics']
+        parser._techniques = shared_snapshot.mitre['techniques']
+        logger.info(f"Using {len(parser._tactics)} tactics and {len(parser._techniques)} techniques "
+                    f"from shared snapshot")
+        return parser
+    
     def _load_attack_data(self):
         """Load MITRE ATT&CK data from local cache or remote source"""
         should_download = True
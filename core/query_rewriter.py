@@ -0,0 +1,272 @@
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# search <filter terms> | stats count by <fields> [| <more commands>]
+_STATS_QUERY = re.compile(
+    r'^(?:search\s+)?(?P<filters>[^|]*?)\s*\|\s*stats\s+(?P<agg>count(?:\(\))?(?:\s+as\s+\w+)?)\s+'
+    r'by\s+(?P<by>[^|]+?)\s*(?P<tail>\|.*)?$',
+    re.IGNORECASE | re.DOTALL)
+_TERM = re.compile(r'(?:[^\s"]|"(?:\\.|[^"\\])*")+')
+_FIELD_TERM = re.compile(r'^(?P<field>[\w.:-]+)=(?P<value>"(?:\\.|[^"\\])*"|[^\s"=]+)$')
+_FIELD_NAME = re.compile(r'^[\w.:-]+$')
+
+# Share of the events counted differently per group tolerated when checking a rewrite, as
+# events of relative time windows keep arriving between the two searches
+_VERIFY_TOLERANCE = 0.02
+
+
+class QueryRewriter:
+    """
+    Answer count-by-field searches with tstats where the data allows it.
+
+    A search of the form 'search <field>=<value> ... | stats count by <fields> | ...'
+    scans every event. If its fields are indexed (index, sourcetype, source, host and
+    TSTATS_INDEXED_FIELDS), or all belong to one accelerated data model
+    (TSTATS_DATAMODEL_FIELDS), tstats answers it from the index or the acceleration
+    summaries instead. Anything else, and any rewrite that fails or, when verifying,
+    counts the groups differently than the raw search, runs as the raw search.
+    """
+
+    def __init__(self, indexed_fields: List[str] = config.TSTATS_INDEXED_FIELDS,
+                 datamodel_fields: Dict[str, str] = config.TSTATS_DATAMODEL_FIELDS,
+                 verify: bool = config.QUERY_REWRITE_VERIFY,
+                 max_report_entries: int = 500):
+        """
+        Initialize the query rewriter.
+
+        Args:
+            indexed_fields: Fields indexed at ingest time, usable in tstats directly
+            datamodel_fields: Raw field name -> data model field ("Model.Dataset.field") of
+                an accelerated data model
+            verify: Run each rewritten query once as the raw search as well, to check that
+                it counts the same groups and measure the speedup; doubles the first search.
+                Without it the raw search of an accelerated query never runs, so the
+                report has no speedup for it
+            max_report_entries: Maximum number of queries kept in the report
+        """
+        self.indexed_fields = {field.lower() for field in indexed_fields} | {'index', 'sourcetype', 'source', 'host'}
+        self.datamodel_fields = datamodel_fields
+        self.verify = verify
+        self.max_report_entries = max_report_entries
+        self._report: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rewrite(self, query: str) -> Tuple[Optional[str], str]:
+        """
+        Build the tstats equivalent of a query.
+
+        Args:
+            query: Splunk SPL query string
+
+        Returns:
+            Tuple of the tstats query (None if the query cannot be rewritten) and either the
+            kind of rewrite ('indexed' or 'datamodel') or the reason it was not rewritten
+        """
+        match = _STATS_QUERY.match(query.strip())
+        if not match:
+            return None, "not a stats count by field search"
+
+        by_fields = _by_fields(match)
+        if not by_fields or not all(_FIELD_NAME.match(field) for field in by_fields):
+            return None, "unsupported by clause"
+
+        filters = []
+        for term in _TERM.findall(match.group('filters')):
+            term_match = _FIELD_TERM.match(term)
+            if not term_match:
+                return None, f"filter term {term} is not a field=value term"
+            filters.append((term_match.group('field'), term_match.group('value')))
+
+        agg = match.group('agg')
+        tail = f" {match.group('tail')}" if match.group('tail') else ""
+
+        if all(field.lower() in self.indexed_fields for field in by_fields):
+            terms = []
+            for field, value in filters:
+                if field.lower() in self.indexed_fields:
+                    terms.append(f"{field}={value}")
+                elif not (value == '*' and field in by_fields):
+                    return None, f"filter field {field} is not indexed"
+            where = f" where {' '.join(terms)}" if terms else ""
+            return f"| tstats {agg}{where} by {', '.join(by_fields)}{tail}", 'indexed'
+
+        nodes = {self.datamodel_fields.get(field, '').rpartition('.')[0] for field in by_fields}
+        if len(nodes) != 1 or '' in nodes:
+            missing = [field for field in by_fields
+                       if field.lower() not in self.indexed_fields and field not in self.datamodel_fields]
+            if missing:
+                return None, f"field {missing[0]} is neither indexed nor in an accelerated data model"
+            return None, "fields belong to different data models"
+
+        node = nodes.pop()
+        dataset = node.rpartition('.')[2]
+        terms = []
+        for field, value in filters:
+            if field.lower() in self.indexed_fields:
+                terms.append(f"{field}={value}")
+            elif value == '*' and field in by_fields:
+                continue
+            elif self.datamodel_fields.get(field, '').rpartition('.')[0] == node:
+                terms.append(f"{dataset}.{self.datamodel_fields[field].rpartition('.')[2]}={value}")
+            else:
+                return None, f"filter field {field} is not in data model {node}"
+
+        renames = [(f"{dataset}.{self.datamodel_fields[field].rpartition('.')[2]}", field) for field in by_fields]
+        where = f" where {' '.join(terms)}" if terms else ""
+        return (f"| tstats summariesonly=true {agg} from datamodel={node}{where} "
+                f"by {', '.join(name for name, _ in renames)} "
+                f"| rename {', '.join(f'{name} AS {field}' for name, field in renames)}{tail}"), 'datamodel'
+
+    def execute(self, splunk_query, query: str, **kwargs) -> Dict[str, Any]:
+        """
+        Execute a query, as tstats if it can be rewritten.
+
+        Args:
+            splunk_query: SplunkQueryExecutor running the searches
+            query: Splunk SPL query string
+            **kwargs: Arguments for SplunkQueryExecutor.execute_query
+
+        Returns:
+            Result of the tstats or the raw search, with a "rewrite" entry describing the rewrite
+        """
+        rewritten, kind = self.rewrite(query)
+        entry = self._entry(query, rewritten, kind)
+        if rewritten is None or entry['status'] == 'rejected':
+            return splunk_query.execute_query(query, **kwargs)
+
+        verifying = self.verify and not entry['verified']
+        run_kwargs = dict(kwargs, use_cache=False) if verifying else kwargs
+        result = splunk_query.execute_query(rewritten, **run_kwargs)
+        self._record_time(entry, 'tstats_time', result)
+        if result.get('status') != 'success':
+            self._reject(entry, f"tstats search failed: {result.get('error')}")
+            raw = splunk_query.execute_query(query, **kwargs)
+            self._record_time(entry, 'raw_time', raw)
+            return raw
+
+        if verifying:
+            raw = splunk_query.execute_query(query, **run_kwargs)
+            self._record_time(entry, 'raw_time', raw)
+            if raw.get('status') == 'success':
+                mismatch = _compare_results(query, raw.get('results', []), result.get('results', []))
+                with self._lock:
+                    entry['verified'] = True
+                if mismatch:
+                    self._reject(entry, mismatch)
+                    return raw
+                logger.info(f"tstats rewrite verified ({entry['speedup']}x faster): {query}")
+
+        with self._lock:
+            entry['status'] = 'accelerated'
+            entry['runs'] += 1
+        result['rewrite'] = {'original_query': query, 'query': rewritten, 'kind': kind,
+                             'speedup': entry['speedup']}
+        return result
+
+    def report(self) -> List[Dict[str, Any]]:
+        """
+        Get which queries were rewritten and how much faster they ran.
+
+        Returns:
+            One dictionary per query with the rewritten query, its kind, its status
+            (accelerated, rejected, not_rewritten or pending), the last tstats and raw
+            search times and the speedup between them. The raw search of an accelerated
+            query only runs when verifying, so without verify its raw time and speedup
+            are None.
+        """
+        with self._lock:
+            return [dict(entry) for entry in self._report.values()]
+
+    def _entry(self, query: str, rewritten: Optional[str], kind: str) -> Dict[str, Any]:
+        """Get the report entry of a query, adding it if it is new"""
+        key = " ".join(query.split())
+        with self._lock:
+            entry = self._report.get(key)
+            if entry is None:
+                entry = {'query': key, 'rewritten': rewritten,
+                         'kind': kind if rewritten else None,
+                         'status': 'pending' if rewritten else 'not_rewritten',
+                         'reason': None if rewritten else kind,
+                         'verified': False, 'runs': 0,
+                         'tstats_time': None, 'raw_time': None, 'speedup': None}
+                self._report[key] = entry
+                while len(self._report) > self.max_report_entries:
+                    self._report.popitem(last=False)
+            else:
+                self._report.move_to_end(key)
+            return entry
+
+    def _record_time(self, entry: Dict[str, Any], key: str, result: Dict[str, Any]):
+        """Keep the execution time of a successful tstats or raw search, and the speedup once both are known"""
+        if result.get('status') != 'success' or not result.get('execution_time'):
+            return
+        with self._lock:
+            entry[key] = result['execution_time']
+            if entry['raw_time'] and entry['tstats_time']:
+                entry['speedup'] = round(entry['raw_time'] / entry['tstats_time'], 2)
+
+    def _reject(self, entry: Dict[str, Any], reason: str):
+        """Stop rewriting a query, falling back to the raw search from now on"""
+        logger.warning(f"Not rewriting query to tstats ({reason}): {entry['query']}")
+        with self._lock:
+            entry['status'] = 'rejected'
+            entry['reason'] = reason
+
+
+def _by_fields(match: re.Match) -> List[str]:
+    """Get the fields of the by clause of a matched stats query"""
+    return [field.strip('"') for field in re.findall(r'"[^"]+"|[^\s,"]+', match.group('by'))]
+
+
+def _group_value(value: Any) -> Any:
+    """Make a group field value comparable, ignoring the order of multivalue fields"""
+    if isinstance(value, list):
+        return tuple(sorted(str(item) for item in value))
+    return None if value is None else str(value)
+
+
+def _compare_results(query: str, raw_results: List[Dict[str, Any]],
+                     tstats_results: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Describe how tstats results differ from raw search results, or None if they agree.
+
+    The rows are compared as counts per group (the values of the by fields). A group only
+    one side returned counts fully; the differences may add up to _VERIFY_TOLERANCE of the
+    events the raw search counted.
+    """
+    match = _STATS_QUERY.match(query.strip())
+    by_fields = _by_fields(match)
+    agg = re.split(r'\s+as\s+', match.group('agg'), flags=re.IGNORECASE)
+    count_field = agg[1] if len(agg) > 1 else 'count'
+
+    def group_counts(results):
+        counts: Dict[tuple, float] = {}
+        for row in results:
+            key = tuple(_group_value(row.get(field)) for field in by_fields)
+            counts[key] = counts.get(key, 0.0) + float(row.get(count_field, 0) or 0)
+        return counts
+
+    raw_counts, tstats_counts = group_counts(raw_results), group_counts(tstats_results)
+    differing = {}
+    for key in raw_counts.keys() | tstats_counts.keys():
+        if key in raw_counts and key in tstats_counts:
+            difference = abs(raw_counts[key] - tstats_counts[key])
+        else:
+            difference = max(raw_counts.get(key, 0.0), tstats_counts.get(key, 0.0), 1.0)
+        if difference:
+            differing[key] = difference
+
+    raw_total = sum(raw_counts.values())
+    if sum(differing.values()) > _VERIFY_TOLERANCE * max(raw_total, 1):
+        key = max(differing, key=differing.get)
+        group = ", ".join(f"{field}={value}" for field, value in zip(by_fields, key))
+        return (f"tstats counted {len(differing)} of {len(raw_counts | tstats_counts)} groups differently than "
+                f"the raw search, most of all {group}: {tstats_counts.get(key, 0):.0f} vs {raw_counts.get(key, 0):.0f}")
+    return None
@@ -0,0 +1,428 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Union
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Quoted strings are kept verbatim; whitespace outside them is collapsed
+_QUERY_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\s+')
+
+# Relative time modifiers such as -24h, -7d@d, +1h or @w0
+_RELATIVE_TIME = re.compile(r'^(?:([+-]\d*)([a-z]+))?(@[a-z0-9]+(?:[+-]\d*[a-z]+)?)?$')
+_UNIT_SECONDS = {
+    's': 1, 'sec': 1, 'secs': 1, 'second': 1, 'seconds': 1,
+    'm': 60, 'min': 60, 'mins': 60, 'minute': 60, 'minutes': 60,
+    'h': 3600, 'hr': 3600, 'hrs': 3600, 'hour': 3600, 'hours': 3600,
+    'd': 86400, 'day': 86400, 'days': 86400,
+    'w': 604800, 'week': 604800, 'weeks': 604800,
+}
+_SPLUNK_TIME_FORMAT = "%m/%d/%Y:%H:%M:%S"
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for use in a cache key, the way execute_query would run it.
+
+    Args:
+        query: Splunk SPL query string
+
+    Returns:
+        Query with surrounding whitespace removed, whitespace outside quoted strings
+        collapsed and a leading 'search' command unless it starts with a generating
+        command (| tstats ...)
+    """
+    query = _QUERY_TOKEN.sub(lambda m: m.group(0) if m.group(0).startswith('"') else ' ', query).strip()
+    if not query.lower().startswith(('search ', '|')):
+        query = f"search {query}"
+    return query
+
+
+def resolve_time(value: Optional[Union[str, int, float]]) -> Optional[Union[str, int]]:
+    """
+    Resolve a search time bound to a canonical form.
+
+    Absolute times (epoch seconds, ISO 8601 or Splunk's %m/%d/%Y:%H:%M:%S) become epoch
+    seconds. Relative times keep their meaning but are spelled one way, so -24h and -1d
+    resolve to the same value.
+
+    Args:
+        value: earliest_time or latest_time of a search
+
+    Returns:
+        Epoch seconds, a canonical relative modifier ('now', '-86400s@d', ...), or None for no bound
+
+    Raises:
+        ValueError: For real-time windows, whose results can never be reused
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    raw = value.strip()
+    value = raw.lower()
+    if not value:
+        return None
+    if value.startswith('rt'):
+        raise ValueError(f"Real-time window {value} cannot be cached")
+    if value == 'now':
+        return 'now'
+
+    try:
+        return int(float(value))
+    except ValueError:
+        pass
+
+    match = _RELATIVE_TIME.match(value)
+    if match and (match.group(1) or match.group(3)):
+        offset, unit, snap = match.groups()
+        if offset is None:
+            return snap
+        amount = int(offset[1:] or 1) * (-1 if offset[0] == '-' else 1)
+        if unit in _UNIT_SECONDS:
+            return f"{amount * _UNIT_SECONDS[unit]:+d}s{snap or ''}"
+        return f"{amount:+d}{unit}{snap or ''}"
+
+    for parse in (lambda v: datetime.strptime(v, _SPLUNK_TIME_FORMAT), datetime.fromisoformat):
+        try:
+            return int(parse(raw).timestamp())
+        except ValueError:
+            continue
+
+    # Anything else is passed to Splunk unchanged, so key on it unchanged as well
+    return value
+
+
+def search_fingerprint(query: str, earliest_time: Optional[str], latest_time: Optional[str],
+                       *extra: Any) -> Optional[str]:
+    """
+    Identify a search by its normalized query and resolved time range.
+
+    Args:
+        query: Splunk SPL query string
+        earliest_time: Search time range start
+        latest_time: Search time range end
+        *extra: Other JSON-serializable values the identity depends on (index, max_count, ...)
+
+    Returns:
+        Hex digest identifying the search, or None for real-time searches, which never repeat
+    """
+    try:
+        window = [resolve_time(earliest_time), resolve_time(latest_time)]
+    except ValueError:
+        return None
+    material = json.dumps([normalize_query(query), window, *extra])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class _Entry:
+    """One cached result set"""
+
+    __slots__ = ('result', 'size', 'created', 'expires')
+
+    def __init__(self, result: Dict[str, Any], size: int, created: float, expires: float):
+        self.result = result
+        self.size = size
+        self.created = created
+        self.expires = expires
+
+
+class ResultCache:
+    """
+    Results of finished searches, reused by identical searches until they expire.
+
+    Entries are keyed by the normalized query, the resolved time range, the index and
+    max_count. Searches over windows that end at or near the present (-24h to now) keep
+    receiving events, so they expire after relative_ttl; searches over absolute windows
+    that ended more than settle_time ago expire after absolute_ttl. The most recently
+    used entries are kept in memory up to max_entries and max_bytes, and optionally
+    in a directory on disk, which survives restarts and is shared by worker processes.
+    """
+
+    def __init__(self, max_entries: int = config.RESULT_CACHE_MAX_ENTRIES,
+                 max_bytes: int = config.RESULT_CACHE_MAX_BYTES,
+                 relative_ttl: float = config.RESULT_CACHE_RELATIVE_TTL,
+                 absolute_ttl: float = config.RESULT_CACHE_ABSOLUTE_TTL,
+                 settle_time: float = config.RESULT_CACHE_SETTLE_TIME,
+                 disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = config.RESULT_CACHE_DISK_MAX_BYTES):
+        """
+        Initialize the result cache.
+
+        Args:
+            max_entries: Maximum number of result sets kept in memory
+            max_bytes: Maximum approximate size (as JSON) of the result sets kept in memory
+            relative_ttl: Seconds to reuse the results of searches over relative windows
+            absolute_ttl: Seconds to reuse the results of searches over absolute windows in the past
+            settle_time: Absolute windows ending less than this many seconds ago are treated as relative
+            disk_dir: Directory of the on-disk tier, or None to keep results in memory only
+            disk_max_bytes: Maximum size of the on-disk tier
+        """
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.relative_ttl = relative_ttl
+        self.absolute_ttl = absolute_ttl
+        self.settle_time = settle_time
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                       'stores': 0, 'evictions': 0, 'expirations': 0, 'uncacheable': 0}
+
+    def key(self, query: str, earliest_time: Optional[str], latest_time: Optional[str],
+            index: Optional[str], max_count: int) -> Optional[str]:
+        """
+        Build the cache key of a search.
+
+        Args:
+            query: Splunk SPL query string
+            earliest_time: Search time range start
+            latest_time: Search time range end
+            index: Splunk index of the search
+            max_count: Maximum number of results of the search
+
+        Returns:
+            Hex digest identifying the search, or None if its results cannot be cached
+        """
+        return search_fingerprint(query, earliest_time, latest_time, index, max_count)
+
+    def ttl(self, earliest_time: Optional[str], latest_time: Optional[str]) -> float:
+        """
+        Get how long the results of a search over a time range stay valid.
+
+        Args:
+            earliest_time: Search time range start
+            latest_time: Search time range end
+
+        Returns:
+            Time to live in seconds
+        """
+        try:
+            latest = resolve_time(latest_time)
+        except ValueError:
+            return 0.0
+        if isinstance(latest, int) and latest <= time.time() - self.settle_time:
+            return self.absolute_ttl
+        return self.relative_ttl
+
+    def get(self, query: str, earliest_time: Optional[str], latest_time: Optional[str],
+            index: Optional[str], max_count: int) -> Optional[Dict[str, Any]]:
+        """
+        Look up the results of a search.
+
+        Args:
+            query: Splunk SPL query string
+            earliest_time: Search time range start
+            latest_time: Search time range end
+            index: Splunk index of the search
+            max_count: Maximum number of results of the search
+
+        Returns:
+            Copy of the cached result with a "cache" entry describing the hit, or None on a miss
+        """
+        key = self.key(query, earliest_time, latest_time, index, max_count)
+        if key is None:
+            with self._lock:
+                self._stats['uncacheable'] += 1
+            return None
+
+        now = time.time()
+        tier = 'memory'
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= now:
+                self._remove(key)
+                self._stats['expirations'] += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None and self.disk_dir:
+            entry = self._load_disk(key, now)
+            tier = 'disk'
+
+        with self._lock:
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats[f'{tier}_hits'] += 1
+            if tier == 'disk':
+                self._insert(key, entry)
+
+        result = _copy_result(entry.result)
+        result['cache'] = {'hit': True, 'tier': tier, 'age': now - entry.created,
+                           'expires_in': entry.expires - now}
+        return result
+
+    def put(self, query: str, earliest_time: Optional[str], latest_time: Optional[str],
+            index: Optional[str], max_count: int, result: Dict[str, Any]) -> bool:
+        """
+        Cache the results of a finished search.
+
+        Args:
+            query: Splunk SPL query string
+            earliest_time: Search time range start
+            latest_time: Search time range end
+            index: Splunk index of the search
+            max_count: Maximum number of results of the search
+            result: Result dictionary returned by execute_query
+
+        Returns:
+            True if the result was cached
+        """
+        key = self.key(query, earliest_time, latest_time, index, max_count)
+        ttl = self.ttl(earliest_time, latest_time)
+        if key is None or ttl <= 0:
+            return False
+
+        result = _copy_result(result)
+        result.pop('cache', None)
+        try:
+            payload = json.dumps(result)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Not caching search results that cannot be serialized: {str(e)}")
+            return False
+
+        now = time.time()
+        entry = _Entry(result, len(payload), now, now + ttl)
+        with self._lock:
+            self._stats['stores'] += 1
+            if entry.size <= self.max_bytes:
+                self._insert(key, entry)
+        if self.disk_dir:
+            self._store_disk(key, entry, payload)
+        return True
+
+    def clear(self):
+        """Drop every cached result set, in memory and on disk"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.json'):
+                    try:
+                        os.unlink(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        pass
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the hit and miss statistics of the cache.
+
+        Returns:
+            Dictionary with counters, hit rate and the current size of the memory tier
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats['hits'] + stats['misses']
+            stats.update({
+                'hit_rate': stats['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'disk_dir': self.disk_dir,
+            })
+        return stats
+
+    def _insert(self, key: str, entry: _Entry):
+        """Add an entry to the memory tier and evict the least recently used; the caller holds the lock"""
+        self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+
+    def _remove(self, key: str):
+        """Drop an entry from the memory tier; the caller holds the lock"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _load_disk(self, key: str, now: float) -> Optional[_Entry]:
+        """Read an entry from the on-disk tier, removing it if it expired"""
+        path = self._disk_path(key)
+        try:
+            with open(path) as f:
+                header = json.loads(f.readline())
+                if header['expires'] <= now:
+                    os.unlink(path)
+                    with self._lock:
+                        self._stats['expirations'] += 1
+                    return None
+                payload = f.read()
+            os.utime(path)  # Recently used entries are pruned last
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable cached results {path}: {str(e)}")
+            return None
+        return _Entry(json.loads(payload), len(payload), header['created'], header['expires'])
+
+    def _store_disk(self, key: str, entry: _Entry, payload: str):
+        """Write an entry to the on-disk tier and prune the least recently used files"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, prefix=".cache_")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(json.dumps({'created': entry.created, 'expires': entry.expires}) + "\n")
+                f.write(payload)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            logger.error(f"Error writing cached results to disk: {str(e)}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._prune_disk()
+
+    def _prune_disk(self):
+        """Delete the least recently used files while the on-disk tier is over its size limit"""
+        files = []
+        total = 0
+        with os.scandir(self.disk_dir) as entries:
+            for item in entries:
+                if item.name.endswith('.json'):
+                    stat = item.stat()
+                    files.append((stat.st_mtime, stat.st_size, item.path))
+                    total += stat.st_size
+        if total <= self.disk_max_bytes:
+            return
+        for _, size, path in sorted(files):
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.disk_max_bytes:
+                break
+
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a result so callers can add keys or results without changing the cached one"""
+    result = dict(result)
+    if isinstance(result.get('results'), list):
+        result['results'] = list(result['results'])
+    return result
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Results files are ordinary JSON objects, written one result per line between these
+# lines, so they can be read back one result at a time:
+#   {"query": "...", ..., "results": [
+#   {...},
+#   {...}
+#   ], "result_count": 2, "fields": [...]}
+_RESULTS_START = '"results": ['
+_RESULTS_END = '], '
+
+
+class ResultStore:
+    """Saved query results, written and read incrementally so large result sets stay out of memory"""
+
+    def __init__(self, results_dir: str = config.RESULTS_DIR):
+        """
+        Initialize the result store.
+
+        Args:
+            results_dir: Directory holding one JSON file per result set
+        """
+        self.results_dir = results_dir
+        os.makedirs(results_dir, exist_ok=True)
+
+    def path(self, result_id: str) -> str:
+        """Path of the file of a result set"""
+        return os.path.join(self.results_dir, f"{os.path.basename(result_id)}.json")
+
+    def exists(self, result_id: str) -> bool:
+        """Check whether a result set was saved"""
+        return os.path.exists(self.path(result_id))
+
+    def save(self, result_id: str, result: Dict[str, Any]) -> int:
+        """
+        Save a query result.
+
+        Args:
+            result_id: ID of the result set
+            result: Query result dictionary with a "results" list
+
+        Returns:
+            Number of results saved
+        """
+        metadata = {key: value for key, value in result.items() if key != 'results'}
+        return self.save_stream(result_id, metadata, result.get('results', []))
+
+    def save_stream(self, result_id: str, metadata: Dict[str, Any], results: Iterable[Dict[str, Any]]) -> int:
+        """
+        Save results as they are produced, holding only one of them in memory at a time.
+
+        Args:
+            result_id: ID of the result set
+            metadata: Other keys to save with the results (query, timestamp, ...)
+            results: Iterable of result dictionaries, e.g. SplunkQueryExecutor.stream_query()
+
+        Returns:
+            Number of results saved
+        """
+        fields = set()
+        count = 0
+        path = self.path(result_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.results_dir, prefix=".result_")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                header = json.dumps({key: value for key, value in metadata.items()
+                                     if key not in ('result_count', 'fields')})
+                f.write(header[:-1] + (", " if len(header) > 2 else "") + _RESULTS_START + "\n")
+                for result in results:
+                    if count:
+                        f.write(",\n")
+                    f.write(json.dumps(result))
+                    fields.update(result)
+                    count += 1
+                f.write(("\n" if count else "") + _RESULTS_END + json.dumps({
+                    'result_count': count,
+                    'fields': sorted(fields)
+                })[1:] + "\n")
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return count
+
+    def load(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a result set with all of its results.
+
+        Args:
+            result_id: ID of the result set
+
+        Returns:
+            Result dictionary, or None if it does not exist
+        """
+        try:
+            with open(self.path(result_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def load_metadata(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load everything of a result set except its results.
+
+        Args:
+            result_id: ID of the result set
+
+        Returns:
+            Dictionary with the metadata, result_count and fields, or None if it does not exist
+        """
+        try:
+            with open(self.path(result_id)) as f:
+                header = f.readline().rstrip("\n")
+                if not header.endswith(_RESULTS_START):
+                    # Not written by save_stream, so there is no cheaper way than a full load
+                    f.seek(0)
+                    result = json.load(f)
+                    results = result.pop('results', [])
+                    result.setdefault('result_count', len(results))
+                    result.setdefault('fields', _field_names(results))
+                    return result
+
+                trailer = ""
+                for line in f:
+                    if line.startswith(_RESULTS_END):
+                        trailer = line.rstrip("\n")[len(_RESULTS_END):]
+        except FileNotFoundError:
+            return None
+
+        metadata = json.loads(header[:-len(_RESULTS_START)].rstrip(", ") + "}")
+        metadata.update(json.loads("{" + trailer))
+        return metadata
+
+    def iter_results(self, result_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        Read the results of a result set one at a time.
+
+        Args:
+            result_id: ID of the result set
+
+        Yields:
+            Result dictionaries
+        """
+        with open(self.path(result_id)) as f:
+            header = f.readline().rstrip("\n")
+            if not header.endswith(_RESULTS_START):
+                f.seek(0)
+                yield from json.load(f).get('results', [])
+                return
+
+            for line in f:
+                if line.startswith(_RESULTS_END):
+                    return
+                if line.strip():
+                    yield json.loads(line.rstrip(",\n"))
+
+
+def _field_names(results: List[Dict[str, Any]]) -> List[str]:
+    fields = set()
+    for result in results:
+        fields.update(result)
+    return sorted(fields)
@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the layout or the meaning of a cached entry changes
+CACHE_FORMAT_VERSION = 1
+
+# File layout: magic, header (format version, index offset), pickled rule blobs,
+# then a pickled index mapping file path -> (mtime_ns, size, digest, offset, length)
+_MAGIC = b"HNTRULES"
+_HEADER = struct.Struct("<HQ")
+
+
+class RuleCache:
+    """Persistent cache of parsed Sigma rule files"""
+
+    def __init__(self, cache_file: str = config.SIGMA_RULE_CACHE_FILE):
+        """
+        Initialize the rule cache.
+
+        Args:
+            cache_file: Path to the binary cache file
+        """
+        self.cache_file = cache_file
+        self.entries: Dict[str, Tuple[int, int, str, Any]] = {}  # path -> (mtime_ns, size, digest, blob)
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+
+    def load(self) -> bool:
+        """
+        Load the cache from disk.
+
+        Returns:
+            True if a valid cache was loaded, False if it was missing or corrupt
+        """
+        self.entries = {}
+        self.dirty = False
+
+        if not os.path.exists(self.cache_file):
+            logger.info(f"No Sigma rule cache found at {self.cache_file}, performing full rebuild")
+            return False
+
+        try:
+            # Map the file instead of reading it: blobs are sliced without copying and
+            # the pages are shared by every process loading the same cache
+            with open(self.cache_file, 'rb') as f:
+                data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+            if data[:len(_MAGIC)] != _MAGIC:
+                raise ValueError("bad magic")
+
+            version, index_offset = _HEADER.unpack_from(data, len(_MAGIC))
+            if version != CACHE_FORMAT_VERSION:
+                logger.info(f"Sigma rule cache format {version} is outdated, performing full rebuild")
+                self.dirty = True
+                return False
+
+            index = pickle.loads(data[index_offset:])
+            for file_path, (mtime_ns, size, digest, offset, length) in index.items():
+                self.entries[file_path] = (mtime_ns, size, digest, data[offset:offset + length])
+
+            logger.info(f"Loaded Sigma rule cache with {len(self.entries)} files from {self.cache_file}")
+            return True
+        except Exception as e:
+            logger.warning(f"Sigma rule cache {self.cache_file} is corrupt ({str(e)}), performing full rebuild")
+            self.entries = {}
+            self.dirty = True
+            return False
+
+    def save(self):
+        """Write the cache to disk if it changed since it was loaded"""
+        if not self.dirty:
+            return
+
+        try:
+            cache_dir = os.path.dirname(self.cache_file)
+            os.makedirs(cache_dir, exist_ok=True)
+
+            index = {}
+            offset = len(_MAGIC) + _HEADER.size
+            blobs = []
+            for file_path, (mtime_ns, size, digest, blob) in self.entries.items():
+                index[file_path] = (mtime_ns, size, digest, offset, len(blob))
+                blobs.append(blob)
+                offset += len(blob)
+
+            # Write to a temporary file first so readers never see a partial cache
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".sigma_cache_")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(_MAGIC)
+                    f.write(_HEADER.pack(CACHE_FORMAT_VERSION, offset))
+                    for blob in blobs:
+                        f.write(blob)
+                    f.write(pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL))
+                os.replace(tmp_path, self.cache_file)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+
+            self.dirty = False
+            logger.info(f"Saved Sigma rule cache with {len(self.entries)} files to {self.cache_file}")
+        except Exception as e:
+            logger.error(f"Error saving Sigma rule cache: {str(e)}")
+
+    def lookup(self, file_path: str, stat: os.stat_result) -> Tuple[Optional[Any], Optional[bytes]]:
+        """
+        Look up the parsed content of a rule file.
+
+        The file is only read when its mtime or size changed; an unchanged
+        content hash still counts as a hit.
+
+        Args:
+            file_path: Path to the rule file
+            stat: Result of os.stat() for the file
+
+        Returns:
+            Tuple of (parsed content or None on a miss, raw file bytes if they were read)
+        """
+        entry = self.entries.get(file_path)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            self.hits += 1
+            return pickle.loads(entry[3]), None
+
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+
+        if entry is not None and entry[2] == content_digest(raw):
+            # Touched but unchanged - refresh the stat key
+            self.entries[file_path] = (stat.st_mtime_ns, stat.st_size, entry[2], entry[3])
+            self.dirty = True
+            self.hits += 1
+            return pickle.loads(entry[3]), raw
+
+        self.misses += 1
+        return None, raw
+
+    def store(self, file_path: str, stat: os.stat_result, raw: bytes, content: Any):
+        """
+        Store the parsed content of a rule file.
+
+        Args:
+            file_path: Path to the rule file
+            stat: Result of os.stat() for the file
+            raw: Raw file bytes the content was parsed from
+            content: Parsed YAML content
+        """
+        # Same type as the blobs of a loaded cache, which are views of the mapped file
+        blob = memoryview(pickle.dumps(content, protocol=pickle.HIGHEST_PROTOCOL))
+        self.entries[file_path] = (stat.st_mtime_ns, stat.st_size, content_digest(raw), blob)
+        self.dirty = True
+
+    def get_blob(self, file_path: str) -> Optional[Any]:
+        """
+        Get the pickled content of a cached rule file.
+
+        Args:
+            file_path: Path to the rule file
+
+        Returns:
+            Bytes-like pickle of the parsed content, or None if the file is not cached
+        """
+        entry = self.entries.get(file_path)
+        return entry[3] if entry is not None else None
+
+    def discard(self, file_paths: Iterable[str]):
+        """
+        Drop the entries of rule files that were deleted.
+
+        Args:
+            file_paths: Paths of the deleted rule files
+        """
+        for file_path in file_paths:
+            if self.entries.pop(file_path, None) is not None:
+                self.dirty = True
+
+    def prune(self, valid_paths: Iterable[str], root_dir: str):
+        """
+        Drop entries for files under root_dir that no longer exist.
+
+        Args:
+            valid_paths: Paths of the rule files currently on disk
+            root_dir: Directory whose entries are subject to pruning
+        """
+        valid = set(valid_paths)
+        prefix = os.path.join(root_dir, '')
+        stale = [p for p in self.entries if p.startswith(prefix) and p not in valid]
+        for file_path in stale:
+            del self.entries[file_path]
+        if stale:
+            logger.info(f"Pruned {len(stale)} deleted rule files from the Sigma rule cache")
+            self.dirty = True
+
+
+def content_digest(raw: bytes) -> str:
+    """
+    Compute the content hash used to key cached rule files.
+
+    Args:
+        raw: Raw file bytes
+
+    Returns:
+        Hex digest of the content
+    """
+    return hashlib.sha1(raw).hexdigest()
@@ -0,0 +1,524 @@
+import bisect
+import logging
+import re
+import shlex
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+# Searchable parts of a rule: scope name -> (bit in a posting's scope mask, ranking weight)
+SEARCH_SCOPES = {
+    'title': (1, 5.0),
+    'tag': (2, 3.0),
+    'field': (4, 2.0),
+    'logsource': (8, 2.0),
+    'description': (16, 1.0),
+    'value': (32, 1.0),
+}
+
+# Alternative names accepted in field-scoped queries (e.g. "product:windows")
+SCOPE_ALIASES = {
+    'tags': 'tag',
+    'fields': 'field',
+    'values': 'value',
+    'product': 'logsource',
+    'category': 'logsource',
+    'service': 'logsource',
+}
+
+# Relative score of a query token matching an indexed token exactly, by prefix or by substring
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.6
+INFIX_MATCH = 0.3
+
+NGRAM_SIZE = 3
+
+
+def tokenize(text: Any) -> List[str]:
+    """
+    Split text into lowercase search tokens.
+
+    Args:
+        text: Text to tokenize (non-strings are converted with str())
+
+    Returns:
+        List of tokens
+    """
+    if text is None:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def detection_field_name(key: str) -> str:
+    """
+    Strip value modifiers from a detection key (e.g. CommandLine|contains -> CommandLine).
+
+    Args:
+        key: Detection key
+
+    Returns:
+        Field name
+    """
+    return str(key).split('|', 1)[0]
+
+
+def iter_detection_items(detection: Any) -> Iterator[Tuple[Optional[str], Any]]:
+    """
+    Walk a rule's detection section, yielding field names and values.
+
+    The condition is skipped; keyword lists yield a None field name.
+
+    Args:
+        detection: The rule's detection dictionary
+
+    Yields:
+        Tuples of (field name or None, value)
+    """
+    if not isinstance(detection, dict):
+        return
+
+    for section_name, section_content in detection.items():
+        # Skip condition sections which contain the logical operators
+        if section_name == 'condition':
+            continue
+        yield from _iter_section_items(section_content)
+
+
+def _iter_section_items(section: Any) -> Iterator[Tuple[Optional[str], Any]]:
+    """Yield (field name, value) pairs from a single detection section"""
+    if isinstance(section, dict):
+        for key, value in section.items():
+            field = detection_field_name(key)
+            if isinstance(value, list):
+                for item in value:
+                    yield field, item
+            else:
+                yield field, value
+    elif isinstance(section, list):
+        for item in section:
+            if isinstance(item, (dict, list)):
+                yield from _iter_section_items(item)
+            else:
+                yield None, item
+    elif section is not None:
+        yield None, section
+
+
+class RuleSearchIndex:
+    """Token and n-gram inverted index over Sigma rules for ranked full-text search"""
+
+    def __init__(self):
+        """Initialize an empty search index"""
+        self._postings: Dict[str, Dict[str, int]] = {}  # token -> {rule ID: scope mask}
+        self._ngrams: Dict[str, Set[str]] = {}  # n-gram -> tokens containing it
+        self._doc_tokens: Dict[str, Tuple[str, ...]] = {}  # rule ID -> indexed tokens
+        self._order: Dict[str, int] = {}  # rule ID -> insertion order, used to break ranking ties
+        self._next_order = 0
+        self._sorted_vocab: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def copy(self) -> 'RuleSearchIndex':
+        """
+        Copy the index so it can be updated without affecting readers of this one.
+
+        Returns:
+            Independent RuleSearchIndex with the same content
+        """
+        clone = RuleSearchIndex.__new__(RuleSearchIndex)
+        clone._postings = {token: dict(postings) for token, postings in self._postings.items()}
+        clone._ngrams = {gram: set(tokens) for gram, tokens in self._ngrams.items()}
+        clone._doc_tokens = dict(self._doc_tokens)
+        clone._order = dict(self._order)
+        clone._next_order = self._next_order
+        # The sorted vocabulary is replaced, never modified, so it can be shared
+        clone._sorted_vocab = self._sorted_vocab
+        return clone
+
+    def add_rule(self, rule_id: str, rule: Dict[str, Any]):
+        """
+        Index a rule, replacing any previous version with the same ID.
+
+        Args:
+            rule_id: The rule ID
+            rule: The rule dictionary
+        """
+        if rule_id in self._doc_tokens:
+            self.remove_rule(rule_id)
+
+        masks: Dict[str, int] = {}
+
+        def add(scope: str, text: Any):
+            bit = SEARCH_SCOPES[scope][0]
+            for token in tokenize(text):
+                masks[token] = masks.get(token, 0) | bit
+
+        add('title', rule.get('title'))
+        add('description', rule.get('description'))
+
+        tags = rule.get('tags', [])
+        if not isinstance(tags, list):
+            tags = [tags]
+        for tag in tags:
+            add('tag', tag)
+            if isinstance(tag, str):
+                # Also index the whole tag so "tag:attack.t1059.001" matches exactly
+                masks[tag.lower()] = masks.get(tag.lower(), 0) | SEARCH_SCOPES['tag'][0]
+
+        logsource = rule.get('logsource', {})
+        if isinstance(logsource, dict):
+            for key in ('product', 'category', 'service'):
+                add('logsource', logsource.get(key))
+
+        for field, value in iter_detection_items(rule.get('detection', {})):
+            if field:
+                masks[field.lower()] = masks.get(field.lower(), 0) | SEARCH_SCOPES['field'][0]
+            add('value', value)
+
+        for token, mask in masks.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._add_ngrams(token)
+                self._sorted_vocab = None
+            postings[rule_id] = mask
+
+        self._doc_tokens[rule_id] = tuple(masks)
+        self._order[rule_id] = self._next_order
+        self._next_order += 1
+
+    def remove_rule(self, rule_id: str):
+        """
+        Remove a rule from the index.
+
+        Args:
+            rule_id: The rule ID
+        """
+        tokens = self._doc_tokens.pop(rule_id, None)
+        if tokens is None:
+            return
+
+        self._order.pop(rule_id, None)
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(rule_id, None)
+            if not postings:
+                del self._postings[token]
+                self._remove_ngrams(token)
+                self._sorted_vocab = None
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Search the index.
+
+        Every whitespace-separated term must match. Terms may be scoped to a part
+        of the rule (e.g. "field:CommandLine", "logsource:windows", "tag:attack.t1059");
+        tokens match exactly, by prefix or as a substring of an indexed token,
+        in decreasing score order.
+
+        Args:
+            query: Search string
+            limit: Maximum number of results to return
+
+        Returns:
+            List of (rule ID, score) tuples, best match first
+        """
+        scores: Optional[Dict[str, float]] = None
+
+        for term in _split_query(query):
+            scope = None
+            if ':' in term:
+                prefix, value = term.split(':', 1)
+                prefix = SCOPE_ALIASES.get(prefix.lower(), prefix.lower())
+                if prefix in SEARCH_SCOPES and value:
+                    scope, term = prefix, value
+
+            tokens = [term.lower()] if scope == 'tag' and '.' in term else tokenize(term)
+            for token in tokens:
+                matches = self._match_token(token, scope)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {rule_id: score + matches[rule_id]
+                              for rule_id, score in scores.items() if rule_id in matches}
+                if not scores:
+                    return []
+
+        if scores is None:
+            # Empty query matches everything, in load order
+            ranked = [(rule_id, 0.0) for rule_id in sorted(self._order, key=self._order.get)]
+        else:
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], self._order[item[0]]))
+
+        return ranked[:limit] if limit is not None else ranked
+
+    def _match_token(self, token: str, scope: Optional[str]) -> Dict[str, float]:
+        """Score every rule matching a single query token"""
+        scope_bit = SEARCH_SCOPES[scope][0] if scope else None
+        matches: Dict[str, float] = {}
+
+        for indexed_token, quality in self._candidate_tokens(token):
+            for rule_id, mask in self._postings[indexed_token].items():
+                if scope_bit is not None:
+                    if not mask & scope_bit:
+                        continue
+                    score = SEARCH_SCOPES[scope][1] * quality
+                else:
+                    score = _mask_weight(mask) * quality
+                if score > matches.get(rule_id, 0.0):
+                    matches[rule_id] = score
+
+        return matches
+
+    def _candidate_tokens(self, token: str) -> Iterator[Tuple[str, float]]:
+        """Yield indexed tokens matching a query token with their match quality"""
+        if token in self._postings:
+            yield token, EXACT_MATCH
+
+        vocab = self._vocabulary()
+        start = bisect.bisect_left(vocab, token)
+        prefixed = set()
+        for indexed_token in vocab[start:]:
+            if not indexed_token.startswith(token):
+                break
+            if indexed_token != token:
+                prefixed.add(indexed_token)
+                yield indexed_token, PREFIX_MATCH
+
+        if len(token) >= NGRAM_SIZE:
+            candidates = None
+            for gram in _ngrams(token):
+                tokens = self._ngrams.get(gram)
+                if not tokens:
+                    return
+                candidates = set(tokens) if candidates is None else candidates & tokens
+            candidates = candidates or set()
+        else:
+            candidates = vocab
+
+        for indexed_token in candidates:
+            if indexed_token != token and indexed_token not in prefixed and token in indexed_token:
+                yield indexed_token, INFIX_MATCH
+
+    def _vocabulary(self) -> List[str]:
+        """Get the sorted list of indexed tokens, used for prefix matching"""
+        if self._sorted_vocab is None:
+            self._sorted_vocab = sorted(self._postings)
+        return self._sorted_vocab
+
+    def _add_ngrams(self, token: str):
+        for gram in _ngrams(token):
+            self._ngrams.setdefault(gram, set()).add(token)
+
+    def _remove_ngrams(self, token: str):
+        for gram in _ngrams(token):
+            tokens = self._ngrams.get(gram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._ngrams[gram]
+
+
+def _ngrams(token: str) -> Set[str]:
+    """Get the distinct n-grams of a token"""
+    return {token[i:i + NGRAM_SIZE] for i in range(len(token) - NGRAM_SIZE + 1)}
+
+
+def _mask_weight(mask: int) -> float:
+    """Sum the ranking weights of the scopes set in a posting's scope mask"""
+    return _MASK_WEIGHTS[mask]
+
+
+_MASK_WEIGHTS = [
+    sum(weight for bit, weight in SEARCH_SCOPES.values() if mask & bit)
+    for mask in range(1 << len(SEARCH_SCOPES))
+]
+
+
+def _split_query(query: str) -> List[str]:
+    """Split a query into terms, honouring double quotes"""
+    try:
+        return shlex.split(query)
+    except ValueError:
+        return query.split()
+
+
+# Dimensions of RuleAttributeIndex; all values are matched case-insensitively
+ATTRIBUTE_DIMENSIONS = ('product', 'category', 'service', 'level', 'status', 'author', 'field')
+
+
+class RuleAttributeIndex:
+    """Secondary indexes of Sigma rules by logsource, level, status, author and detection fields"""
+
+    def __init__(self):
+        """Initialize empty attribute indexes"""
+        self._index: Dict[str, Dict[str, Set[str]]] = {dim: {} for dim in ATTRIBUTE_DIMENSIONS}
+        self._rule_values: Dict[str, Dict[str, Tuple[str, ...]]] = {}  # rule ID -> dimension -> keys
+        self._rule_fields: Dict[str, Tuple[str, ...]] = {}  # rule ID -> field names as written in the rule
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+
+    def copy(self) -> 'RuleAttributeIndex':
+        """
+        Copy the indexes so they can be updated without affecting readers of these.
+
+        Returns:
+            Independent RuleAttributeIndex with the same content
+        """
+        clone = RuleAttributeIndex.__new__(RuleAttributeIndex)
+        clone._index = {dim: {key: set(rule_ids) for key, rule_ids in keys.items()}
+                        for dim, keys in self._index.items()}
+        clone._rule_values = dict(self._rule_values)
+        clone._rule_fields = dict(self._rule_fields)
+        clone._order = dict(self._order)
+        clone._next_order = self._next_order
+        return clone
+
+    def add_rule(self, rule_id: str, rule: Dict[str, Any]):
+        """
+        Index a rule, replacing any previous version with the same ID.
+
+        Args:
+            rule_id: The rule ID
+            rule: The rule dictionary
+        """
+        if rule_id in self._rule_values:
+            self.remove_rule(rule_id)
+
+        logsource = rule.get('logsource', {})
+        if not isinstance(logsource, dict):
+            logsource = {}
+
+        fields = []
+        for field, _ in iter_detection_items(rule.get('detection', {})):
+            if field and field not in fields:
+                fields.append(field)
+
+        author = rule.get('author') or ''
+        authors = author if isinstance(author, list) else str(author).split(',')
+
+        values = {
+            'product': [logsource.get('product')],
+            'category': [logsource.get('category')],
+            'service': [logsource.get('service')],
+            'level': [rule.get('level')],
+            'status': [rule.get('status')],
+            'author': authors,
+            'field': fields,
+        }
+
+        rule_values = {}
+        for dim, dim_values in values.items():
+            keys = tuple(dict.fromkeys(_attribute_key(v) for v in dim_values if v))
+            for key in keys:
+                self._index[dim].setdefault(key, set()).add(rule_id)
+            rule_values[dim] = keys
+
+        self._rule_values[rule_id] = rule_values
+        self._rule_fields[rule_id] = tuple(fields)
+        self._order[rule_id] = self._next_order
+        self._next_order += 1
+
+    def remove_rule(self, rule_id: str):
+        """
+        Remove a rule from the indexes.
+
+        Args:
+            rule_id: The rule ID
+        """
+        rule_values = self._rule_values.pop(rule_id, None)
+        if rule_values is None:
+            return
+
+        for dim, keys in rule_values.items():
+            for key in keys:
+                rule_ids = self._index[dim].get(key)
+                if rule_ids is not None:
+                    rule_ids.discard(rule_id)
+                    if not rule_ids:
+                        del self._index[dim][key]
+
+        self._rule_fields.pop(rule_id, None)
+        self._order.pop(rule_id, None)
+
+    def find(self, **filters: Any) -> List[str]:
+        """
+        Find rules matching attribute filters.
+
+        Each keyword is a dimension (product, category, service, level, status,
+        author, field) with a single value or a list of values. A rule matches a
+        dimension if it has any of the listed values, except for 'field' where it
+        must use all listed fields. Dimensions are combined with AND.
+
+        Args:
+            **filters: Dimension filters; None values are ignored
+
+        Returns:
+            List of matching rule IDs in load order
+        """
+        result: Optional[Set[str]] = None
+
+        for dim, wanted in filters.items():
+            if wanted is None:
+                continue
+            if dim not in self._index:
+                raise ValueError(f"Unknown rule attribute: {dim}")
+
+            if not isinstance(wanted, (list, tuple, set)):
+                wanted = [wanted]
+            keys = [_attribute_key(v) for v in wanted if v]
+            if not keys:
+                continue
+
+            if dim == 'field':
+                matched = None
+                for key in keys:
+                    rule_ids = self._index[dim].get(key, set())
+                    matched = set(rule_ids) if matched is None else matched & rule_ids
+            else:
+                matched = set()
+                for key in keys:
+                    matched |= self._index[dim].get(key, set())
+
+            result = matched if result is None else result & matched
+            if not result:
+                return []
+
+        if result is None:
+            result = set(self._order)
+
+        return sorted(result, key=self._order.get)
+
+    def get_values(self, dim: str) -> Dict[str, int]:
+        """
+        Get the indexed values of a dimension with their rule counts.
+
+        Args:
+            dim: Dimension name
+
+        Returns:
+            Dictionary mapping values to the number of rules having them
+        """
+        return {key: len(rule_ids) for key, rule_ids in sorted(self._index[dim].items())}
+
+    def get_fields(self, rule_id: str) -> Tuple[str, ...]:
+        """
+        Get the detection field names a rule references.
+
+        Args:
+            rule_id: The rule ID
+
+        Returns:
+            Tuple of field names (value modifiers stripped) in rule order
+        """
+        return self._rule_fields.get(rule_id, ())
+
+
+def _attribute_key(value: Any) -> str:
+    """Normalize an attribute value for indexing and lookups"""
+    return str(value).strip().lower()
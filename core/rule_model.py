@@ -0,0 +1,193 @@
+import pickle
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Rule keys kept directly on RuleRecord; everything else (detection, references,
+# falsepositives, ...) stays in the rule body, loaded on demand
+RULE_METADATA_KEYS = ('id', 'title', 'description', 'status', 'level', 'author',
+                      'date', 'modified', 'tags', 'logsource')
+
+_METADATA_KEYS = frozenset(RULE_METADATA_KEYS)
+
+# Long free text is unlikely to repeat, interning it would only grow the intern table
+_NOT_INTERNED = frozenset(('title', 'description'))
+
+
+class _Missing:
+    """Marks a metadata slot whose value lives in the rule body instead"""
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        # Unpickle to the module singleton so identity checks keep working
+        return '_MISSING'
+
+    def __repr__(self) -> str:
+        return '<missing>'
+
+
+_MISSING = _Missing()
+
+# Canonical instances of repeated tuples (key lists, logsources, tag lists)
+_shared: Dict[Any, Any] = {}
+
+
+class _FrozenDict(tuple):
+    """Tuple of (key, value) pairs standing in for a small dict of strings"""
+
+    __slots__ = ()
+
+
+class RuleRecord:
+    """
+    Compact in-memory form of a Sigma rule.
+
+    Metadata is kept in slots with interned, shared strings; the rule body is
+    either kept inline or re-read on demand from the rule cache blob of its file.
+    """
+
+    __slots__ = RULE_METADATA_KEYS + ('file_path', 'keys', '_blob', '_position', '_body')
+
+    def __init__(self, rule: Dict[str, Any], file_path: str,
+                 blob: Optional[Any] = None, position: int = 0):
+        """
+        Build a record from a parsed rule.
+
+        Args:
+            rule: The rule dictionary
+            file_path: Path to the file containing the rule
+            blob: Pickled content of the rule file in the rule cache, to load the body from
+            position: Index of the rule within the file (for rule collections)
+        """
+        stored = set()
+        for key in RULE_METADATA_KEYS:
+            value = _compact(key, rule[key]) if key in rule else _MISSING
+            setattr(self, key, value)
+            if value is not _MISSING:
+                stored.add(key)
+
+        self.file_path = sys.intern(file_path)
+        self.keys = _share(tuple(sys.intern(str(key)) for key in rule if key != 'file_path'))
+        self._blob = blob
+        self._position = position
+        self._body = None
+        if blob is None:
+            self._body = {key: value for key, value in rule.items()
+                          if key not in stored and key != 'file_path'}
+
+    def load_body(self) -> Dict[str, Any]:
+        """
+        Get the rule body.
+
+        Returns:
+            Rule dictionary holding at least the keys not kept in metadata slots
+        """
+        if self._body is not None:
+            return self._body
+
+        content = pickle.loads(self._blob)
+        if content.get('type') == 'group':
+            return content.get('rules', [])[self._position]
+        return content
+
+    def view(self) -> 'RuleView':
+        """Get a read-only dictionary view of the rule"""
+        return RuleView(self)
+
+
+class RuleView(Mapping):
+    """
+    Read-only dictionary view of a RuleRecord.
+
+    Metadata is served from the record; the first access to any other key loads
+    the rule body once for the lifetime of the view.
+    """
+
+    __slots__ = ('_record', '_body')
+
+    def __init__(self, record: RuleRecord):
+        self._record = record
+        self._body = None
+
+    def __getitem__(self, key: str) -> Any:
+        record = self._record
+        if key == 'file_path':
+            return record.file_path
+        if key in _METADATA_KEYS:
+            value = getattr(record, key)
+            if value is not _MISSING:
+                return _expand(value)
+        if key not in record.keys:
+            raise KeyError(key)
+        if self._body is None:
+            self._body = record.load_body()
+        return self._body[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key == 'file_path' or key in self._record.keys
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._record.keys
+        yield 'file_path'
+
+    def __len__(self) -> int:
+        return len(self._record.keys) + 1
+
+    def __repr__(self) -> str:
+        return f"RuleView({self._record.id!r})"
+
+    @property
+    def record(self) -> RuleRecord:
+        """The underlying compact record"""
+        return self._record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Materialize the view as a plain dictionary.
+
+        Returns:
+            New rule dictionary, including file_path
+        """
+        return {key: self[key] for key in self}
+
+
+def _share(value: Tuple) -> Tuple:
+    """Return the canonical instance of an immutable value"""
+    # Keyed by type too, since an empty _FrozenDict compares equal to an empty tuple
+    return _shared.setdefault((type(value), value), value)
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _compact(key: str, value: Any) -> Any:
+    """
+    Convert a metadata value to its compact form.
+
+    Lists of scalars become shared tuples and flat dicts become shared _FrozenDict
+    pair tuples; anything more complex is left in the rule body.
+    """
+    if isinstance(value, list):
+        if all(not isinstance(item, (list, dict)) for item in value):
+            return _share(tuple(_intern(item) for item in value))
+        return _MISSING
+    if isinstance(value, dict):
+        if all(isinstance(k, str) and not isinstance(v, (list, dict)) for k, v in value.items()):
+            return _share(_FrozenDict((sys.intern(k), _intern(v)) for k, v in value.items()))
+        return _MISSING
+    if isinstance(value, tuple):
+        return _MISSING
+    if key in _NOT_INTERNED:
+        return value
+    return _intern(value)
+
+
+def _expand(value: Any) -> Any:
+    """Convert a compact metadata value back to its original type"""
+    if isinstance(value, _FrozenDict):
+        return dict(value)
+    if isinstance(value, tuple):
+        return list(value)
+    return value
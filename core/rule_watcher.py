@@ -0,0 +1,280 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+RULE_FILE_EXTENSIONS = ('.yml', '.yaml')
+
+# inotify event flags (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+               IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+# Callback receiving (created or modified paths, deleted paths)
+ChangeCallback = Callable[[List[str], List[str]], None]
+
+
+class RuleDirectoryWatcher:
+    """Background watcher reporting created, modified and deleted Sigma rule files"""
+
+    def __init__(self, rules_dir: str, callback: ChangeCallback,
+                 poll_interval: float = config.SIGMA_WATCH_INTERVAL,
+                 debounce: float = config.SIGMA_WATCH_DEBOUNCE,
+                 use_inotify: bool = True):
+        """
+        Initialize the watcher.
+
+        Args:
+            rules_dir: Directory containing Sigma rule YAML files
+            callback: Called from the watcher thread with (changed paths, deleted paths)
+            poll_interval: Seconds between directory scans when inotify is unavailable
+            debounce: Seconds without new events before a batch of changes is reported
+            use_inotify: Whether to use inotify on Linux (False forces polling)
+        """
+        self.rules_dir = rules_dir
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        self.mode = None  # 'inotify' or 'polling' once started
+        self._known: Dict[str, Tuple[int, int]] = {}  # path -> (mtime_ns, size)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start watching in a daemon thread"""
+        if self.is_alive():
+            return
+
+        self._stop.clear()
+        self._known = self.scan()
+        self._thread = threading.Thread(target=self._run, name="sigma-rule-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop watching.
+
+        Args:
+            timeout: Seconds to wait for the watcher thread to exit
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_alive(self) -> bool:
+        """Check whether the watcher thread is running"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Stat every rule file under the rules directory.
+
+        Returns:
+            Dictionary mapping file paths to (mtime_ns, size)
+        """
+        return scan_rule_files(self.rules_dir)
+
+    def _run(self):
+        """Watcher thread entry point"""
+        libc = _load_inotify() if self.use_inotify else None
+        if libc is not None:
+            try:
+                self._run_inotify(libc)
+                return
+            except Exception as e:
+                logger.warning(f"inotify watcher failed ({str(e)}), falling back to polling")
+
+        self._run_polling()
+
+    def _run_polling(self):
+        """Detect changes by rescanning the directory every poll_interval seconds"""
+        self.mode = 'polling'
+        logger.info(f"Watching {self.rules_dir} for rule changes (polling every {self.poll_interval}s)")
+        while not self._stop.wait(self.poll_interval):
+            self._report(self.scan())
+
+    def _run_inotify(self, libc):
+        """Detect changes with inotify, reporting them once events settle"""
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        watches: Dict[int, str] = {}  # watch descriptor -> directory
+        try:
+            for root, _, _ in os.walk(self.rules_dir):
+                self._add_watch(libc, fd, watches, root)
+
+            self.mode = 'inotify'
+            logger.info(f"Watching {self.rules_dir} for rule changes (inotify)")
+
+            touched: Set[str] = set()
+            rescan = False
+            last_event = 0.0
+            while not self._stop.is_set():
+                pending = touched or rescan
+                timeout = self.debounce if pending else 1.0
+                ready, _, _ = select.select([fd], [], [], timeout)
+
+                if ready:
+                    try:
+                        data = os.read(fd, 64 * 1024)
+                    except BlockingIOError:
+                        data = b""
+                    for wd, mask, name in _parse_events(data):
+                        last_event = time.monotonic()
+                        if mask & IN_Q_OVERFLOW:
+                            rescan = True
+                            continue
+
+                        directory = watches.get(wd)
+                        if mask & IN_IGNORED:
+                            watches.pop(wd, None)
+                            continue
+                        if directory is None:
+                            continue
+
+                        path = os.path.join(directory, name) if name else directory
+                        if mask & IN_ISDIR or mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                            # Directory appeared or went away, pick up or drop everything below it
+                            if mask & (IN_CREATE | IN_MOVED_TO):
+                                for root, _, _ in os.walk(path):
+                                    self._add_watch(libc, fd, watches, root)
+                            touched.update(self._paths_under(path))
+                            touched.update(scan_rule_files(path))
+                        elif name.endswith(RULE_FILE_EXTENSIONS):
+                            touched.add(path)
+
+                if (touched or rescan) and time.monotonic() - last_event >= self.debounce:
+                    if rescan:
+                        self._report(self.scan())
+                    else:
+                        self._report_paths(touched)
+                    touched = set()
+                    rescan = False
+        finally:
+            os.close(fd)
+
+    def _paths_under(self, directory: str) -> List[str]:
+        """Known rule files located under a directory"""
+        prefix = os.path.join(directory, '')
+        return [path for path in self._known if path.startswith(prefix)]
+
+    def _add_watch(self, libc, fd: int, watches: Dict[int, str], directory: str):
+        """Add an inotify watch for a directory"""
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            logger.warning(f"Could not watch {directory}: {os.strerror(ctypes.get_errno())}")
+            return
+        watches[wd] = directory
+
+    def _report_paths(self, paths: Iterable[str]):
+        """Report changes limited to the given paths"""
+        current = dict(self._known)
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                current[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                current.pop(path, None)
+        self._report(current)
+
+    def _report(self, current: Dict[str, Tuple[int, int]]):
+        """Compare a new directory state with the known one and invoke the callback on differences"""
+        changed = [path for path, key in current.items() if self._known.get(path) != key]
+        deleted = [path for path in self._known if path not in current]
+        if not changed and not deleted:
+            return
+
+        self._known = current
+        logger.info(f"Detected {len(changed)} changed and {len(deleted)} deleted rule files")
+        try:
+            self.callback(sorted(changed), sorted(deleted))
+        except Exception as e:
+            logger.error(f"Error applying rule changes: {str(e)}")
+
+
+def scan_rule_files(directory: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Stat every rule file under a directory.
+
+    Args:
+        directory: Directory to scan recursively
+
+    Returns:
+        Dictionary mapping file paths to (mtime_ns, size)
+    """
+    found = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(RULE_FILE_EXTENSIONS):
+                continue
+            file_path = os.path.join(root, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            found[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return found
+
+
+def _load_inotify():
+    """Load the libc inotify functions, or return None where they are unavailable"""
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_init1.restype = ctypes.c_int
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_add_watch.restype = ctypes.c_int
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+def _parse_events(data: bytes) -> List[Tuple[int, int, str]]:
+    """
+    Decode a buffer of inotify events.
+
+    Args:
+        data: Bytes read from the inotify file descriptor
+
+    Returns:
+        List of (watch descriptor, mask, file name) tuples
+    """
+    events = []
+    offset = 0
+    while offset + _EVENT_HEADER.size <= len(data):
+        wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+        offset += _EVENT_HEADER.size
+        name = data[offset:offset + length].rstrip(b"\0")
+        offset += length
+        events.append((wd, mask, os.fsdecode(name)))
+    return events
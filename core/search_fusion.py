@@ -0,0 +1,202 @@
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from core.splunk_query import summarize_results
+
+logger = logging.getLogger(__name__)
+
+# Field holding the IDs of the rules an event of a fused search matched
+FUSION_TAG_FIELD = "fused_rules"
+
+# Quoted strings, so pipes and brackets inside values are not mistaken for commands
+_QUOTED = re.compile(r'"(?:\\.|[^"\\])*"')
+# A trailing projection, as pySigma adds for rules listing fields; it does not change which events match
+_TRAILING_PROJECTION = re.compile(r'\|\s*(?:table|fields)\s+[^|"]*$', re.IGNORECASE)
+# Index and sourcetype terms decide which data a search scans
+_SCOPE_TERMS = re.compile(r'\b(index|sourcetype|source)\s*=\s*("(?:\\.|[^"\\])*"|[^\s()]+)', re.IGNORECASE)
+
+
+def _mask_quoted(text: str) -> str:
+    """Blank out quoted strings, keeping every character at its position"""
+    return _QUOTED.sub(lambda m: '"' + ' ' * (len(m.group(0)) - 2) + '"', text)
+
+
+def fusable_expression(query: str) -> Optional[str]:
+    """
+    Get the base search expression of a query if it can be fused with others.
+
+    Args:
+        query: Converted rule query
+
+    Returns:
+        The query as a plain search expression (without a leading 'search' command or a
+        trailing table/fields projection), or None if it uses other commands or subsearches
+    """
+    expression = query.strip()
+    if expression.lower().startswith('search '):
+        expression = expression[7:].strip()
+    unquoted = _mask_quoted(expression)
+    projection = _TRAILING_PROJECTION.search(unquoted)
+    if projection:
+        expression = expression[:projection.start()].rstrip()
+        unquoted = unquoted[:projection.start()].rstrip()
+    if not expression or '|' in unquoted or '[' in unquoted or '`' in unquoted:
+        return None
+    return expression
+
+
+def _scope(expression: str, logsource: Optional[Dict[str, Any]]) -> Tuple:
+    """Group key of a search: the data it scans and the Sigma logsource of its rule"""
+    terms = tuple(sorted(f"{match.group(1).lower()}={expression[match.start(2):match.end(2)]}"
+                         for match in _SCOPE_TERMS.finditer(_mask_quoted(expression))))
+    logsource = logsource or {}
+    return terms + tuple(str(logsource.get(key) or '') for key in ('product', 'category', 'service'))
+
+
+def _spl_string(value: str) -> str:
+    """Quote a value as an SPL eval string literal"""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class FusedSearch:
+    """One Splunk search standing in for the searches of several rules"""
+
+    def __init__(self, members: List[Dict[str, Any]], expressions: List[str]):
+        """
+        Initialize the fused search.
+
+        Args:
+            members: Searches combined (dictionaries with 'query_id' and 'query')
+            expressions: Base search expression of each member
+        """
+        self.members = members
+        tags = ", ".join(f"if(searchmatch({_spl_string(expression)}), {_spl_string(str(member['query_id']))}, null())"
+                         for member, expression in zip(members, expressions))
+        self.query = (" OR ".join(f"({expression})" for expression in expressions)
+                      + f" | eval {FUSION_TAG_FIELD}=mvappend({tags})")
+
+    def split_results(self, result: Dict[str, Any], max_count: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Split the result of the fused search into one result per member.
+
+        Args:
+            result: Result of running the fused query with SplunkQueryExecutor.execute_query
+            max_count: Maximum number of results per member
+
+        Returns:
+            Dictionary of query_id -> result shaped like an execute_query result
+        """
+        matches: Dict[str, List[Dict[str, Any]]] = {str(member['query_id']): [] for member in self.members}
+        unmatched = 0
+        for event in result.get('results', []):
+            tags = event.get(FUSION_TAG_FIELD)
+            if isinstance(tags, str):
+                tags = [tags]
+            event = {key: value for key, value in event.items() if key != FUSION_TAG_FIELD}
+            matched = False
+            for rule_id in tags or ():
+                if rule_id in matches:
+                    matches[rule_id].append(event)
+                    matched = True
+            unmatched += not matched
+        if unmatched:
+            logger.warning(f"{unmatched} events of a fused search matched none of its {len(self.members)} rules")
+
+        split = {}
+        for member in self.members:
+            rule_results = matches[str(member['query_id'])]
+            total = len(rule_results)
+            if max_count is not None:
+                rule_results = rule_results[:max_count]
+            split[member['query_id']] = {
+                "status": result.get("status"),
+                "error": result.get("error"),
+                "message": result.get("message"),
+                "query": member['query'],
+                "fused_query": result.get("query", self.query),
+                "results": rule_results,
+                "result_count": len(rule_results),
+                "total_result_count": total,
+                "execution_time": result.get("execution_time"),
+                "scan_count": result.get("scan_count", 0),
+                "event_count": len(rule_results),
+                "field_summary": summarize_results(rule_results) if rule_results else {},
+                "timing": result.get("timing"),
+            }
+        return split
+
+
+class FusionPlan:
+    """Searches of a hunt arranged into fused searches and searches that must run alone"""
+
+    def __init__(self, fused: List[FusedSearch], single: List[Dict[str, Any]]):
+        self.fused = fused
+        self.single = single
+
+    @property
+    def rule_count(self) -> int:
+        """Number of rule searches planned"""
+        return sum(len(search.members) for search in self.fused) + len(self.single)
+
+    @property
+    def search_count(self) -> int:
+        """Number of Splunk searches the plan dispatches"""
+        return len(self.fused) + len(self.single)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get how many searches the plan saves.
+
+        Returns:
+            Dictionary with the rules, searches dispatched, searches saved and fused searches
+        """
+        return {
+            'rules': self.rule_count,
+            'searches': self.search_count,
+            'searches_saved': self.rule_count - self.search_count,
+            'fused_searches': len(self.fused),
+        }
+
+
+def plan_fusion(searches: List[Dict[str, Any]],
+                max_rules: int = config.HUNT_FUSION_MAX_RULES) -> FusionPlan:
+    """
+    Group the searches of a hunt so rules over the same data share one Splunk pass.
+
+    Searches are grouped by the index, sourcetype and source terms of their query and
+    the Sigma logsource of their rule. Each group of at most max_rules searches becomes
+    one search ORing their expressions, with an eval tagging every event with the rules
+    it matches (an event may match several); FusedSearch.split_results separates the
+    results again. Searches using other commands than a trailing table/fields
+    projection, or subsearches, run alone.
+
+    Args:
+        searches: Searches with 'query_id' and 'query', and optionally the rule's 'logsource'
+        max_rules: Maximum number of rules combined into one search
+
+    Returns:
+        FusionPlan with the fused searches and the searches that run alone
+    """
+    groups: Dict[Tuple, List[Tuple[Dict[str, Any], str]]] = {}
+    single = []
+    for search in searches:
+        expression = fusable_expression(search['query'])
+        if expression is None:
+            single.append(search)
+            continue
+        groups.setdefault(_scope(expression, search.get('logsource')), []).append((search, expression))
+
+    fused = []
+    for members in groups.values():
+        for start in range(0, len(members), max(1, max_rules)):
+            chunk = members[start:start + max_rules]
+            if len(chunk) == 1:
+                single.append(chunk[0][0])
+            else:
+                fused.append(FusedSearch([search for search, _ in chunk], [expression for _, expression in chunk]))
+
+    plan = FusionPlan(fused, single)
+    logger.info(f"Fusion plan for {plan.rule_count} rules: {len(fused)} fused and {len(single)} single searches")
+    return plan
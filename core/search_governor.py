@@ -0,0 +1,302 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, highest first
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_HUNT = "hunt"
+PRIORITY_PROFILING = "profiling"
+PRIORITY_BACKGROUND = "background"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_HUNT, PRIORITY_PROFILING, PRIORITY_BACKGROUND)
+
+# Splunk's errors for a search refused because the user, role or instance runs too many
+_QUOTA_ERROR = re.compile(r'maximum number of concurrent|concurrency limit|srchJobsQuota', re.IGNORECASE)
+
+# Seconds after a quota error before the concurrency limit grows back by one search
+_QUOTA_RECOVERY_INTERVAL = 60.0
+
+
+def is_quota_error(error: Optional[str]) -> bool:
+    """Check whether a search error says Splunk's concurrent search quota was reached"""
+    return bool(error) and _QUOTA_ERROR.search(str(error)) is not None
+
+
+class SearchRejected(Exception):
+    """A search was turned away because its priority class is backed up"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ('priority', 'group', 'granted', 'event', 'queued_at')
+
+    def __init__(self, priority: str, group: str):
+        self.priority = priority
+        self.group = group
+        self.granted = False
+        self.event = threading.Event()
+        self.queued_at = time.time()
+
+
+class _PriorityClass:
+    """Searches of one priority waiting for a slot, queued per group and served round-robin"""
+
+    def __init__(self, name: str, queue_limit: int):
+        self.name = name
+        self.queue_limit = queue_limit
+        self.groups: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self.queued = 0
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.waits: Deque[float] = deque(maxlen=1000)
+
+    def push(self, ticket: _Ticket):
+        self.groups.setdefault(ticket.group, deque()).append(ticket)
+        self.queued += 1
+
+    def pop(self) -> _Ticket:
+        """Take the next search of the group whose turn it is"""
+        group, tickets = next(iter(self.groups.items()))
+        ticket = tickets.popleft()
+        if tickets:
+            self.groups.move_to_end(group)
+        else:
+            del self.groups[group]
+        self.queued -= 1
+        return ticket
+
+    def remove(self, ticket: _Ticket):
+        tickets = self.groups.get(ticket.group)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self.groups[ticket.group]
+            self.queued -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+        return {
+            'running': self.running,
+            'queued': self.queued,
+            'queue_limit': self.queue_limit,
+            'groups': len(self.groups),
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'wait_avg': round(sum(waits) / len(waits), 3) if waits else 0.0,
+            'wait_p95': round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+            'wait_max': round(waits[-1], 3) if waits else 0.0,
+        }
+
+
+class SearchGovernor:
+    """
+    Admission control for the searches this instance runs on Splunk.
+
+    Splunk caps concurrent searches per user and role, so searches wait here for one
+    of max_concurrent slots instead of failing with quota errors. Waiting searches are
+    admitted by priority class (interactive, hunt, profiling, background), and within
+    a class round-robin over their groups (e.g. hunts), so one large hunt does not
+    hold back the others. reserved_interactive slots are only used by interactive
+    searches, keeping their latency low while hunts fill the rest.
+
+    A class whose queue is full turns new searches away with SearchRejected, the
+    back-pressure signal callers pass on (with a retry delay) instead of piling up
+    work. Quota errors from Splunk shrink the limit by one search; it grows back one
+    search per minute without them.
+    """
+
+    def __init__(self, max_concurrent: int = config.SPLUNK_MAX_CONCURRENT_SEARCHES,
+                 reserved_interactive: int = config.SPLUNK_INTERACTIVE_RESERVED,
+                 queue_limits: Dict[str, int] = config.SPLUNK_SEARCH_QUEUE_LIMITS,
+                 queue_timeout: float = config.SPLUNK_SEARCH_QUEUE_TIMEOUT):
+        """
+        Initialize the governor.
+
+        Args:
+            max_concurrent: Searches running on Splunk at once
+            reserved_interactive: Slots of max_concurrent only interactive searches may use
+            queue_limits: Priority class -> searches it may queue before new ones are rejected
+            queue_timeout: Seconds a search waits for a slot before it is rejected
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.reserved_interactive = min(max(0, reserved_interactive), self.max_concurrent - 1)
+        self.queue_timeout = queue_timeout
+        self.limit = self.max_concurrent
+        self.running = 0
+        self.quota_errors = 0
+
+        self._classes = OrderedDict((name, _PriorityClass(name, queue_limits.get(name, 100))) for name in PRIORITIES)
+        self._durations: Deque[float] = deque(maxlen=200)
+        self._last_limit_change = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, priority: str = PRIORITY_INTERACTIVE, group: Optional[str] = None) -> Iterator[float]:
+        """
+        Hold a search slot for the duration of a with block.
+
+        Args:
+            priority: Priority class of the search (see PRIORITIES)
+            group: What the search belongs to (e.g. a hunt ID); searches of a class are
+                admitted round-robin over their groups
+
+        Yields:
+            Seconds the search waited for its slot
+
+        Raises:
+            SearchRejected: If the class's queue is full or no slot freed up within queue_timeout
+        """
+        waited = self.acquire(priority, group)
+        start = time.time()
+        try:
+            yield waited
+        finally:
+            self.release(priority, time.time() - start)
+
+    def acquire(self, priority: str = PRIORITY_INTERACTIVE, group: Optional[str] = None) -> float:
+        """
+        Wait for a search slot; release it with release().
+
+        Args:
+            priority: Priority class of the search
+            group: What the search belongs to
+
+        Returns:
+            Seconds the search waited
+
+        Raises:
+            SearchRejected: If the class's queue is full or no slot freed up within queue_timeout
+        """
+        if priority not in self._classes:
+            raise ValueError(f"Unknown search priority {priority}; expected one of {', '.join(PRIORITIES)}")
+        ticket = _Ticket(priority, group or priority)
+        with self._lock:
+            priority_class = self._classes[priority]
+            if priority_class.queued >= priority_class.queue_limit:
+                priority_class.rejected += 1
+                raise SearchRejected(f"Too many {priority} searches queued ({priority_class.queued})",
+                                     self._retry_after())
+            priority_class.push(ticket)
+            self._grant()
+
+        if not ticket.event.wait(self.queue_timeout):
+            with self._lock:
+                if not ticket.granted:
+                    priority_class.remove(ticket)
+                    priority_class.timed_out += 1
+                    raise SearchRejected(f"No search slot became free within {self.queue_timeout}s "
+                                         f"for a {priority} search", self._retry_after())
+
+        waited = time.time() - ticket.queued_at
+        with self._lock:
+            priority_class.waits.append(waited)
+        if waited > 1:
+            logger.info(f"{priority.capitalize()} search waited {waited:.1f}s for a Splunk search slot")
+        return waited
+
+    def release(self, priority: str, duration: Optional[float] = None):
+        """
+        Free the slot of a finished search.
+
+        Args:
+            priority: Priority class the search was admitted in
+            duration: Seconds the search ran, for the retry estimates of rejected searches
+        """
+        with self._lock:
+            self.running -= 1
+            self._classes[priority].running -= 1
+            if duration is not None:
+                self._durations.append(duration)
+            self._grant()
+
+    def report_quota_error(self):
+        """Lower the limit by one search after Splunk refused a search for its concurrency quota"""
+        with self._lock:
+            self.quota_errors += 1
+            floor = self.reserved_interactive + 1
+            if self.limit > floor:
+                self.limit = max(floor, min(self.limit, self.running) - 1)
+                logger.warning(f"Splunk search quota reached, running at most {self.limit} searches")
+            self._last_limit_change = time.time()
+
+    def pressure(self, priority: str) -> float:
+        """
+        Get how full a priority class's queue is, for callers to slow down before being rejected.
+
+        Args:
+            priority: Priority class
+
+        Returns:
+            Queued searches as a fraction of the class's queue limit
+        """
+        with self._lock:
+            priority_class = self._classes[priority]
+            return priority_class.queued / max(1, priority_class.queue_limit)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the state of the governor.
+
+        Returns:
+            Dictionary with the current and configured limits, running searches, quota
+            errors and, per priority class, running and queued searches, admissions,
+            rejections and wait times
+        """
+        with self._lock:
+            return {
+                'limit': self.limit,
+                'max_concurrent': self.max_concurrent,
+                'reserved_interactive': self.reserved_interactive,
+                'running': self.running,
+                'queued': sum(priority_class.queued for priority_class in self._classes.values()),
+                'quota_errors': self.quota_errors,
+                'classes': {name: priority_class.stats() for name, priority_class in self._classes.items()},
+            }
+
+    def _has_slot(self, priority: str) -> bool:
+        """Check whether a search of a class may start now; the caller holds the lock"""
+        if self.running >= self.limit:
+            return False
+        if priority == PRIORITY_INTERACTIVE:
+            return True
+        # Other classes leave the reserved slots free, whatever interactive searches are running
+        interactive = self._classes[PRIORITY_INTERACTIVE].running
+        return self.running - interactive < self.limit - self.reserved_interactive
+
+    def _grant(self):
+        """Admit waiting searches while slots are free; the caller holds the lock"""
+        now = time.time()
+        if self.limit < self.max_concurrent and now - self._last_limit_change >= _QUOTA_RECOVERY_INTERVAL:
+            self.limit += 1
+            self._last_limit_change = now
+
+        while True:
+            waiting = next((priority_class for priority_class in self._classes.values() if priority_class.queued), None)
+            # Strict priority: lower classes never overtake a higher one waiting for a slot
+            if waiting is None or not self._has_slot(waiting.name):
+                return
+            ticket = waiting.pop()
+            ticket.granted = True
+            self.running += 1
+            waiting.running += 1
+            waiting.admitted += 1
+            ticket.event.set()
+
+    def _retry_after(self) -> int:
+        """Seconds until a rejected search is likely to get a slot; the caller holds the lock"""
+        average = sum(self._durations) / len(self._durations) if self._durations else 1.0
+        queued = sum(priority_class.queued for priority_class in self._classes.values())
+        return max(1, round(average * (queued + 1) / self.limit))
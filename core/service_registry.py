@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Service states reported by ServiceRegistry.status()
+PENDING = 'pending'
+BUILDING = 'building'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class _Service:
+    """Registration and build state of one service"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], warm: bool):
+        self.name = name
+        self.factory = factory
+        self.warm = warm
+        self.state = PENDING
+        self.instance = None
+        self.error = None
+        self.seconds = None
+        self.finished_at = None
+        self.lock = threading.Lock()
+
+
+class ServiceRegistry:
+    """Build application components on first use and track their readiness"""
+
+    def __init__(self, retry_interval: float = 30.0):
+        """
+        Initialize the registry.
+
+        Args:
+            retry_interval: Minimum seconds before a failed service is rebuilt, or a finished one
+                rebuilt by start(retry=True)
+        """
+        self.retry_interval = retry_interval
+        self._services: Dict[str, _Service] = {}
+        self._warm_thread = None
+
+    def register(self, name: str, factory: Callable[[], Any], warm: bool = True):
+        """
+        Register a service.
+
+        Args:
+            name: Service name
+            factory: Callable building the service; may get() other services
+            warm: Whether warm_up() builds the service ahead of its first use
+        """
+        self._services[name] = _Service(name, factory, warm)
+
+    def get(self, name: str) -> Any:
+        """
+        Get a service, building it in the calling thread on first use.
+
+        Args:
+            name: Service name
+
+        Returns:
+            The service instance
+
+        Raises:
+            KeyError: If no service is registered under the name
+            RuntimeError: If building the service failed
+        """
+        service = self._services[name]
+        if service.state == READY:
+            return service.instance
+
+        with service.lock:
+            if service.state == FAILED and time.time() - service.finished_at < self.retry_interval:
+                # Fail fast instead of repeating a slow failing build on every request
+                raise RuntimeError(f"Service {name} is unavailable: {service.error}")
+            if service.state != READY:
+                self._build(service)
+
+        if service.state != READY:
+            raise RuntimeError(f"Service {name} is unavailable: {service.error}")
+        return service.instance
+
+    def _build(self, service: _Service):
+        """Run a service factory; the caller holds the service lock"""
+        service.state = BUILDING
+        start = time.perf_counter()
+        try:
+            service.instance = service.factory()
+            service.state = READY
+            service.error = None
+        except Exception as e:
+            logger.error(f"Error initializing {service.name}: {str(e)}")
+            service.state = FAILED
+            service.error = str(e)
+        service.seconds = time.perf_counter() - start
+        service.finished_at = time.time()
+        if service.state == READY:
+            logger.info(f"Initialized {service.name} in {service.seconds:.2f}s")
+
+    def start(self, name: str, retry: bool = False) -> bool:
+        """
+        Build a service in a background thread without waiting for it.
+
+        Args:
+            name: Service name
+            retry: Rebuild a service that already finished, at most once per retry_interval
+
+        Returns:
+            True if a background build was started
+        """
+        service = self._services[name]
+        if service.state == BUILDING:
+            return False
+        if service.state != PENDING:
+            if not retry or time.time() - (service.finished_at or 0) < self.retry_interval:
+                return False
+
+        def build():
+            # Another thread may have started building meanwhile
+            if not service.lock.acquire(blocking=False):
+                return
+            try:
+                self._build(service)
+            finally:
+                service.lock.release()
+
+        threading.Thread(target=build, name=f"init-{name}", daemon=True).start()
+        return True
+
+    def warm_up(self, names: Optional[List[str]] = None) -> threading.Thread:
+        """
+        Build services ahead of their first use in a background daemon thread.
+
+        Args:
+            names: Services to build, in order (defaults to all services registered with warm=True)
+
+        Returns:
+            The warm-up thread
+        """
+        if names is None:
+            names = [name for name, service in self._services.items() if service.warm]
+
+        def warm():
+            start = time.perf_counter()
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    pass  # Already logged and reported through status()
+            logger.info(f"Service warm-up finished in {time.perf_counter() - start:.2f}s")
+
+        self._warm_thread = threading.Thread(target=warm, name="service-warm-up", daemon=True)
+        self._warm_thread.start()
+        return self._warm_thread
+
+    def is_ready(self, name: str) -> bool:
+        """Check whether a service has been built"""
+        return self._services[name].state == READY
+
+    def ready(self) -> bool:
+        """Check whether every warm service has been built"""
+        return all(service.state == READY for service in self._services.values() if service.warm)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the state of every service.
+
+        Returns:
+            Dictionary mapping service names to their state, build time and error
+        """
+        return {
+            name: {
+                'state': service.state,
+                'seconds': round(service.seconds, 3) if service.seconds is not None else None,
+                'error': service.error,
+            }
+            for name, service in self._services.items()
+        }
+
+    def proxy(self, name: str) -> 'ServiceProxy':
+        """
+        Get a stand-in that builds the service on first attribute access.
+
+        Args:
+            name: Service name
+
+        Returns:
+            ServiceProxy forwarding to the service
+        """
+        return ServiceProxy(self, name)
+
+
+class ServiceProxy:
+    """Module-level stand-in for a lazily built service, forwarding attribute access to it"""
+
+    __slots__ = ('_registry', '_name')
+
+    def __init__(self, registry: ServiceRegistry, name: str):
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._registry.get(self._name), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self._registry.get(self._name), attr, value)
+
+    def __repr__(self) -> str:
+        return f"<ServiceProxy {self._name} ({self._registry.status()[self._name]['state']})>"
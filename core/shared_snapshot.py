@@ -0,0 +1,227 @@
+import io
+import logging
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the layout or the content of the snapshot state changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+# File layout: magic, header (format version, state offset, state length), out-of-band
+# data (rule cache blobs and numpy array buffers, each aligned), then the pickled state.
+# The state refers to the out-of-band data by offset, so attaching maps it without copying.
+_MAGIC = b"HNTSNAP\0"
+_HEADER = struct.Struct("<HQQ")
+_ALIGNMENT = 64
+
+# Arrays smaller than this are cheaper to pickle inline than to map
+_MIN_SHARED_ARRAY_BYTES = 4096
+
+
+class SharedSnapshot:
+    """
+    Read-only snapshot of rules, ATT&CK techniques and the TF-IDF model in a memory-mapped file.
+
+    One process builds the snapshot with build_shared_snapshot(); every worker process
+    attaches to the same file. Rule bodies and TF-IDF arrays stay in the mapped file,
+    so their pages are shared between workers instead of being rebuilt in each one.
+    """
+
+    def __init__(self, snapshot_file: str = config.SHARED_SNAPSHOT_FILE):
+        """
+        Attach to a snapshot file.
+
+        Args:
+            snapshot_file: Path to a file written by build_shared_snapshot()
+
+        Raises:
+            ValueError: If the file is not a snapshot or was written by another format version
+        """
+        self.snapshot_file = snapshot_file
+
+        with open(snapshot_file, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        if self._view[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{snapshot_file} is not a shared snapshot")
+
+        version, state_offset, state_length = _HEADER.unpack_from(self._view, len(_MAGIC))
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Shared snapshot format {version} is not supported")
+
+        state = self._view[state_offset:state_offset + state_length]
+        self._state: Dict[str, Any] = _SnapshotUnpickler(io.BytesIO(state), self).load()
+        logger.info(f"Attached to shared snapshot {snapshot_file} built at "
+                    f"{time.ctime(self._state['created'])}")
+
+    @classmethod
+    def open(cls, snapshot_file: str = config.SHARED_SNAPSHOT_FILE) -> Optional['SharedSnapshot']:
+        """
+        Attach to a snapshot file if it exists and is valid.
+
+        Args:
+            snapshot_file: Path to the snapshot file
+
+        Returns:
+            SharedSnapshot instance, or None if the snapshot cannot be used
+        """
+        if not os.path.exists(snapshot_file):
+            return None
+
+        try:
+            return cls(snapshot_file)
+        except Exception as e:
+            logger.warning(f"Cannot attach to shared snapshot {snapshot_file} ({str(e)}), building components locally")
+            return None
+
+    @property
+    def created(self) -> float:
+        """Time the snapshot was built"""
+        return self._state['created']
+
+    @property
+    def mitre(self) -> Optional[Dict[str, Any]]:
+        """Parsed ATT&CK data: {'tactics': {...}, 'techniques': {...}}"""
+        return self._state.get('mitre')
+
+    @property
+    def rules(self):
+        """RuleSnapshot of the Sigma rules and their indexes"""
+        return self._state.get('rules')
+
+    @property
+    def ttp(self) -> Optional[Dict[str, Any]]:
+        """Fitted TF-IDF model: {'vectorizer': ..., 'technique_matrix': ..., 'technique_ids': [...]}"""
+        return self._state.get('ttp')
+
+    def _buffer(self, offset: int, length: int) -> memoryview:
+        """Slice of the mapped file"""
+        return self._view[offset:offset + length]
+
+
+def build_shared_snapshot(snapshot_file: str = config.SHARED_SNAPSHOT_FILE,
+                          mitre_parser=None, sigma_loader=None, ttp_mapper=None) -> bool:
+    """
+    Write a snapshot of fully initialized components for worker processes to attach to.
+
+    Args:
+        snapshot_file: Path to write the snapshot to
+        mitre_parser: MitreAttackParser whose tactics and techniques to include
+        sigma_loader: SigmaLoader whose current rule snapshot to include
+        ttp_mapper: TTPMapper whose fitted TF-IDF model to include
+
+    Returns:
+        True if the snapshot was written
+    """
+    state = {'created': time.time()}
+    if mitre_parser is not None:
+        state['mitre'] = {'tactics': mitre_parser._tactics, 'techniques': mitre_parser._techniques}
+    if sigma_loader is not None:
+        state['rules'] = sigma_loader.snapshot
+    if ttp_mapper is not None:
+        state['ttp'] = {
+            'vectorizer': ttp_mapper.vectorizer,
+            'technique_matrix': ttp_mapper.technique_matrix,
+            'technique_ids': ttp_mapper.technique_ids,
+        }
+
+    try:
+        snapshot_dir = os.path.dirname(snapshot_file)
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+        # Write to a temporary file first so attaching workers never see a partial snapshot
+        fd, tmp_path = tempfile.mkstemp(dir=snapshot_dir, prefix=".shared_snapshot_")
+        try:
+            with os.fdopen(fd, 'w+b') as f:
+                f.write(_MAGIC)
+                f.write(_HEADER.pack(SNAPSHOT_FORMAT_VERSION, 0, 0))
+
+                state_buffer = io.BytesIO()
+                _SnapshotPickler(state_buffer, f).dump(state)
+
+                state_offset = f.tell()
+                f.write(state_buffer.getbuffer())
+                f.seek(len(_MAGIC))
+                f.write(_HEADER.pack(SNAPSHOT_FORMAT_VERSION, state_offset, state_buffer.tell()))
+            os.replace(tmp_path, snapshot_file)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+        logger.info(f"Wrote shared snapshot to {snapshot_file} ({os.path.getsize(snapshot_file)} bytes)")
+        return True
+    except Exception as e:
+        logger.error(f"Error writing shared snapshot: {str(e)}")
+        return False
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """Pickler moving rule cache blobs and large numpy buffers out of band into the snapshot file"""
+
+    def __init__(self, state_file, data_file):
+        super().__init__(state_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._data_file = data_file
+        self._written: Dict[int, Any] = {}  # id(obj) -> persistent ID, objects shared by many records
+
+    def persistent_id(self, obj: Any) -> Optional[tuple]:
+        if isinstance(obj, memoryview):
+            kind = 'blob'
+        elif type(obj).__module__ == 'numpy' and type(obj).__name__ == 'ndarray':
+            if obj.dtype.hasobject or obj.nbytes < _MIN_SHARED_ARRAY_BYTES:
+                return None
+            kind = 'array'
+        else:
+            return None
+
+        pid = self._written.get(id(obj))
+        if pid is not None:
+            return pid[1]
+
+        offset = self._write_aligned(obj if kind == 'blob' else obj.tobytes(order='C'))
+        if kind == 'blob':
+            pid = ('blob', offset, obj.nbytes)
+        else:
+            pid = ('array', offset, obj.dtype.str, obj.shape)
+        # Keep obj referenced so its id() is not reused while pickling
+        self._written[id(obj)] = (obj, pid)
+        return pid
+
+    def _write_aligned(self, data) -> int:
+        """Append data at the next aligned offset of the data file"""
+        offset = self._data_file.tell()
+        padding = -offset % _ALIGNMENT
+        if padding:
+            self._data_file.write(b"\0" * padding)
+            offset += padding
+        self._data_file.write(data)
+        return offset
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """Unpickler resolving out-of-band data to zero-copy views of the mapped snapshot file"""
+
+    def __init__(self, state_file, snapshot: SharedSnapshot):
+        super().__init__(state_file)
+        self._snapshot = snapshot
+
+    def persistent_load(self, pid: tuple) -> Any:
+        kind, offset = pid[0], pid[1]
+        if kind == 'blob':
+            return self._snapshot._buffer(offset, pid[2])
+        if kind == 'array':
+            import numpy as np
+            dtype, shape = np.dtype(pid[2]), pid[3]
+            count = 1
+            for dim in shape:
+                count *= dim
+            return np.frombuffer(self._snapshot._map, dtype=dtype, count=count, offset=offset).reshape(shape)
+        raise pickle.UnpicklingError(f"Unknown persistent ID type: {kind}")
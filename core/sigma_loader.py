@@ -1,27 +1,215 @@
+import atexit
 import glob
 import logging
 import os
+import threading
 import yaml
-from typing import Dict, List, Optional, Union, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union, Any, Tuple
 
 import config
+from core.conversion_cache import ConversionCache
+from core.rule_cache import RuleCache
+from core.rule_index import RuleAttributeIndex, RuleSearchIndex
+from core.rule_model import RuleRecord
+from core.rule_watcher import RuleDirectoryWatcher
 
 logger = logging.getLogger(__name__)
 
+# Prefer the libyaml C loader when PyYAML was built against it
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Below this many files to parse, process pool startup costs more than it saves
+PARALLEL_PARSE_THRESHOLD = 200
+PARALLEL_PARSE_CHUNK_SIZE = 64
+PARALLEL_CONVERT_THRESHOLD = 50
+
+class RuleSnapshot:
+    """
+    Consistent view of the loaded rules and their indexes.
+    
+    A published snapshot is never modified; updates build a copy and swap it in,
+    so readers holding a reference always see complete indexes.
+    """
+    
+    def __init__(self):
+        """Initialize an empty snapshot"""
+        self.rules = {}  # Dictionary of compact rule records by ID
+        self.rules_by_technique = {}  # Dictionary of rules by MITRE technique ID
+        self.file_rules = {}  # Rule file path -> IDs of the rules it defines
+        self.search_index = RuleSearchIndex()  # Full-text index used by search_rules
+        self.attribute_index = RuleAttributeIndex()  # Logsource/level/status/author/field indexes
+        self.version = 0
+    
+    def copy(self) -> 'RuleSnapshot':
+        """
+        Copy the snapshot so the copy can be updated.
+        
+        Returns:
+            New unpublished snapshot with the next version number
+        """
+        clone = RuleSnapshot.__new__(RuleSnapshot)
+        clone.rules = dict(self.rules)
+        clone.rules_by_technique = {tid: list(ids) for tid, ids in self.rules_by_technique.items()}
+        clone.file_rules = dict(self.file_rules)
+        clone.search_index = self.search_index.copy()
+        clone.attribute_index = self.attribute_index.copy()
+        clone.version = self.version + 1
+        return clone
+    
+    def add_rule(self, rule: Dict[str, Any], file_path: str,
+                 technique_ids: Optional[List[str]] = None,
+                 blob: Optional[Any] = None, position: int = 0) -> Optional[str]:
+        """
+        Add a single Sigma rule to the collections and indexes.
+        
+        Args:
+            rule: The rule dictionary
+            file_path: Path to the file containing the rule
+            technique_ids: Technique IDs already extracted from the rule's tags
+            blob: Rule cache blob of the file, so the rule body can be dropped from memory
+            position: Index of the rule within the file
+        
+        Returns:
+            The rule ID, or None if the rule has no ID
+        """
+        rule_id = rule.get('id')
+        if not rule_id:
+            logger.warning(f"Sigma rule without ID found in {file_path}, skipping")
+            return None
+        
+        # A later file redefining the ID replaces the earlier rule
+        if rule_id in self.rules:
+            self.remove_rule(rule_id)
+        
+        # Index the full rule, then keep only its compact record
+        self.rules[rule_id] = RuleRecord(rule, file_path, blob, position)
+        self.search_index.add_rule(rule_id, rule)
+        self.attribute_index.add_rule(rule_id, rule)
+        self.file_rules[file_path] = self.file_rules.get(file_path, ()) + (rule_id,)
+        
+        if technique_ids is None:
+            technique_ids = extract_technique_ids(rule)
+        
+        # Add to technique-indexed collection
+        for technique_id in technique_ids:
+            if technique_id not in self.rules_by_technique:
+                self.rules_by_technique[technique_id] = []
+            self.rules_by_technique[technique_id].append(rule_id)
+        
+        return rule_id
+    
+    def remove_rule(self, rule_id: str) -> Optional[RuleRecord]:
+        """
+        Remove a rule from the collections and indexes.
+        
+        Args:
+            rule_id: The rule ID
+        
+        Returns:
+            The removed rule record, or None if it was not loaded
+        """
+        record = self.rules.pop(rule_id, None)
+        if record is None:
+            return None
+        
+        self.search_index.remove_rule(rule_id)
+        self.attribute_index.remove_rule(rule_id)
+        
+        for technique_id in extract_technique_ids(record.view()):
+            rule_ids = self.rules_by_technique.get(technique_id)
+            if rule_ids and rule_id in rule_ids:
+                rule_ids.remove(rule_id)
+                if not rule_ids:
+                    del self.rules_by_technique[technique_id]
+        
+        file_path = record.file_path
+        remaining = tuple(rid for rid in self.file_rules.get(file_path, ()) if rid != rule_id)
+        if remaining:
+            self.file_rules[file_path] = remaining
+        else:
+            self.file_rules.pop(file_path, None)
+        
+        return record
+    
+    def remove_file(self, file_path: str) -> List[RuleRecord]:
+        """
+        Remove all rules defined by a rule file.
+        
+        Args:
+            file_path: Path to the rule file
+        
+        Returns:
+            List of removed rule records
+        """
+        removed = []
+        for rule_id in self.file_rules.get(file_path, ()):
+            record = self.remove_rule(rule_id)
+            if record is not None:
+                removed.append(record)
+        return removed
+
+
 class SigmaLoader:
     """Load and manage Sigma rules"""
     
-    def __init__(self, rules_dir: str = config.SIGMA_RULES_DIR):
+    def __init__(self, rules_dir: str = config.SIGMA_RULES_DIR,
+                 cache_file: Optional[str] = config.SIGMA_RULE_CACHE_FILE,
+                 workers: int = config.SIGMA_LOAD_WORKERS,
+                 conversion_cache_file: Optional[str] = config.SPL_CACHE_FILE,
+                 rule_snapshot: Optional[RuleSnapshot] = None):
         """
         Initialize the Sigma rule loader.
         
         Args:
             rules_dir: Directory containing Sigma rule YAML files
+            cache_file: Path to the parsed rule cache, or None to always parse from YAML
+            workers: Number of worker processes used to parse rule files (1 disables parallel parsing)
+            conversion_cache_file: Path to the SPL conversion cache, or None to convert on every call
+            rule_snapshot: Already built rules (e.g. from a SharedSnapshot) to use instead of loading rules_dir
         """
         self.rules_dir = rules_dir
-        self.rules = {}  # Dictionary of rules by ID
-        self.rules_by_technique = {}  # Dictionary of rules by MITRE technique ID
-        self._load_rules()
+        self.cache_file = cache_file
+        self.workers = workers
+        self._snapshot = RuleSnapshot()  # Replaced as a whole, never modified once published
+        self._update_lock = threading.Lock()  # Serializes snapshot updates
+        self._rule_cache = None
+        self._watcher = None
+        self.conversion_cache = None
+        if conversion_cache_file:
+            self.conversion_cache = ConversionCache(conversion_cache_file)
+            atexit.register(self.conversion_cache.save)
+        
+        if rule_snapshot is not None:
+            self._snapshot = rule_snapshot
+            logger.info(f"Using {len(rule_snapshot.rules)} preloaded Sigma rules")
+        else:
+            self._load_rules()
+    
+    @property
+    def snapshot(self) -> RuleSnapshot:
+        """Current rule snapshot; hold on to it to read several indexes consistently"""
+        return self._snapshot
+    
+    @property
+    def rules(self) -> Dict[str, RuleRecord]:
+        """Dictionary of compact rule records by ID (use get_rule_by_id for dictionary views)"""
+        return self._snapshot.rules
+    
+    @property
+    def rules_by_technique(self) -> Dict[str, List[str]]:
+        """Dictionary of rule IDs by MITRE technique ID"""
+        return self._snapshot.rules_by_technique
+    
+    @property
+    def search_index(self) -> RuleSearchIndex:
+        """Full-text index used by search_rules"""
+        return self._snapshot.search_index
+    
+    @property
+    def attribute_index(self) -> RuleAttributeIndex:
+        """Logsource/level/status/author/field indexes"""
+        return self._snapshot.attribute_index
     
     def _load_rules(self):
         """Load all Sigma rules from the rules directory"""
@@ -32,72 +220,91 @@ class SigmaLoader:
         rule_files = glob.glob(os.path.join(self.rules_dir, "**/*.yml"), recursive=True)
         rule_files.extend(glob.glob(os.path.join(self.rules_dir, "**/*.yaml"), recursive=True))
         
+        # Reuse previously parsed files whose path, mtime, size or content hash are unchanged
+        if self.cache_file:
+            self._rule_cache = RuleCache(self.cache_file)
+            self._rule_cache.load()
+        
+        indexed_files = self._read_rule_files(rule_files)
+        
+        # Merge in glob order so duplicate rule IDs resolve the same way regardless of worker count
+        snapshot = RuleSnapshot()
         rules_count = 0
         for file_path in rule_files:
+            blob = self._rule_cache.get_blob(file_path) if self._rule_cache is not None else None
+            for position, (rule, technique_ids) in enumerate(indexed_files.get(file_path, [])):
+                snapshot.add_rule(rule, file_path, technique_ids, blob, position)
+                rules_count += 1
+        self._snapshot = snapshot
+        
+        if self._rule_cache is not None:
+            self._rule_cache.prune(rule_files, self.rules_dir)
+            self._rule_cache.save()
+            logger.info(f"Sigma rule cache: {self._rule_cache.hits} files reused, "
+                        f"{self._rule_cache.misses} parsed")
+        
+        logger.info(f"Loaded {rules_count} Sigma rules from {len(rule_files)} files")
+    
+    def _read_rule_files(self, rule_files: List[str]) -> Dict[str, List[Tuple[Dict[str, Any], List[str]]]]:
+        """
+        Read rule files through the rule cache, parsing the ones that changed.
+        
+        Args:
+            rule_files: Paths of the rule files to read
+        
+        Returns:
+            Dictionary mapping file paths to lists of (rule, technique IDs); unreadable files are left out
+        """
+        rule_cache = self._rule_cache
+        indexed_files = {}  # file path -> list of (rule, technique IDs)
+        pending = []  # (file path, raw bytes or None) still to be parsed
+        stats = {}
+        for file_path in rule_files:
+            if rule_cache is None:
+                pending.append((file_path, None))
+                continue
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    rule_content = yaml.safe_load(f)
-                
-                # Handle both single rules and rule collections
-                if rule_content.get('type') == 'group':
-                    # It's a rule collection
-                    for rule in rule_content.get('rules', []):
-                        self._process_rule(rule, file_path)
-                        rules_count += 1
+                stats[file_path] = os.stat(file_path)
+                rule_content, raw = rule_cache.lookup(file_path, stats[file_path])
+                if rule_content is None:
+                    pending.append((file_path, raw))
                 else:
-                    # It's a single rule
-                    self._process_rule(rule_content, file_path)
-                    rules_count += 1
-            
+                    indexed_files[file_path] = _index_rule_content(rule_content)
             except Exception as e:
                 logger.error(f"Error loading Sigma rule from {file_path}: {str(e)}")
         
-        logger.info(f"Loaded {rules_count} Sigma rules from {len(rule_files)} files")
+        raw_by_path = dict(pending)
+        for file_path, rule_content, indexed, error in self._parse_rule_files(pending):
+            if error is not None:
+                logger.error(f"Error loading Sigma rule from {file_path}: {error}")
+                continue
+            if rule_cache is not None:
+                rule_cache.store(file_path, stats[file_path], raw_by_path[file_path], rule_content)
+            indexed_files[file_path] = indexed
+        
+        return indexed_files
     
-    def _process_rule(self, rule: Dict[str, Any], file_path: str):
+    def _parse_rule_files(self, pending: List[Tuple[str, Optional[bytes]]]) -> List[Tuple[str, Any, Any, Optional[str]]]:
         """
-        Process a single Sigma rule and add it to our collections.
+        Parse rule files, spreading the work over a process pool for large batches.
         
         Args:
-            rule: The rule dictionary
-            file_path: Path to the file containing the rule
+            pending: List of (file path, raw bytes or None to read the file) tuples
+        
+        Returns:
+            List of (file path, parsed content, indexed rules, error) tuples in input order
         """
-        rule_id = rule.get('id')
-        if not rule_id:
-            logger.warning(f"Sigma rule without ID found in {file_path}, skipping")
-            return
-        
-        # Add source file path to the rule
-        rule['file_path'] = file_path
-        
-        # Store rule by ID
-        self.rules[rule_id] = rule
-        
-        # Process MITRE ATT&CK tags
-        tags = rule.get('tags', [])
-        if not isinstance(tags, list):
-            tags = [tags]  # Convert single tag to list
-        
-        # Extract MITRE technique IDs
-        for tag in tags:
-            if isinstance(tag, str) and tag.startswith('attack.t'):
-                # Extract technique ID, handling both formats:
-                # - attack.t1234
-                # - attack.t1234.001
-                technique_parts = tag.split('.')
-                if len(technique_parts) >= 2:
-                    technique_base = technique_parts[1].upper()
-                    if technique_base.startswith('T'):
-                        # Form full technique ID
-                        if len(technique_parts) >= 3:
-                            technique_id = f"{technique_base}.{technique_parts[2]}"
-                        else:
-                            technique_id = technique_base
-                        
-                        # Add to technique-indexed collection
-                        if technique_id not in self.rules_by_technique:
-                            self.rules_by_technique[technique_id] = []
-                        self.rules_by_technique[technique_id].append(rule_id)
+        if self.workers > 1 and len(pending) >= PARALLEL_PARSE_THRESHOLD:
+            chunks = [pending[i:i + PARALLEL_PARSE_CHUNK_SIZE]
+                      for i in range(0, len(pending), PARALLEL_PARSE_CHUNK_SIZE)]
+            try:
+                logger.info(f"Parsing {len(pending)} Sigma rule files with {self.workers} worker processes")
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    return [item for batch in pool.map(_parse_rule_batch, chunks) for item in batch]
+            except Exception as e:
+                logger.warning(f"Parallel rule parsing failed ({str(e)}), falling back to sequential parsing")
+        
+        return _parse_rule_batch(pending)
     
     def get_rule_by_id(self, rule_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -107,9 +314,10 @@ class SigmaLoader:
             rule_id: The rule ID
         
         Returns:
-            Rule dictionary or None if not found
+            Read-only rule dictionary view or None if not found
         """
-        return self.rules.get(rule_id)
+        record = self._snapshot.rules.get(rule_id)
+        return record.view() if record is not None else None
     
     def get_rules_by_technique(self, technique_id: str) -> List[Dict[str, Any]]:
         """
@@ -121,68 +329,158 @@ class SigmaLoader:
         Returns:
             List of matching rule dictionaries
         """
-        rule_ids = self.rules_by_technique.get(technique_id, [])
-        return [self.rules[rid] for rid in rule_ids if rid in self.rules]
+        snapshot = self._snapshot
+        rule_ids = snapshot.rules_by_technique.get(technique_id, [])
+        return [snapshot.rules[rid].view() for rid in rule_ids if rid in snapshot.rules]
     
-    def search_rules(self, query: str) -> List[Dict[str, Any]]:
+    def get_rule_ids_by_techniques(self, technique_ids: List[str]) -> List[str]:
         """
-        Search for Sigma rules by title, description, or content.
+        Get the IDs of all Sigma rules for several MITRE techniques, without duplicates.
+        
+        Args:
+            technique_ids: MITRE ATT&CK technique IDs
+        
+        Returns:
+            List of rule IDs in technique order
+        """
+        snapshot = self._snapshot
+        rule_ids = {}
+        for technique_id in technique_ids:
+            for rule_id in snapshot.rules_by_technique.get(technique_id, []):
+                if rule_id in snapshot.rules:
+                    rule_ids[rule_id] = None
+        return list(rule_ids)
+    
+    def search_rules(self, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Search for Sigma rules by title, description, tags, logsource or detection content.
+        
+        Terms can be scoped to a part of the rule, e.g. "field:CommandLine" or
+        "logsource:windows"; unscoped terms match any part, including prefixes
+        and substrings of indexed words.
         
         Args:
             query: Search string
+            limit: Maximum number of rules to return
+        
+        Returns:
+            List of matching rule dictionaries, best match first
+        """
+        snapshot = self._snapshot
+        return [snapshot.rules[rule_id].view() for rule_id, _ in snapshot.search_index.search(query, limit)
+                if rule_id in snapshot.rules]
+    
+    def find_rule_ids(self, product: Optional[Union[str, List[str]]] = None,
+                      category: Optional[Union[str, List[str]]] = None,
+                      service: Optional[Union[str, List[str]]] = None,
+                      level: Optional[Union[str, List[str]]] = None,
+                      status: Optional[Union[str, List[str]]] = None,
+                      author: Optional[Union[str, List[str]]] = None,
+                      fields: Optional[Union[str, List[str]]] = None) -> List[str]:
+        """
+        Find rules by logsource, level, status, author and detection fields using the attribute indexes.
+        
+        Each filter takes a value or a list of values; a rule matches a filter if it has any
+        of the values, except for fields where it must reference all of them. Filters are
+        combined with AND, e.g. product="windows", category="process_creation",
+        level=["high", "critical"], status="stable", fields="CommandLine".
+        
+        Returns:
+            List of matching rule IDs in load order
+        """
+        return self._snapshot.attribute_index.find(product=product, category=category, service=service,
+                                                   level=level, status=status, author=author, field=fields)
+    
+    def find_rules(self, **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Find rules by attribute filters (see find_rule_ids).
         
         Returns:
             List of matching rule dictionaries
         """
-        query = query.lower()
-        results = []
+        snapshot = self._snapshot
+        rule_ids = self.find_rule_ids(**filters)
+        return [snapshot.rules[rule_id].view() for rule_id in rule_ids if rule_id in snapshot.rules]
+    
+    def get_rule_fields(self, rule_id: str) -> List[str]:
+        """
+        Get the detection field names a rule references, without value modifiers.
         
-        for rule in self.rules.values():
-            if (query in rule.get('title', '').lower() or
-                query in rule.get('description', '').lower() or
-                any(query in str(detection).lower() for detection in rule.get('detection', {}).values())):
-                results.append(rule)
+        Args:
+            rule_id: The rule ID
         
-        return results
+        Returns:
+            List of field names
+        """
+        return list(self.attribute_index.get_fields(rule_id))
     
     def get_all_rules(self) -> List[Dict[str, Any]]:
         """
         Get all loaded Sigma rules.
         
         Returns:
-            List of all rule dictionaries
+            List of read-only rule dictionary views
         """
-        return list(self.rules.values())
+        return [record.view() for record in self._snapshot.rules.values()]
     
-    def convert_rule_to_splunk(self, rule_id: str) -> Optional[str]:
+    def convert_rule_to_splunk(self, rule_id: str, use_cache: bool = True) -> Optional[str]:
         """
         Convert a Sigma rule to Splunk SPL query.
         
         Args:
             rule_id: The rule ID
+            use_cache: Whether to serve and store the conversion through the SPL cache
         
         Returns:
             Splunk SPL query string or None if conversion failed
         """
+        rule_dict = self.get_rule_by_id(rule_id)
+        if not rule_dict:
+            logger.warning(f"Rule with ID {rule_id} not found")
+            return None
+        
+        cache_key = None
+        if use_cache and self.conversion_cache is not None:
+            cache_key = self.conversion_cache.key_for(rule_dict)
+            hit, query = self.conversion_cache.get(cache_key)
+            if hit:
+                return query
+        
         try:
             import sigma
             from sigma.backends.splunk import SplunkBackend
-            from sigma.collection import SigmaCollection
-            from sigma.rule import SigmaRule
         except ImportError:
             logger.error("pySigma and required backends are not installed")
             return None
         
-        rule_dict = self.get_rule_by_id(rule_id)
-        if not rule_dict:
-            logger.warning(f"Rule with ID {rule_id} not found")
-            return None
+        query, error = self._convert_rule_dict(rule_id, rule_dict, SplunkBackend())
+        
+        if cache_key is not None:
+            self.conversion_cache.put(cache_key, query, error)
+            self.conversion_cache.save_if_due()
+        
+        return query
+    
+    def _convert_rule_dict(self, rule_id: str, rule_dict: Dict[str, Any], backend) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Run a rule dictionary through the pySigma conversion pipeline.
+        
+        Args:
+            rule_id: The rule ID
+            rule_dict: The rule dictionary
+            backend: pySigma Splunk backend instance to convert with
+        
+        Returns:
+            Tuple of (Splunk SPL query or None, error message or None)
+        """
+        from sigma.collection import SigmaCollection
+        from sigma.rule import SigmaRule
         
         try:
             # Convert rule dictionary to SigmaRule
             # First, make a deep copy to avoid modifying the original
             import copy
-            rule_copy = copy.deepcopy(rule_dict)
+            rule_copy = copy.deepcopy(dict(rule_dict))
             
             # Create a SigmaRule object from the dict
             try:
@@ -199,26 +497,172 @@ class SigmaLoader:
                 yaml_str = yaml.dump(rule_copy)
                 sigma_collection = SigmaCollection.from_yaml(io.StringIO(yaml_str))
             
-            # Create Splunk backend
-            backend = SplunkBackend()
-            
             # Convert to Splunk query
             query_list = backend.convert(sigma_collection)
             
             # Return the first query
             if query_list and len(query_list) > 0:
-                return query_list[0]
+                return query_list[0], None
             else:
                 logger.warning(f"No query generated for rule {rule_id}")
-                return None
+                return None, "No query generated"
                 
         except Exception as e:
             logger.error(f"Error converting Sigma rule {rule_id} to Splunk query: {str(e)}")
-            return None
+            return None, str(e)
+    
+    def convert_rules_to_splunk(self, rule_ids: List[str], workers: int = config.SIGMA_CONVERT_WORKERS,
+                                use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Convert many Sigma rules to Splunk SPL in one batch.
+        
+        Rules missing from the SPL cache are converted in a single SigmaCollection
+        with one reused backend, optionally split across worker processes.
+        
+        Args:
+            rule_ids: Rule IDs to convert
+            workers: Number of worker processes for large batches (1 converts in-process)
+            use_cache: Whether to serve and store conversions through the SPL cache
+        
+        Returns:
+            Dictionary with 'queries' (rule ID -> SPL) and 'errors' (rule ID -> error message)
+        """
+        queries = {}
+        errors = {}
+        
+        pending = []  # (rule ID, rule dict, cache key)
+        for rule_id in dict.fromkeys(rule_ids):
+            rule_dict = self.get_rule_by_id(rule_id)
+            if not rule_dict:
+                errors[rule_id] = f"Rule {rule_id} not found"
+                continue
+            
+            cache_key = None
+            if use_cache and self.conversion_cache is not None:
+                cache_key = self.conversion_cache.key_for(rule_dict)
+                hit, query = self.conversion_cache.get(cache_key)
+                if hit:
+                    if query:
+                        queries[rule_id] = query
+                    else:
+                        errors[rule_id] = "Failed to convert rule to Splunk query"
+                    continue
+            
+            pending.append((rule_id, rule_dict, cache_key))
+        
+        if not pending:
+            return {'queries': queries, 'errors': errors}
+        
+        try:
+            import sigma
+            from sigma.backends.splunk import SplunkBackend
+        except ImportError:
+            logger.error("pySigma and required backends are not installed")
+            for rule_id, _, _ in pending:
+                errors[rule_id] = "pySigma and required backends are not installed"
+            return {'queries': queries, 'errors': errors}
+        
+        # Plain dicts, so the rules can be sent to worker processes
+        items = [(rule_id, dict(rule_dict)) for rule_id, rule_dict, _ in pending]
+        converted = None
+        if workers > 1 and len(items) >= PARALLEL_CONVERT_THRESHOLD:
+            chunk_size = -(-len(items) // workers)
+            chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+            try:
+                logger.info(f"Converting {len(items)} Sigma rules with {workers} worker processes")
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    converted = [item for batch in pool.map(_convert_rule_batch, chunks) for item in batch]
+            except Exception as e:
+                logger.warning(f"Parallel rule conversion failed ({str(e)}), converting in-process")
+        if converted is None:
+            converted = _convert_rule_batch(items)
+        
+        cache_keys = {rule_id: cache_key for rule_id, _, cache_key in pending}
+        for rule_id, query, error in converted:
+            if query:
+                queries[rule_id] = query
+            else:
+                errors[rule_id] = error or "Failed to convert rule to Splunk query"
+            if cache_keys.get(rule_id) is not None:
+                self.conversion_cache.put(cache_keys[rule_id], query, error)
+        
+        if self.conversion_cache is not None:
+            self.conversion_cache.save_if_due()
+        
+        logger.info(f"Converted {len(rule_ids)} Sigma rules: {len(queries)} queries, {len(errors)} errors "
+                    f"({len(pending)} not cached)")
+        return {'queries': queries, 'errors': errors}
+    
+    def convert_technique_to_splunk(self, technique_id: str, **kwargs) -> Dict[str, Dict[str, Any]]:
+        """
+        Convert all Sigma rules for a MITRE technique to Splunk SPL in one batch.
+        
+        Args:
+            technique_id: MITRE ATT&CK technique ID (e.g., T1059.001)
+            **kwargs: Passed through to convert_rules_to_splunk
+        
+        Returns:
+            Dictionary with 'queries' and 'errors', keyed by rule ID
+        """
+        return self.convert_rules_to_splunk(self.get_rule_ids_by_techniques([technique_id]), **kwargs)
+    
+    def convert_tactic_to_splunk(self, technique_ids: List[str], **kwargs) -> Dict[str, Dict[str, Any]]:
+        """
+        Convert all Sigma rules for the techniques of a MITRE tactic to Splunk SPL in one batch.
+        
+        Args:
+            technique_ids: IDs of the techniques belonging to the tactic
+            **kwargs: Passed through to convert_rules_to_splunk
+        
+        Returns:
+            Dictionary with 'queries' and 'errors', keyed by rule ID
+        """
+        return self.convert_rules_to_splunk(self.get_rule_ids_by_techniques(technique_ids), **kwargs)
+    
+    def precompile_rules(self, rule_ids: Optional[List[str]] = None,
+                         workers: int = config.SIGMA_CONVERT_WORKERS) -> Dict[str, int]:
+        """
+        Convert rules ahead of time so hunts are served from the SPL cache.
+        
+        Args:
+            rule_ids: Rule IDs to precompile (defaults to all loaded rules)
+            workers: Number of worker processes used for conversion
+        
+        Returns:
+            Dictionary with counts of cached, converted and failed rules
+        """
+        stats = {'total': 0, 'cached': 0, 'converted': 0, 'failed': 0}
+        
+        if self.conversion_cache is None:
+            logger.warning("SPL conversion cache is disabled, nothing to precompile")
+            return stats
+        
+        rules = self._snapshot.rules
+        precompile_all = rule_ids is None
+        if precompile_all:
+            rule_ids = list(rules.keys())
+        rule_ids = [rule_id for rule_id in rule_ids if rule_id in rules]
+        
+        valid_keys = [self.conversion_cache.key_for(rules[rule_id].view()) for rule_id in rule_ids]
+        stats['total'] = len(rule_ids)
+        stats['cached'] = sum(1 for key in valid_keys if key in self.conversion_cache.entries)
+        
+        result = self.convert_rules_to_splunk(rule_ids, workers=workers)
+        stats['failed'] = len(result['errors'])
+        stats['converted'] = sum(1 for key in valid_keys if key in self.conversion_cache.entries) - stats['cached']
+        
+        # Entries for edited rules or old field mappings are dead weight after a full precompile
+        if precompile_all:
+            self.conversion_cache.prune(valid_keys)
+        self.conversion_cache.save()
+        
+        logger.info(f"Precompiled {stats['total']} rules: {stats['cached']} cached, "
+                    f"{stats['converted']} converted, {stats['failed']} failed")
+        return stats
     
     def add_rule_file(self, file_path: str) -> List[str]:
         """
-        Add a new rule file to the loader.
+        Add a new rule file to the loader, or reload it if it was already loaded.
         
         Args:
             file_path: Path to the YAML rule file
@@ -226,28 +670,216 @@ class SigmaLoader:
         Returns:
             List of rule IDs that were added
         """
-        added_rules = []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                rule_content = yaml.safe_load(f)
+        changes = self.apply_file_changes([file_path], [])
+        return changes['added'] + changes['updated']
+    
+    def apply_file_changes(self, changed: List[str], deleted: List[str]) -> Dict[str, List[str]]:
+        """
+        Incrementally apply created, modified and deleted rule files.
+        
+        The update is built on a copy of the current snapshot and published with a
+        single reference swap, so concurrent readers keep using the previous
+        snapshot until the new one is complete.
+        
+        Args:
+            changed: Paths of created or modified rule files
+            deleted: Paths of deleted rule files
+        
+        Returns:
+            Dictionary with the 'added', 'updated' and 'removed' rule IDs
+        """
+        with self._update_lock:
+            if self._rule_cache is None and self.cache_file:
+                # Preloaded loaders only need the rule cache once files change
+                self._rule_cache = RuleCache(self.cache_file)
+                self._rule_cache.load()
+            
+            indexed_files = self._read_rule_files(changed)
             
-            # Handle both single rules and rule collections
-            if rule_content.get('type') == 'group':
-                # It's a rule collection
-                for rule in rule_content.get('rules', []):
-                    rule_id = rule.get('id')
+            # Keep the previous rules of files that exist but failed to parse, e.g. mid-edit
+            deleted = list(deleted) + [p for p in changed if p not in indexed_files and not os.path.exists(p)]
+            changed = [p for p in changed if p in indexed_files]
+            
+            snapshot = self._snapshot.copy()
+            old_rules = {}
+            for file_path in changed + deleted:
+                for record in snapshot.remove_file(file_path):
+                    old_rules[record.id] = record
+            
+            new_ids = []
+            for file_path in changed:
+                blob = self._rule_cache.get_blob(file_path) if self._rule_cache is not None else None
+                for position, (rule, technique_ids) in enumerate(indexed_files.get(file_path, [])):
+                    rule_id = snapshot.add_rule(rule, file_path, technique_ids, blob, position)
                     if rule_id:
-                        self._process_rule(rule, file_path)
-                        added_rules.append(rule_id)
-            else:
-                # It's a single rule
-                rule_id = rule_content.get('id')
-                if rule_id:
-                    self._process_rule(rule_content, file_path)
-                    added_rules.append(rule_id)
+                        new_ids.append(rule_id)
             
-            logger.info(f"Added {len(added_rules)} rules from {file_path}")
-        except Exception as e:
-            logger.error(f"Error adding rule file {file_path}: {str(e)}")
+            self._snapshot = snapshot
+            
+            if self._rule_cache is not None:
+                self._rule_cache.discard(deleted)
+                self._rule_cache.save()
+            
+            # Drop conversions of rules that were edited away or deleted
+            if self.conversion_cache is not None and old_rules:
+                live_keys = {self.conversion_cache.key_for(snapshot.rules[rule_id].view())
+                             for rule_id in new_ids if rule_id in snapshot.rules}
+                stale_keys = {self.conversion_cache.key_for(record.view()) for record in old_rules.values()}
+                self.conversion_cache.discard(stale_keys - live_keys)
         
-        return added_rules
+        changes = {
+            'added': [rule_id for rule_id in new_ids if rule_id not in old_rules],
+            'updated': [rule_id for rule_id in new_ids if rule_id in old_rules],
+            'removed': [rule_id for rule_id in old_rules if rule_id not in snapshot.rules],
+        }
+        logger.info(f"Applied rule changes (snapshot {snapshot.version}): {len(changes['added'])} added, "
+                    f"{len(changes['updated'])} updated, {len(changes['removed'])} removed")
+        return changes
+    
+    def start_watching(self, poll_interval: float = config.SIGMA_WATCH_INTERVAL,
+                       use_inotify: bool = True) -> RuleDirectoryWatcher:
+        """
+        Watch the rules directory in the background and apply rule file changes as they happen.
+        
+        Args:
+            poll_interval: Seconds between directory scans when inotify is unavailable
+            use_inotify: Whether to use inotify on Linux (False forces polling)
+        
+        Returns:
+            The running watcher
+        """
+        if self._watcher is None or not self._watcher.is_alive():
+            self._watcher = RuleDirectoryWatcher(self.rules_dir, self.apply_file_changes,
+                                                 poll_interval=poll_interval, use_inotify=use_inotify)
+            self._watcher.start()
+        return self._watcher
+    
+    def stop_watching(self):
+        """Stop the background rules directory watcher"""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+def extract_technique_ids(rule: Dict[str, Any]) -> List[str]:
+    """
+    Extract MITRE ATT&CK technique IDs from a rule's tags.
+    
+    Args:
+        rule: The rule dictionary
+    
+    Returns:
+        List of technique IDs (e.g., T1059.001) in tag order
+    """
+    tags = rule.get('tags', [])
+    if not isinstance(tags, list):
+        tags = [tags]  # Convert single tag to list
+    
+    technique_ids = []
+    for tag in tags:
+        if isinstance(tag, str) and tag.startswith('attack.t'):
+            # Extract technique ID, handling both formats:
+            # - attack.t1234
+            # - attack.t1234.001
+            technique_parts = tag.split('.')
+            if len(technique_parts) >= 2:
+                technique_base = technique_parts[1].upper()
+                if technique_base.startswith('T'):
+                    # Form full technique ID
+                    if len(technique_parts) >= 3:
+                        technique_ids.append(f"{technique_base}.{technique_parts[2]}")
+                    else:
+                        technique_ids.append(technique_base)
+    
+    return technique_ids
+
+def _index_rule_content(rule_content: Any) -> List[Tuple[Dict[str, Any], List[str]]]:
+    """
+    Split parsed file content into rules and their technique IDs.
+    
+    Args:
+        rule_content: Parsed YAML content of a rule file
+    
+    Returns:
+        List of (rule, technique IDs) tuples
+    """
+    # Handle both single rules and rule collections
+    if rule_content.get('type') == 'group':
+        rules = rule_content.get('rules', [])
+    else:
+        rules = [rule_content]
+    return [(rule, extract_technique_ids(rule)) for rule in rules]
+
+def _parse_rule_batch(batch: List[Tuple[str, Optional[bytes]]]) -> List[Tuple[str, Any, Any, Optional[str]]]:
+    """
+    Parse and index a batch of rule files. Runs inside worker processes.
+    
+    Args:
+        batch: List of (file path, raw bytes or None to read the file) tuples
+    
+    Returns:
+        List of (file path, parsed content, indexed rules, error) tuples
+    """
+    parsed = []
+    for file_path, raw in batch:
+        try:
+            if raw is None:
+                with open(file_path, 'rb') as f:
+                    raw = f.read()
+            rule_content = yaml.load(raw, Loader=_YamlLoader)
+            parsed.append((file_path, rule_content, _index_rule_content(rule_content), None))
+        except Exception as e:
+            parsed.append((file_path, None, None, str(e)))
+    return parsed
+
+def _convert_rule_batch(items: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Convert a batch of rules in one SigmaCollection with one Splunk backend. Runs inside worker processes.
+    
+    Args:
+        items: List of (rule ID, rule dict) tuples
+    
+    Returns:
+        List of (rule ID, Splunk SPL query or None, error message or None) tuples
+    """
+    import copy
+    import io
+    from sigma.backends.splunk import SplunkBackend
+    from sigma.collection import SigmaCollection
+    from sigma.rule import SigmaRule
+    
+    converted = []
+    sigma_rules = []
+    rule_ids = []
+    for rule_id, rule_dict in items:
+        rule_copy = copy.deepcopy(rule_dict)
+        try:
+            sigma_rule = SigmaRule.from_dict(rule_copy)
+        except Exception as e:
+            logger.error(f"Error creating SigmaRule from dict: {str(e)}")
+            try:
+                # Alternative method - parse as YAML
+                sigma_rule = SigmaCollection.from_yaml(io.StringIO(yaml.dump(rule_copy))).rules[0]
+            except Exception as e:
+                converted.append((rule_id, None, str(e)))
+                continue
+        sigma_rules.append(sigma_rule)
+        rule_ids.append(rule_id)
+    
+    collection = SigmaCollection(sigma_rules)
+    if hasattr(collection, 'resolve_rule_references'):
+        collection.resolve_rule_references()
+    
+    backend = SplunkBackend()
+    for rule_id, sigma_rule in zip(rule_ids, collection.rules):
+        try:
+            query_list = backend.convert_rule(sigma_rule)
+            if query_list:
+                converted.append((rule_id, query_list[0], None))
+            else:
+                logger.warning(f"No query generated for rule {rule_id}")
+                converted.append((rule_id, None, "No query generated"))
+        except Exception as e:
+            logger.error(f"Error converting Sigma rule {rule_id} to Splunk query: {str(e)}")
+            converted.append((rule_id, None, str(e)))
+    
+    return converted
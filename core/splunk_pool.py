@@ -0,0 +1,389 @@
+import http.client
+import logging
+import ssl
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+import splunklib.binding as binding
+import splunklib.client as client
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Errors of a request on a kept-alive connection the server closed in the meantime;
+# the request never reached Splunk, so it is sent again on a new connection
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class SessionPoolTimeout(TimeoutError):
+    """No session became free in time; the pool is busy, Splunk itself may be fine"""
+
+
+class SplunkConnectError(ConnectionError):
+    """
+    Splunk could not be reached: opening a connection or logging in failed.
+
+    Errors once a request was sent, such as a read timeout of a slow search, are raised
+    as they are. The original error is the __cause__.
+    """
+
+
+class KeepAliveHandler:
+    """
+    splunklib HTTP handler reusing one connection for the requests of a session.
+
+    splunklib's default handler opens a connection per request and closes it after
+    the response. This one keeps the connection open between requests, with the
+    timeout applied to each request's socket rather than process-wide. It is not
+    thread-safe; a session is used by one thread at a time (see SplunkSessionPool).
+    """
+
+    def __init__(self, timeout: Optional[float] = config.SPLUNK_REQUEST_TIMEOUT, verify: bool = False):
+        """
+        Initialize the handler.
+
+        Args:
+            timeout: Socket timeout of each request in seconds (None for no timeout)
+            verify: Whether to verify SSL certificates on https connections
+        """
+        self.timeout = timeout
+        self.verify = verify
+        self.connections_opened = 0
+        self.requests = 0
+        self._connection: Optional[http.client.HTTPConnection] = None
+        self._address = None
+        self._response: Optional[http.client.HTTPResponse] = None
+        self._dirty = False
+        self._request_timeout: Optional[float] = None
+
+    def __call__(self, url: str, message: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        scheme, host, port, path = binding._spliturl(url)
+        body = message.get("body", "")
+        head = {
+            "Content-Length": str(len(body)),
+            "Host": host,
+            "User-Agent": f"splunk-sdk-python/{binding.__version__}",
+            "Accept": "*/*",
+            "Connection": "Keep-Alive",
+        }
+        for key, value in message["headers"]:
+            head[key] = value
+        method = message.get("method", "GET")
+
+        for attempt in range(2):
+            connection = self._connect(scheme, host, port)
+            reused = connection.sock is not None
+            if not reused:
+                # Connecting takes the handler's timeout, however long the request may then run
+                try:
+                    connection.connect()
+                except OSError as e:
+                    self.close()
+                    raise SplunkConnectError(f"Cannot connect to Splunk at {host}:{port}: {str(e)}") from e
+            timeout = self.timeout if self._request_timeout is None else self._request_timeout
+            connection.timeout = timeout
+            connection.sock.settimeout(timeout)
+            try:
+                connection.request(method, path, body, head)
+                response = connection.getresponse()
+                break
+            except _STALE_CONNECTION_ERRORS:
+                self.close()
+                if not reused or attempt:
+                    raise
+                logger.debug(f"Kept-alive connection to {host}:{port} was closed, reconnecting")
+            except Exception:
+                self.close()
+                raise
+
+        self.requests += 1
+        self._response = response
+        self._dirty = False
+        return {
+            "status": response.status,
+            "reason": response.reason,
+            "headers": response.getheaders(),
+            "body": _KeepAliveBody(response, self),
+        }
+
+    @contextmanager
+    def request_timeout(self, timeout: Optional[float]):
+        """
+        Use another socket timeout for the requests of a with block.
+
+        Oneshot and blocking search requests stay open while the search runs, so they
+        need the search's timeout rather than the one of a quick REST call.
+        """
+        previous = self._request_timeout
+        self._request_timeout = timeout
+        try:
+            yield
+        finally:
+            self._request_timeout = previous
+
+    def close(self):
+        """Close the connection; the next request opens a new one"""
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+        self._response = None
+        self._dirty = False
+
+    def _connect(self, scheme: str, host: str, port: int) -> http.client.HTTPConnection:
+        """Get the kept-alive connection, replacing it if the last response was not read to its end"""
+        if self._connection is not None and (
+                self._address != (scheme, host, port) or self._dirty
+                or (self._response is not None and not self._response.isclosed())):
+            # Unread bytes of the last response would be taken for the next one
+            self.close()
+        if self._connection is None:
+            if scheme == "https":
+                context = ssl.create_default_context() if self.verify else ssl._create_unverified_context()
+                self._connection = http.client.HTTPSConnection(host, port, timeout=self.timeout, context=context)
+            elif scheme == "http":
+                self._connection = http.client.HTTPConnection(host, port, timeout=self.timeout)
+            else:
+                raise ValueError(f"unsupported scheme: {scheme}")
+            self._address = (scheme, host, port)
+            self.connections_opened += 1
+        return self._connection
+
+    def _abandoned(self, response: http.client.HTTPResponse):
+        """A response was closed before its end, so its connection cannot be reused"""
+        if response is self._response:
+            self._dirty = True
+
+
+class _KeepAliveBody(binding.ResponseReader):
+    """Response body that tells its handler when it is closed before being read to the end"""
+
+    def __init__(self, response: http.client.HTTPResponse, handler: KeepAliveHandler):
+        super().__init__(response)
+        self._handler = handler
+
+    def close(self):
+        if not self._response.isclosed():
+            self._handler._abandoned(self._response)
+        super().close()
+
+
+class SplunkSession:
+    """An authenticated splunklib service with its own kept-alive connection"""
+
+    def __init__(self, service: client.Service, handler: KeepAliveHandler):
+        self.service = service
+        self.handler = handler
+        self.created = time.time()
+        self.last_used = self.created
+
+    def close(self):
+        self.handler.close()
+
+
+class SplunkSessionPool:
+    """
+    Thread-safe pool of authenticated Splunk sessions.
+
+    Each search checks a session out for as long as it runs, since splunklib jobs
+    make their requests through the service that created them, so concurrent
+    searches never share a connection. Sessions log in again by themselves when
+    their token expires (splunklib autologin), and a session idle for longer than
+    health_check_interval is checked before it is handed out, and replaced if the
+    check fails.
+    """
+
+    def __init__(self, host: str = config.SPLUNK_HOST,
+                 port: int = config.SPLUNK_PORT,
+                 username: str = config.SPLUNK_USERNAME,
+                 password: str = config.SPLUNK_PASSWORD,
+                 scheme: str = config.SPLUNK_SCHEME,
+                 app: str = config.SPLUNK_APP,
+                 owner: str = config.SPLUNK_OWNER,
+                 verify_ssl: bool = getattr(config, 'SPLUNK_VERIFY_SSL', True),
+                 size: int = config.SPLUNK_POOL_SIZE,
+                 timeout: Optional[float] = config.SPLUNK_REQUEST_TIMEOUT,
+                 acquire_timeout: float = config.SPLUNK_POOL_ACQUIRE_TIMEOUT,
+                 health_check_interval: float = config.SPLUNK_HEALTH_CHECK_INTERVAL):
+        """
+        Initialize the pool.
+
+        Args:
+            host: Splunk host
+            port: Splunk management port
+            username: Splunk username
+            password: Splunk password
+            scheme: Connection scheme (http/https)
+            app: Splunk app context
+            owner: Splunk owner context
+            verify_ssl: Whether to verify SSL certificates
+            size: Maximum number of sessions
+            timeout: Socket timeout of each request in seconds
+            acquire_timeout: Seconds to wait for a free session before giving up
+            health_check_interval: Idle seconds after which a session is checked before reuse
+        """
+        self.settings = dict(host=host, port=port, username=username, password=password,
+                             scheme=scheme, app=app, owner=owner)
+        self.verify_ssl = verify_ssl
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle: Deque[SplunkSession] = deque()
+        self._sessions = set()  # every open session, idle or checked out
+        self._open = 0  # sessions open or being opened
+        self._closed = False
+        self._condition = threading.Condition()
+        self._stats = {'sessions_created': 0, 'sessions_replaced': 0, 'health_checks': 0,
+                       'checkouts': 0, 'waits': 0, 'wait_time': 0.0}
+
+    def open(self):
+        """
+        Log in the first session, so bad settings or credentials show at startup.
+
+        Raises:
+            Exception: If Splunk cannot be reached or the login fails
+        """
+        with self._condition:
+            self._open += 1
+        try:
+            session = self._create_session()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        self._release(session)
+
+    @contextmanager
+    def session(self) -> Iterator[client.Service]:
+        """
+        Check out a session for the duration of a with block.
+
+        Yields:
+            splunklib Service of the session
+
+        Raises:
+            SessionPoolTimeout: If no session became free within acquire_timeout
+        """
+        session = self._acquire()
+        try:
+            yield session.service
+        finally:
+            self._release(session)
+
+    def close(self):
+        """Close the idle sessions; sessions in use are closed when they are returned"""
+        with self._condition:
+            self._closed = True
+            sessions = list(self._idle)
+            self._idle.clear()
+            self._open -= len(sessions)
+            self._sessions.difference_update(sessions)
+            self._condition.notify_all()
+        for session in sessions:
+            session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the usage of the pool.
+
+        Returns:
+            Dictionary with the size, open, idle and in-use sessions, connections opened
+            and requests sent by idle sessions, and counts of sessions created and replaced,
+            health checks, checkouts and checkouts that had to wait
+        """
+        with self._condition:
+            sessions = list(self._sessions)
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'connections_opened': sum(session.handler.connections_opened for session in sessions),
+                'requests': sum(session.handler.requests for session in sessions),
+                **self._stats,
+                'wait_time': round(self._stats['wait_time'], 3),
+            }
+
+    def _acquire(self) -> SplunkSession:
+        start = time.time()
+        deadline = start + self.acquire_timeout
+        with self._condition:
+            waited = False
+            while not self._idle and self._open >= self.size and not self._closed:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise SessionPoolTimeout(f"No Splunk session became free within {self.acquire_timeout}s "
+                                       f"({self.size} in use)")
+                waited = True
+                self._condition.wait(remaining)
+            if self._closed:
+                raise RuntimeError("Splunk session pool is closed")
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_time'] += time.time() - start
+            # Most recently used first, whose connection is least likely to have timed out
+            session = self._idle.pop() if self._idle else None
+            if session is None:
+                self._open += 1
+
+        try:
+            if session is None:
+                return self._create_session()
+            if time.time() - session.last_used > self.health_check_interval and not self._healthy(session):
+                session.close()
+                with self._condition:
+                    self._sessions.discard(session)
+                    self._stats['sessions_replaced'] += 1
+                return self._create_session()
+            return session
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, session: SplunkSession):
+        session.last_used = time.time()
+        with self._condition:
+            if self._closed:
+                self._open -= 1
+                self._sessions.discard(session)
+            else:
+                self._idle.append(session)
+            self._condition.notify()
+        if self._closed:
+            session.close()
+
+    def _create_session(self) -> SplunkSession:
+        handler = KeepAliveHandler(timeout=self.timeout, verify=self.verify_ssl)
+        try:
+            service = client.connect(handler=handler, autologin=True, verify=self.verify_ssl, **self.settings)
+        except SplunkConnectError:
+            raise
+        except Exception as e:
+            raise SplunkConnectError(f"Cannot log in to Splunk at {self.settings['host']}:{self.settings['port']}: "
+                                     f"{str(e)}") from e
+        session = SplunkSession(service, handler)
+        with self._condition:
+            self._sessions.add(session)
+            self._stats['sessions_created'] += 1
+        logger.debug(f"Opened Splunk session to {self.settings['host']}:{self.settings['port']}")
+        return session
+
+    def _healthy(self, session: SplunkSession) -> bool:
+        """Check a session with a cheap authenticated request, logging in again if its token expired"""
+        with self._condition:
+            self._stats['health_checks'] += 1
+        try:
+            session.service.get('/services/server/info').body.read()
+            return True
+        except Exception as e:
+            logger.warning(f"Splunk session failed its health check, replacing it: {str(e)}")
+            return False
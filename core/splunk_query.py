@@ -1,24 +1,337 @@
 import json
 import logging
+import re
 import socket
 import ssl
+import threading
 import time
-from typing import Dict, List, Optional, Union, Any
-
-import splunklib.client as client
-import splunklib.results as results
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, Optional, Union, Any
 
 import config
+from core.circuit_breaker import STATE_CLOSED, CircuitBreaker, CircuitOpenError
+from core.result_cache import search_fingerprint
+from core.search_governor import PRIORITY_INTERACTIVE, PRIORITY_PROFILING, SearchRejected, is_quota_error
+from core.splunk_pool import SplunkConnectError, SplunkSessionPool
 
 logger = logging.getLogger(__name__)
 
+# Commands after which a search returns a bounded, usually small, result table
+_BOUNDED_COMMANDS = re.compile(r'\|\s*(stats|tstats|chart|timechart|top|rare|fieldsummary)\b', re.IGNORECASE)
+_HEAD_COMMAND = re.compile(r'\|\s*head(?:\s+limit\s*=)?\s+(\d+)\b', re.IGNORECASE)
+
+class AdaptivePoller:
+    """
+    Delays between status checks of a search job.
+    
+    Polling starts after tens of milliseconds, so sub-second searches return almost
+    immediately, and backs off exponentially for long searches. When the job's
+    doneProgress predicts an earlier completion, the next check is moved up to it.
+    """
+    
+    def __init__(self, initial: float = config.SPLUNK_POLL_INITIAL,
+                 maximum: float = config.SPLUNK_POLL_MAX,
+                 factor: float = 1.5):
+        """
+        Initialize the poller.
+        
+        Args:
+            initial: First delay in seconds
+            maximum: Longest delay in seconds
+            factor: Growth of the delay after each check
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self._delay = initial
+    
+    def next_delay(self, elapsed: float, progress: float = 0.0) -> float:
+        """
+        Get the delay before the next status check.
+        
+        Args:
+            elapsed: Seconds since the job was created
+            progress: The job's doneProgress (0 to 1)
+        
+        Returns:
+            Seconds to wait
+        """
+        delay = self._delay
+        self._delay = min(self._delay * self.factor, self.maximum)
+        
+        if 0 < progress < 1:
+            # Assume the rest of the search runs at the rate seen so far
+            remaining = elapsed * (1 - progress) / progress
+            delay = min(delay, max(remaining, self.initial))
+        return delay
+
+class RecentJobs:
+    """
+    SIDs of recently dispatched search jobs by query fingerprint.
+    
+    A search identical to one that is still running, or that finished less than
+    ttl seconds ago, can reattach to its job instead of dispatching a duplicate.
+    Splunk keeps finished jobs in its dispatch directory for 10 minutes by default.
+    """
+    
+    def __init__(self, ttl: float = config.SPLUNK_JOB_REUSE_TTL, max_jobs: int = 1000):
+        """
+        Initialize the job registry.
+        
+        Args:
+            ttl: Seconds a finished job stays reusable
+            max_jobs: Maximum number of jobs remembered
+        """
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, List]" = OrderedDict()  # fingerprint -> [sid, finished_at or None]
+        self._lock = threading.Lock()
+    
+    def get(self, fingerprint: str) -> Optional[str]:
+        """
+        Get the SID of a running or recently finished job of a search.
+        
+        Args:
+            fingerprint: Fingerprint of the search (see search_fingerprint)
+        
+        Returns:
+            SID, or None if there is no reusable job
+        """
+        with self._lock:
+            job = self._jobs.get(fingerprint)
+            if job is None:
+                return None
+            if job[1] is not None and time.time() - job[1] > self.ttl:
+                del self._jobs[fingerprint]
+                return None
+            return job[0]
+    
+    def add(self, fingerprint: str, sid: str):
+        """Remember a job just dispatched for a search"""
+        with self._lock:
+            self._jobs.pop(fingerprint, None)
+            self._jobs[fingerprint] = [sid, None]
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+    
+    def finished(self, fingerprint: str, sid: str):
+        """Start the reuse period of a job that finished"""
+        with self._lock:
+            job = self._jobs.get(fingerprint)
+            if job is not None and job[0] == sid and job[1] is None:
+                job[1] = time.time()
+    
+    def discard(self, fingerprint: str, sid: str):
+        """Forget a job that failed, timed out or no longer exists"""
+        with self._lock:
+            job = self._jobs.get(fingerprint)
+            if job is not None and job[0] == sid:
+                del self._jobs[fingerprint]
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls onto one execution.
+    
+    The first caller for a key runs the function; callers arriving while it runs
+    wait for it and receive the same result (or exception).
+    """
+    
+    class _Call:
+        __slots__ = ('done', 'result', 'error')
+        
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+    
+    def __init__(self):
+        self._calls: Dict[str, "SingleFlight._Call"] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key: str, function) -> tuple:
+        """
+        Run a function unless a call with the same key is already running.
+        
+        Args:
+            key: Identity of the call
+            function: Function without arguments to run
+        
+        Returns:
+            Tuple of the function's result and whether it was shared from another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight._Call()
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+def choose_exec_mode(query: str, max_count: int) -> str:
+    """
+    Pick the execution mode for a search.
+    
+    Bounded searches (a transforming command or a head within max_count) run as a
+    oneshot: a single request that returns the results once the search is done.
+    Everything else runs as a normal job polled for completion.
+    
+    Args:
+        query: Splunk SPL query string
+        max_count: Maximum number of results the caller wants
+    
+    Returns:
+        "oneshot" or "normal"
+    """
+    head = _HEAD_COMMAND.search(query)
+    if head and int(head.group(1)) <= max_count:
+        return "oneshot"
+    if _BOUNDED_COMMANDS.search(query):
+        return "oneshot"
+    return "normal"
+
+def summarize_results(query_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build a field summary like the one of a search job from the results themselves.
+    
+    Args:
+        query_results: Result rows
+    
+    Returns:
+        Dictionary with field summary information
+    """
+    values: Dict[str, List[Any]] = {}
+    for result in query_results:
+        for name, value in result.items():
+            values.setdefault(name, []).append(value)
+    
+    summary = {}
+    for name, field_values in values.items():
+        numbers = []
+        for value in field_values:
+            try:
+                numbers.append(float(value))
+            except (TypeError, ValueError):
+                numbers = None
+                break
+        
+        stats = {"min": None, "max": None, "mean": None, "stdev": None}
+        if numbers:
+            mean = sum(numbers) / len(numbers)
+            stats = {
+                "min": str(min(numbers)),
+                "max": str(max(numbers)),
+                "mean": str(mean),
+                "stdev": str((sum((n - mean) ** 2 for n in numbers) / len(numbers)) ** 0.5)
+            }
+        
+        summary[name] = {
+            "count": len(field_values),
+            "distinct_count": len({str(value) for value in field_values}),
+            "is_exact": True,
+            **stats
+        }
+    return summary
+
+def _read_json(stream) -> Dict[str, Any]:
+    """Read and decode a JSON response body in one call"""
+    try:
+        return json.loads(stream.read())
+    finally:
+        stream.close()
+
+def iter_json_lines(stream, chunk_size: int = 65536) -> Iterator[Dict[str, Any]]:
+    """
+    Decode a stream of newline-delimited JSON objects, one chunk at a time.
+    
+    Args:
+        stream: File-like object returning bytes
+        chunk_size: Bytes read per call
+    
+    Yields:
+        Decoded objects
+    """
+    buffer = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buffer.strip():
+        yield json.loads(buffer)
+
+def _fieldsummary_values(values: Any) -> List[str]:
+    """Non-empty values, most common first, from the 'values' column of fieldsummary"""
+    if isinstance(values, str):
+        try:
+            values = json.loads(values)
+        except ValueError:
+            return []
+    if not isinstance(values, list):
+        return []
+    return [str(item['value']) for item in values
+            if isinstance(item, dict) and item.get('value') not in (None, '')]
+
+def _is_unreachable(error: Exception) -> bool:
+    """
+    Check whether a search failed because Splunk could not be reached, rather than on the search itself.
+    
+    Only failures to connect or log in count; a read timeout of a slow search does not.
+    """
+    return isinstance(error, SplunkConnectError)
+
+def _search_timeout(service, timeout: float):
+    """
+    Socket timeout for a request that stays open while its search runs (oneshot, blocking).
+    
+    Such a request gets the search's timeout instead of the shorter one of REST calls.
+    """
+    handler = service.http.handler
+    if not hasattr(handler, 'request_timeout') or handler.timeout is None:
+        return nullcontext()
+    return handler.request_timeout(max(timeout, handler.timeout))
+
 class SplunkQueryExecutor:
     """Execute queries against Splunk and retrieve results"""
     
-    def __init__(self):
-        """Initialize the Splunk query executor"""
-        self.service = None
+    def __init__(self, result_cache=None, query_rewriter=None, governor=None):
+        """
+        Initialize the Splunk query executor.
+        
+        Args:
+            result_cache: ResultCache consulted by execute_query, or None to always run searches
+            query_rewriter: QueryRewriter used by execute_stats_query, or None to run them as written
+            governor: SearchGovernor admitting searches by priority, or None to run them at once
+        """
+        self.pool = None
         self.connected = False
+        self.result_cache = result_cache
+        self.query_rewriter = query_rewriter
+        self.governor = governor
+        # Searches fail fast while Splunk is unreachable, see CircuitBreaker
+        self.breaker = CircuitBreaker(self._reconnect_probe) if config.SPLUNK_BREAKER_FAILURES > 0 else None
+        self._connect_settings = {}
+        self.recent_jobs = RecentJobs()
+        self._in_flight = SingleFlight()
     
     def connect(self, host: str = config.SPLUNK_HOST, 
                port: int = config.SPLUNK_PORT,
@@ -28,10 +341,14 @@ class SplunkQueryExecutor:
                app: str = config.SPLUNK_APP,
                owner: str = config.SPLUNK_OWNER,
                verify_ssl: bool = getattr(config, 'SPLUNK_VERIFY_SSL', True),
-               timeout: int = 10) -> bool:
+               timeout: float = config.SPLUNK_REQUEST_TIMEOUT,
+               pool_size: int = config.SPLUNK_POOL_SIZE) -> bool:
         """
         Connect to Splunk.
         
+        Searches run on a pool of authenticated sessions (see SplunkSessionPool), so
+        concurrent searches do not share a connection. The first session logs in here.
+        
         Args:
             host: Splunk host
             port: Splunk management port
@@ -41,17 +358,23 @@ class SplunkQueryExecutor:
             app: Splunk app context
             owner: Splunk owner context
             verify_ssl: Whether to verify SSL certificates
-            timeout: Connection timeout in seconds
+            timeout: Socket timeout of each request in seconds
+            pool_size: Maximum number of sessions searches run on at once
         
         Returns:
             True if connection successful, False otherwise
         """
-        import socket
-        socket.setdefaulttimeout(timeout)  # Set timeout for socket operations
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        # Reconnections after a lost connection use the same settings
+        self._connect_settings = dict(host=host, port=port, username=username, password=password,
+                                      scheme=scheme, app=app, owner=owner, verify_ssl=verify_ssl,
+                                      timeout=timeout, pool_size=pool_size)
         
         try:
             logger.info(f"Attempting to connect to Splunk at {host}:{port} with scheme {scheme}...")
-            self.service = client.connect(
+            pool = SplunkSessionPool(
                 host=host,
                 port=port,
                 username=username,
@@ -59,8 +382,16 @@ class SplunkQueryExecutor:
                 scheme=scheme,
                 app=app,
                 owner=owner,
-                verify=verify_ssl
+                verify_ssl=verify_ssl,
+                size=pool_size,
+                timeout=timeout
             )
+            try:
+                pool.open()
+            except SplunkConnectError as e:
+                # Report what went wrong, e.g. a refused connection or a failed login
+                raise e.__cause__ or e
+            self.pool = pool
             self.connected = True
             logger.info(f"Successfully connected to Splunk at {host}:{port}")
             return True
@@ -83,12 +414,46 @@ class SplunkQueryExecutor:
             self.connected = False
             return False
     
+    def close(self):
+        """Close the sessions to Splunk"""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        if self.breaker is not None:
+            self.breaker.shutdown()
+        self.connected = False
+    
+    def _reconnect(self) -> bool:
+        """Connect again with the last settings, unless Splunk is known to be unreachable"""
+        if self.breaker is not None and self.breaker.state != STATE_CLOSED:
+            return False
+        return self.connect(**self._connect_settings)
+    
+    def _reconnect_probe(self) -> bool:
+        """Check whether Splunk is reachable again while the circuit breaker is open"""
+        return self.connect(**self._connect_settings)
+    
+    def _unavailable(self, query: str) -> Dict[str, Any]:
+        """Result of a search refused because the circuit breaker is open"""
+        retry_after = self.breaker.retry_after()
+        return {
+            "status": "unavailable",
+            "error": f"Splunk is unreachable ({self.breaker.last_error}); "
+                     f"next connection attempt in {retry_after}s",
+            "query": query,
+            "results": [],
+            "retry_after": retry_after
+        }
+    
     def execute_query(self, query: str, earliest_time: Optional[str] = "-24h", 
                       latest_time: Optional[str] = "now", 
-                      exec_mode: str = "normal",
+                      exec_mode: str = "auto",
                       index: str = config.SPLUNK_INDEX,
                       max_count: int = 1000,
-                      timeout: int = 300) -> Dict[str, Any]:
+                      timeout: int = 300,
+                      use_cache: bool = True,
+                      priority: str = PRIORITY_INTERACTIVE,
+                      group: Optional[str] = None) -> Dict[str, Any]:
         """
         Execute a Splunk search query.
         
@@ -96,26 +461,125 @@ class SplunkQueryExecutor:
             query: Splunk SPL query string
             earliest_time: Search time range start
             latest_time: Search time range end
-            exec_mode: Execution mode (normal/blocking)
+            exec_mode: Execution mode (auto/normal/blocking/oneshot); auto runs bounded
+                searches as oneshot and everything else as normal jobs
             index: Splunk index to search
             max_count: Maximum number of results to return
             timeout: Query timeout in seconds
+            use_cache: Reuse the results of an identical earlier search from the result
+                cache or its finished Splunk job; False runs the search again (the fresh
+                results are still cached)
+            priority: Priority class the search waits for a slot in (interactive, hunt,
+                profiling or background; see SearchGovernor)
+            group: What the search belongs to, e.g. a hunt ID, for fair queuing within its class
         
         Returns:
-            Dictionary with query results and metadata
+            Dictionary with query results and metadata, including a "timing" breakdown
+            of dispatch, wait, fetch and summary time, or a "cache" entry if the results
+            came from the result cache. Results shared with an identical search of the same priority
+            that was already running in this process are marked "coalesced". A search turned away
+            because its priority class is backed up has status "busy" and a "retry_after"
+            delay in seconds. While Splunk is unreachable (see CircuitBreaker), searches
+            fail at once with status "unavailable" and a "retry_after" delay.
         """
-        if not self.connected or self.service is None:
-            success = self.connect()
+        cache = self.result_cache
+        if cache is not None and use_cache:
+            cached = cache.get(query, earliest_time, latest_time, index, max_count)
+            if cached is not None:
+                logger.info(f"Using cached results ({cached['cache']['tier']}) for Splunk query: {query}")
+                return cached
+        
+        breaker = self.breaker
+        
+        def search():
+            # Checked again after waiting for a slot, as Splunk may have gone away meanwhile
+            if breaker is not None and not breaker.allow():
+                return self._unavailable(query)
+            result = self._execute_query(query, earliest_time=earliest_time, latest_time=latest_time,
+                                         exec_mode=exec_mode, index=index, max_count=max_count,
+                                         timeout=timeout, reuse_job=use_cache)
+            if breaker is not None:
+                if result.get("unreachable"):
+                    breaker.record_failure(result.get("error"))
+                elif result.get("status") in ("success", "timeout"):
+                    # Other errors, e.g. a connection cut off mid-search, do not show Splunk is back
+                    breaker.record_success()
+            return result
+        
+        def run():
+            if breaker is not None and not breaker.allow():
+                return self._unavailable(query)
+            governor = self.governor
+            if governor is None:
+                result = search()
+            else:
+                try:
+                    with governor.slot(priority, group) as waited:
+                        result = search()
+                except SearchRejected as e:
+                    logger.warning(f"Splunk search rejected: {str(e)}")
+                    return {"status": "busy", "error": str(e), "query": query, "results": [],
+                            "retry_after": e.retry_after}
+                if result.get("timing") is not None:
+                    result["timing"]["queued"] = waited
+                if result.get("status") == "error" and is_quota_error(result.get("error")):
+                    governor.report_quota_error()
+            if cache is not None and result.get("status") == "success":
+                cache.put(query, earliest_time, latest_time, index, max_count, result)
+            return result
+        
+        # Keyed by priority too, so a search never waits on a queued one of a lower priority class
+        key = search_fingerprint(query, earliest_time, latest_time, max_count, priority)
+        if key is None:
+            return run()
+        
+        # Identical searches arriving while this one runs wait for it instead of starting their own
+        result, shared = self._in_flight.do(key, run)
+        if shared:
+            logger.info(f"Joined in-flight search for Splunk query: {query}")
+            result = dict(result, results=list(result.get("results", [])), coalesced=True)
+        return result
+    
+    def execute_stats_query(self, query: str, **kwargs) -> Dict[str, Any]:
+        """
+        Execute a count-by-field query, as tstats if the query rewriter can answer it from indexed data.
+        
+        Args:
+            query: Splunk SPL query string such as 'search index=main | stats count by sourcetype'
+            **kwargs: Arguments for execute_query
+        
+        Returns:
+            Dictionary with query results and metadata, with a "rewrite" entry if tstats answered it
+        """
+        if self.query_rewriter is None:
+            return self.execute_query(query, **kwargs)
+        return self.query_rewriter.execute(self, query, **kwargs)
+    
+    def _execute_query(self, query: str, earliest_time: Optional[str] = "-24h", 
+                       latest_time: Optional[str] = "now", 
+                       exec_mode: str = "auto",
+                       index: str = config.SPLUNK_INDEX,
+                       max_count: int = 1000,
+                       timeout: int = 300,
+                       reuse_job: bool = True) -> Dict[str, Any]:
+        """
+        Run a search on Splunk, reattaching to a recent identical job if reuse_job; see execute_query.
+        
+        Errors connecting to Splunk, as opposed to errors of the search, are marked "unreachable".
+        """
+        if not self.connected or self.pool is None:
+            success = self._reconnect()
             if not success:
                 return {
                     "status": "error",
                     "error": "Not connected to Splunk",
                     "query": query,
-                    "results": []
+                    "results": [],
+                    "unreachable": True
                 }
         
-        # Ensure query begins with 'search' if not already present
-        if not query.strip().lower().startswith('search '):
+        # Ensure query begins with 'search', unless it starts with a generating command such as | tstats
+        if not query.strip().lower().startswith(('search ', '|')):
             query = f"search {query}"
             
         # Don't automatically add index - use exactly what the user provided
@@ -123,12 +587,16 @@ class SplunkQueryExecutor:
         # if "index=" not in query:
         #     query = f"index={index} " + query
         
-        logger.info(f"Executing Splunk query: {query}")
+        if exec_mode == "auto":
+            exec_mode = choose_exec_mode(query, max_count)
+        
+        logger.info(f"Executing Splunk query ({exec_mode}): {query}")
         start_time = time.time()
+        timing = {"exec_mode": exec_mode, "dispatch": 0.0, "wait": 0.0, "fetch": 0.0, "summary": 0.0, "polls": 0}
         
         try:
             # Create the job
-            if self.service is None:
+            if self.pool is None:
                 raise Exception("Splunk service is not initialized")
             
             # Prepare kwargs for job creation
@@ -141,69 +609,111 @@ class SplunkQueryExecutor:
                 job_kwargs['earliest_time'] = earliest_time
             if latest_time is not None:
                 job_kwargs['latest_time'] = latest_time
-                
-            job = self.service.jobs.create(query, **job_kwargs)
-            
-            # Wait for the job to complete or timeout
-            elapsed_time = 0
-            while not job.is_done() and elapsed_time < timeout:
-                time.sleep(2)
-                elapsed_time = time.time() - start_time
-                job.refresh()
-            
-            if not job.is_done():
-                job.cancel()
-                return {
-                    "status": "timeout",
-                    "error": f"Query timed out after {timeout} seconds",
-                    "query": query,
-                    "results": []
-                }
             
-            # Check if the job has results
-            if int(job["resultCount"]) == 0:
+            with self.pool.session() as service:
+                if exec_mode == "oneshot":
+                    return self._execute_oneshot(service, query, job_kwargs, max_count, timeout, start_time, timing)
+                
+                fingerprint = search_fingerprint(query, earliest_time, latest_time)
+                job = self._reattach_job(service, fingerprint) if reuse_job and fingerprint else None
+                reused = job is not None
+                if job is None:
+                    try:
+                        # A blocking create only returns once the search is done
+                        with _search_timeout(service, timeout) if exec_mode == "blocking" else nullcontext():
+                            job = service.jobs.create(query, **job_kwargs)
+                    except socket.timeout:
+                        if exec_mode != "blocking":
+                            raise
+                        return {
+                            "status": "timeout",
+                            "error": f"Query timed out after {timeout} seconds",
+                            "query": query,
+                            "results": [],
+                            "timing": timing
+                        }
+                    if fingerprint:
+                        self.recent_jobs.add(fingerprint, job.sid)
+                timing["dispatch"] = time.time() - start_time
+                timing["sid"] = job.sid
+                timing["reused_job"] = reused
+                
+                # Wait for the job to complete or timeout, polling often at first and less
+                # often as the search runs on, unless doneProgress predicts it ends sooner
+                poller = AdaptivePoller()
+                while True:
+                    timing["polls"] += 1
+                    done = job.is_done()
+                    elapsed = time.time() - start_time
+                    if done or elapsed >= timeout:
+                        break
+                    delay = poller.next_delay(elapsed, float(job["doneProgress"] or 0) if "doneProgress" in job else 0.0)
+                    time.sleep(min(delay, timeout - elapsed))
+                timing["wait"] = time.time() - start_time - timing["dispatch"]
+                
+                if fingerprint:
+                    if done and job["isFailed"] != "1":
+                        self.recent_jobs.finished(fingerprint, job.sid)
+                    else:
+                        self.recent_jobs.discard(fingerprint, job.sid)
+                
+                if not done:
+                    # A reattached job belongs to the search that dispatched it, which may still be waiting
+                    if not reused:
+                        job.cancel()
+                    return {
+                        "status": "timeout",
+                        "error": f"Query timed out after {timeout} seconds",
+                        "query": query,
+                        "results": [],
+                        "timing": timing
+                    }
+                
+                # Check if the job has results
+                if int(job["resultCount"]) == 0:
+                    return {
+                        "status": "success",
+                        "message": "Query completed successfully but returned no results",
+                        "query": query,
+                        "results": [],
+                        "result_count": 0,
+                        "execution_time": time.time() - start_time,
+                        "timing": timing
+                    }
+                
+                # Get the results
+                fetch_start = time.time()
+                result_count = int(job["resultCount"])
+                query_results = []
+                
+                # Limit result count
+                if result_count > max_count:
+                    logger.warning(f"Query returned {result_count} results, limiting to {max_count}")
+                    result_count = max_count
+                
+                # Get the results a page at a time, so no single response has to hold them all
+                for page in self._iter_result_pages(job, result_count):
+                    query_results.extend(page)
+                timing["fetch"] = time.time() - fetch_start
+                
+                summary_start = time.time()
+                field_summary = self._get_field_summary(job) if query_results else {}
+                timing["summary"] = time.time() - summary_start
+                self._log_timing(timing, time.time() - start_time)
+                
                 return {
                     "status": "success",
-                    "message": "Query completed successfully but returned no results",
+                    "message": "Query completed successfully",
                     "query": query,
-                    "results": [],
-                    "result_count": 0,
-                    "execution_time": time.time() - start_time
+                    "results": query_results,
+                    "result_count": len(query_results),
+                    "total_result_count": int(job["resultCount"]),
+                    "execution_time": time.time() - start_time,
+                    "scan_count": int(job["scanCount"]) if "scanCount" in job else 0,
+                    "event_count": int(job["eventCount"]) if "eventCount" in job else 0,
+                    "field_summary": field_summary,
+                    "timing": timing
                 }
-            
-            # Get the results
-            result_count = int(job["resultCount"])
-            query_results = []
-            
-            # Limit result count
-            if result_count > max_count:
-                logger.warning(f"Query returned {result_count} results, limiting to {max_count}")
-                result_count = max_count
-            
-            # Get the results
-            result_stream = job.results(count=result_count)
-            reader = results.ResultsReader(result_stream)
-            
-            for result in reader:
-                if isinstance(result, dict):
-                    query_results.append(result)
-                
-                # Check if we've reached the maximum result count
-                if len(query_results) >= max_count:
-                    break
-            
-            return {
-                "status": "success",
-                "message": "Query completed successfully",
-                "query": query,
-                "results": query_results,
-                "result_count": len(query_results),
-                "total_result_count": int(job["resultCount"]),
-                "execution_time": time.time() - start_time,
-                "scan_count": int(job["scanCount"]) if "scanCount" in job else 0,
-                "event_count": int(job["eventCount"]) if "eventCount" in job else 0,
-                "field_summary": self._get_field_summary(job) if query_results else {}
-            }
         
         except Exception as e:
             logger.error(f"Error executing Splunk query: {str(e)}")
@@ -211,8 +721,279 @@ class SplunkQueryExecutor:
                 "status": "error",
                 "error": str(e),
                 "query": query,
-                "results": []
+                "results": [],
+                "timing": timing,
+                "unreachable": _is_unreachable(e)
+            }
+    
+    def _reattach_job(self, service, fingerprint: str):
+        """
+        Get the running or recently finished job of an identical search.
+        
+        Args:
+            service: splunklib Service of the session running the search
+            fingerprint: Fingerprint of the search (see search_fingerprint)
+        
+        Returns:
+            splunklib Job, or None if there is no usable job
+        """
+        sid = self.recent_jobs.get(fingerprint)
+        if sid is None:
+            return None
+        try:
+            job = service.job(sid)
+            if job["isFailed"] == "1" or job["dispatchState"] in ("FAILED", "INTERNAL_CANCEL", "USER_CANCEL"):
+                raise RuntimeError(f"job is {job['dispatchState']}")
+        except Exception as e:
+            logger.info(f"Not reusing search job {sid}: {str(e)}")
+            self.recent_jobs.discard(fingerprint, sid)
+            return None
+        logger.info(f"Reattaching to search job {sid}")
+        return job
+    
+    def _execute_oneshot(self, service, query: str, job_kwargs: Dict[str, Any], max_count: int,
+                         timeout: float, start_time: float, timing: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a bounded search as a oneshot, getting its results in the same round trip.
+        
+        Args:
+            service: splunklib Service of the session running the search
+            query: Splunk SPL query string
+            job_kwargs: Job parameters (exec_mode and time range)
+            max_count: Maximum number of results to return
+            timeout: Query timeout in seconds, the socket timeout of the request
+            start_time: Time the query started
+            timing: Timing breakdown to fill in
+        
+        Returns:
+            Dictionary with query results and metadata
+        """
+        job_kwargs = {key: value for key, value in job_kwargs.items() if key != 'exec_mode'}
+        try:
+            with _search_timeout(service, timeout):
+                result_stream = service.jobs.oneshot(query, count=max_count, output_mode='json', **job_kwargs)
+                # The search runs while the request is open, so the response arrives when it is done
+                timing["wait"] = time.time() - start_time
+                
+                fetch_start = time.time()
+                query_results = _read_json(result_stream).get('results', [])[:max_count]
+                timing["fetch"] = time.time() - fetch_start
+        except socket.timeout:
+            return {
+                "status": "timeout",
+                "error": f"Query timed out after {timeout} seconds",
+                "query": query,
+                "results": [],
+                "timing": timing
+            }
+        
+        # A oneshot leaves no job to ask for a summary, so summarize the results themselves
+        summary_start = time.time()
+        field_summary = summarize_results(query_results)
+        timing["summary"] = time.time() - summary_start
+        self._log_timing(timing, time.time() - start_time)
+        
+        if not query_results:
+            return {
+                "status": "success",
+                "message": "Query completed successfully but returned no results",
+                "query": query,
+                "results": [],
+                "result_count": 0,
+                "execution_time": time.time() - start_time,
+                "timing": timing
             }
+        
+        return {
+            "status": "success",
+            "message": "Query completed successfully",
+            "query": query,
+            "results": query_results,
+            "result_count": len(query_results),
+            "total_result_count": len(query_results),
+            "execution_time": time.time() - start_time,
+            "scan_count": 0,
+            "event_count": len(query_results),
+            "field_summary": field_summary,
+            "timing": timing
+        }
+    
+    def _log_timing(self, timing: Dict[str, Any], total: float):
+        """Log where the time of a query went"""
+        logger.info(f"Query finished in {total:.2f}s ({timing['exec_mode']}): dispatch {timing['dispatch']:.2f}s, "
+                    f"wait {timing['wait']:.2f}s over {timing['polls']} polls, "
+                    f"fetch {timing['fetch']:.2f}s, summary {timing['summary']:.2f}s")
+    
+    def stream_query(self, query: str, earliest_time: Optional[str] = "-24h",
+                     latest_time: Optional[str] = "now",
+                     max_count: Optional[int] = None,
+                     priority: str = PRIORITY_INTERACTIVE,
+                     group: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the results of a search through the export endpoint.
+        
+        Results are yielded as Splunk produces them, without creating a job to poll,
+        and only one chunk of the response is held in memory at a time. The search
+        holds a search governor slot until the stream is closed.
+        
+        Args:
+            query: Splunk SPL query string
+            earliest_time: Search time range start
+            latest_time: Search time range end
+            max_count: Maximum number of results to yield (None for all)
+            priority: Priority class the search waits for a slot in (see SearchGovernor)
+            group: What the search belongs to, for fair queuing within its class
+        
+        Yields:
+            Result dictionaries
+        
+        Raises:
+            ConnectionError: If not connected to Splunk
+            CircuitOpenError: If Splunk is unreachable (see CircuitBreaker)
+            SearchRejected: If the search governor turned the search away
+        """
+        return self._govern_stream(query, self._stream_query(query, earliest_time, latest_time, max_count),
+                                   priority, group)
+    
+    def _stream_query(self, query: str, earliest_time: Optional[str], latest_time: Optional[str],
+                      max_count: Optional[int]) -> Iterator[Dict[str, Any]]:
+        """Stream the results of a search through the export endpoint; see stream_query"""
+        if not self.connected or self.pool is None:
+            if not self._reconnect():
+                raise ConnectionError("Not connected to Splunk")
+        
+        if not query.strip().lower().startswith(('search ', '|')):
+            query = f"search {query}"
+        
+        params = {'output_mode': 'json', 'preview': False}
+        if earliest_time is not None:
+            params['earliest_time'] = earliest_time
+        if latest_time is not None:
+            params['latest_time'] = latest_time
+        
+        logger.info(f"Streaming Splunk query: {query}")
+        with self.pool.session() as service:
+            stream = service.jobs.export(query, **params)
+            try:
+                count = 0
+                for row in iter_json_lines(stream):
+                    for message in row.get('messages') or []:
+                        if message.get('type') in ('FATAL', 'ERROR'):
+                            raise RuntimeError(message.get('text', 'Search failed'))
+                    if 'result' not in row or row.get('preview'):
+                        continue
+                    
+                    yield row['result']
+                    count += 1
+                    if max_count is not None and count >= max_count:
+                        break
+            finally:
+                stream.close()
+    
+    def stream_job_results(self, sid: str, max_count: Optional[int] = None,
+                           page_size: int = config.SPLUNK_RESULT_PAGE_SIZE,
+                           preview: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the results of a search job with paged offset fetches.
+        
+        Args:
+            sid: Search job ID
+            max_count: Maximum number of results to yield (None for all)
+            page_size: Results fetched per request
+            preview: Read the results_preview of a job that is still running
+        
+        Yields:
+            Result dictionaries
+        
+        Raises:
+            ConnectionError: If not connected to Splunk
+            CircuitOpenError: If Splunk is unreachable (see CircuitBreaker)
+        """
+        return self._govern_stream(sid, self._stream_job_results(sid, max_count, page_size, preview))
+    
+    def _stream_job_results(self, sid: str, max_count: Optional[int], page_size: int,
+                            preview: bool) -> Iterator[Dict[str, Any]]:
+        """Stream the results of a search job; see stream_job_results"""
+        if not self.connected or self.pool is None:
+            if not self._reconnect():
+                raise ConnectionError("Not connected to Splunk")
+        
+        with self.pool.session() as service:
+            for page in self._iter_result_pages(service.job(sid), max_count, page_size, preview):
+                yield from page
+    
+    def _govern_stream(self, query: str, results: Iterator[Dict[str, Any]], priority: Optional[str] = None,
+                       group: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Pass results through from a stream, the way execute_query guards a search.
+        
+        Fails fast while the circuit breaker is open and counts failures to reach Splunk
+        against it. Given a priority, the stream also holds a search governor slot
+        until it is closed.
+        
+        Args:
+            query: Search or job ID the results belong to
+            results: Iterator of result dictionaries
+            priority: Priority class to wait for a slot in, or None to stream at once
+            group: What the search belongs to, for fair queuing within its class
+        
+        Yields:
+            Result dictionaries
+        """
+        breaker = self.breaker
+        governor = self.governor if priority is not None else None
+        try:
+            with governor.slot(priority, group) if governor is not None else nullcontext():
+                # Checked after waiting for a slot, as Splunk may have gone away meanwhile
+                if breaker is not None and not breaker.allow():
+                    raise CircuitOpenError(self._unavailable(query)["error"], breaker.retry_after())
+                try:
+                    reached = False
+                    for result in results:
+                        if not reached and breaker is not None:
+                            breaker.record_success()
+                        reached = True
+                        yield result
+                except Exception as e:
+                    if breaker is not None and self._stream_unreachable(e):
+                        breaker.record_failure(str(e))
+                    elif governor is not None and is_quota_error(str(e)):
+                        governor.report_quota_error()
+                    raise
+                if not reached and breaker is not None:
+                    breaker.record_success()
+        finally:
+            results.close()
+    
+    def _stream_unreachable(self, error: Exception) -> bool:
+        """Check whether a stream failed because Splunk could not be reached; see _is_unreachable"""
+        return _is_unreachable(error) or (isinstance(error, ConnectionError) and not self.connected)
+    
+    def _iter_result_pages(self, job, max_count: Optional[int] = None,
+                           page_size: int = config.SPLUNK_RESULT_PAGE_SIZE,
+                           preview: bool = False) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Fetch the results of a job in pages of JSON, each decoded in one call.
+        
+        Args:
+            job: Splunk job object
+            max_count: Maximum number of results to fetch (None for all)
+            page_size: Results fetched per request
+            preview: Read the results_preview of a job that is still running
+        
+        Yields:
+            Lists of result dictionaries
+        """
+        fetch = job.preview if preview else job.results
+        offset = 0
+        while max_count is None or offset < max_count:
+            count = page_size if max_count is None else min(page_size, max_count - offset)
+            page = _read_json(fetch(output_mode='json', count=count, offset=offset)).get('results', [])
+            
+            yield page
+            if len(page) < count:
+                break
+            offset += len(page)
     
     def _get_field_summary(self, job) -> Dict[str, Any]:
         """
@@ -226,22 +1007,18 @@ class SplunkQueryExecutor:
         """
         try:
             summary = {}
-            field_summary = job.results(path="summary")
-            reader = results.ResultsReader(field_summary)
+            field_summary = _read_json(job.summary(output_mode='json'))
             
-            for result in reader:
-                if isinstance(result, dict):
-                    name = result.get("name")
-                    if name:
-                        summary[name] = {
-                            "count": result.get("count", 0),
-                            "distinct_count": result.get("distinct_count", 0),
-                            "is_exact": result.get("is_exact", "0") == "1",
-                            "min": result.get("min"),
-                            "max": result.get("max"),
-                            "mean": result.get("mean"),
-                            "stdev": result.get("stdev")
-                        }
+            for name, field in field_summary.get("fields", {}).items():
+                summary[name] = {
+                    "count": field.get("count", 0),
+                    "distinct_count": field.get("distinct_count", 0),
+                    "is_exact": str(field.get("is_exact", "0")).lower() in ("1", "true"),
+                    "min": field.get("min"),
+                    "max": field.get("max"),
+                    "mean": field.get("mean"),
+                    "stdev": field.get("stdev")
+                }
             
             return summary
         except Exception as e:
@@ -264,7 +1041,7 @@ class SplunkQueryExecutor:
             List of unique values for the field
         """
         if not self.connected:
-            success = self.connect()
+            success = self._reconnect()
             if not success:
                 return []
         
@@ -273,11 +1050,12 @@ class SplunkQueryExecutor:
             query = f'search index={index} | stats count by "{field}" | sort -count'
             
             # Execute the query
-            result = self.execute_query(
-                query=query,
+            result = self.execute_stats_query(
+                query,
                 earliest_time=earliest_time, 
                 latest_time=latest_time,
-                exec_mode="blocking"
+                exec_mode="blocking",
+                priority=PRIORITY_PROFILING
             )
             
             # Extract the field values
@@ -295,7 +1073,8 @@ class SplunkQueryExecutor:
                          index: str = "*", 
                          earliest_time: str = "-24h", 
                          latest_time: str = "now",
-                         sample_count: int = 1000) -> Dict[str, Dict[str, Any]]:
+                         sample_count: int = 1000,
+                         max_sample_values: int = 5) -> Dict[str, Dict[str, Any]]:
         """
         Get metadata about fields present in the Splunk index.
         
@@ -304,6 +1083,7 @@ class SplunkQueryExecutor:
             earliest_time: Search time range start
             latest_time: Search time range end
             sample_count: Number of events to sample
+            max_sample_values: Number of most common values to return for each field
             
         Returns:
             Dictionary with field metadata (name, type, prevalence, etc.)
@@ -311,27 +1091,33 @@ class SplunkQueryExecutor:
         field_metadata = {}
         
         if not self.connected:
-            success = self.connect()
+            success = self._reconnect()
             if not success:
                 logger.error("Cannot get field metadata: Not connected to Splunk")
                 return field_metadata
         
         try:
-            # First run a search to get the most common fields from a sample of events
-            sample_query = f"search index={index} | head {sample_count} | fieldsummary | table field count totalCount distinctCount"
+            # One search summarizes every field of a sample of events, including its most
+            # common values, so the cost does not grow with the number of fields
+            sample_query = (f"search index={index} | head {sample_count} | fieldsummary maxvals={max_sample_values} "
+                            f"| table field count totalCount distinctCount distinct_count values")
             
             logger.info(f"Executing field metadata query: {sample_query}")
             result = self.execute_query(
                 query=sample_query,
                 earliest_time=earliest_time,
                 latest_time=latest_time,
-                exec_mode="blocking"
+                exec_mode="blocking",
+                priority=PRIORITY_PROFILING
             )
             
             if result["status"] != "success":
                 logger.error(f"Failed to get field metadata: {result.get('error', 'Unknown error')}")
                 return field_metadata
             
+            # fieldsummary reports no total, so fall back to the number of events sampled
+            sampled_events = result.get('event_count') or 0
+            
             # Extract field metadata
             for field_data in result["results"]:
                 if 'field' in field_data:
@@ -340,46 +1126,29 @@ class SplunkQueryExecutor:
                     # Skip internal Splunk fields
                     if field_name.startswith('_') and field_name not in ['_time', '_raw']:
                         continue
+                    
+                    count = int(field_data.get('count') or 0)
+                    total_count = int(field_data.get('totalCount') or sampled_events or 0)
+                    distinct_count = int(field_data.get('distinctCount') or field_data.get('distinct_count') or 0)
                         
                     # Calculate prevalence (percentage of events with this field)
                     prevalence = 0
-                    if 'count' in field_data and 'totalCount' in field_data:
-                        count = int(field_data['count']) if field_data['count'] else 0
-                        total_count = int(field_data['totalCount']) if field_data['totalCount'] else 1
-                        if total_count > 0:
-                            prevalence = round((count / total_count) * 100, 2)
+                    if total_count > 0:
+                        prevalence = round((count / total_count) * 100, 2)
                             
                     # Store metadata
                     field_metadata[field_name] = {
                         'name': field_name,
                         'prevalence': prevalence,
-                        'count': int(field_data.get('count', 0)),
-                        'total_count': int(field_data.get('totalCount', 0)),
-                        'distinct_count': int(field_data.get('distinctCount', 0))
+                        'count': count,
+                        'total_count': total_count,
+                        'distinct_count': distinct_count
                     }
-            
-            # Now get sample values for common fields to help with mapping
-            for field_name, metadata in list(field_metadata.items()):
-                # Only get sample values for fields that appear in at least 1% of events
-                if metadata.get('prevalence', 0) >= 1:
-                    sample_query = f"search index={index} {field_name}=* | stats count by {field_name} | sort -count | head 5"
                     
-                    # Execute the query to get sample values
-                    try:
-                        sample_result = self.execute_query(
-                            query=sample_query,
-                            earliest_time=earliest_time,
-                            latest_time=latest_time,
-                            exec_mode="blocking"
-                        )
-                        
-                        if sample_result["status"] == "success":
-                            # Store sample values
-                            sample_values = [r.get(field_name, "") for r in sample_result["results"]]
-                            field_metadata[field_name]['sample_values'] = [v for v in sample_values if v][:5]
-                            
-                    except Exception as e:
-                        logger.error(f"Error getting sample values for {field_name}: {str(e)}")
+                    # Sample values help with mapping, for fields in at least 1% of events
+                    if prevalence >= 1:
+                        sample_values = _fieldsummary_values(field_data.get('values'))
+                        field_metadata[field_name]['sample_values'] = sample_values[:max_sample_values]
             
             return field_metadata
             
@@ -407,7 +1176,7 @@ class SplunkQueryExecutor:
         field_frequencies = []
         
         if not self.connected:
-            success = self.connect()
+            success = self._reconnect()
             if not success:
                 logger.error("Cannot get field frequencies: Not connected to Splunk")
                 return field_frequencies
@@ -421,7 +1190,8 @@ class SplunkQueryExecutor:
                 query=query,
                 earliest_time=earliest_time,
                 latest_time=latest_time,
-                exec_mode="blocking"
+                exec_mode="blocking",
+                priority=PRIORITY_PROFILING
             )
             
             if result["status"] != "success":
@@ -1,7 +1,7 @@
 import logging
 import networkx as nx
 import json
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
@@ -45,6 +45,29 @@ class TTPMapper:
             logger.warning("No technique texts available for TTP mapping")
             self.technique_matrix = None
     
+    @classmethod
+    def from_snapshot(cls, shared_snapshot, mitre_parser=None) -> 'TTPMapper':
+        """
+        Create a mapper from the TF-IDF model of a shared snapshot instead of fitting it.
+        
+        The technique matrix stays in the memory-mapped snapshot file.
+        
+        Args:
+            shared_snapshot: SharedSnapshot built with a TTPMapper
+            mitre_parser: Initialized MitreAttackParser instance
+        
+        Returns:
+            TTPMapper instance
+        """
+        from core.mitre_parser import MitreAttackParser
+        mapper = cls.__new__(cls)
+        mapper.mitre_parser = mitre_parser if mitre_parser is not None else MitreAttackParser.from_snapshot(shared_snapshot)
+        mapper.techniques = mapper.mitre_parser.get_techniques()
+        mapper.vectorizer = shared_snapshot.ttp['vectorizer']
+        mapper.technique_matrix = shared_snapshot.ttp['technique_matrix']
+        mapper.technique_ids = shared_snapshot.ttp['technique_ids']
+        return mapper
+    
     def map_results_to_techniques(self, results: List[Dict[str, Any]], 
                                 similarity_threshold: float = 0.2) -> Dict[str, Any]:
         """
@@ -57,9 +80,52 @@ class TTPMapper:
         Returns:
             Dictionary with mapping results and confidence scores
         """
-        if not results or not self.technique_matrix:
+        if not results or self.technique_matrix is None:
             return {"mappings": []}
         
+        try:
+            return {
+                "mappings": list(self.iter_result_mappings(results, similarity_threshold))
+            }
+            
+        except Exception as e:
+            logger.error(f"Error mapping results to techniques: {str(e)}")
+            return {"mappings": [], "error": str(e)}
+    
+    def iter_result_mappings(self, results: Iterable[Dict[str, Any]],
+                             similarity_threshold: float = 0.2,
+                             batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Map search results to potential MITRE ATT&CK techniques as they are read.
+        
+        Results are vectorized in batches, so memory is bounded by the batch size
+        rather than by the size of the result set.
+        
+        Args:
+            results: Iterable of search result dictionaries, e.g. a result stream
+            similarity_threshold: Minimum similarity score to include a match
+            batch_size: Results vectorized at once
+            
+        Yields:
+            Mapping for each result: {"result_index": i, "matches": [...]}
+        """
+        if self.technique_matrix is None:
+            return
+        
+        batch = []
+        index = 0
+        for result in results:
+            batch.append(result)
+            if len(batch) >= batch_size:
+                yield from self._map_batch(batch, index, similarity_threshold)
+                index += len(batch)
+                batch = []
+        if batch:
+            yield from self._map_batch(batch, index, similarity_threshold)
+    
+    def _map_batch(self, results: List[Dict[str, Any]], start_index: int,
+                   similarity_threshold: float) -> Iterator[Dict[str, Any]]:
+        """Map one batch of results to techniques"""
         # Extract all text from results
         result_texts = []
         for result in results:
@@ -72,50 +138,37 @@ class TTPMapper:
             result_texts.append(" ".join(text_values))
         
         # Vectorize result texts
-        try:
-            result_vectors = self.vectorizer.transform(result_texts)
-            
-            # Calculate similarity between results and techniques
-            similarity_matrix = cosine_similarity(result_vectors, self.technique_matrix)
+        result_vectors = self.vectorizer.transform(result_texts)
+        
+        # Calculate similarity between results and techniques
+        similarity_matrix = cosine_similarity(result_vectors, self.technique_matrix)
+        
+        # Get top technique matches for each result
+        for i in range(len(results)):
+            result_matches = []
             
-            # Get top technique matches for each result
-            mappings = []
+            # Get techniques with similarity scores above threshold
+            for j, score in enumerate(similarity_matrix[i]):
+                if score >= similarity_threshold:
+                    technique_id = self.technique_ids[j]
+                    technique = self.mitre_parser.get_technique_by_id(technique_id)
+                    
+                    if technique:
+                        result_matches.append({
+                            "technique_id": technique_id,
+                            "technique_name": technique.get("name", ""),
+                            "similarity_score": float(score),
+                            "tactics": list(technique.get("tactics", []))
+                        })
             
-            for i, result in enumerate(results):
-                result_matches = []
-                
-                # Get techniques with similarity scores above threshold
-                for j, score in enumerate(similarity_matrix[i]):
-                    if score >= similarity_threshold:
-                        technique_id = self.technique_ids[j]
-                        technique = self.mitre_parser.get_technique_by_id(technique_id)
-                        
-                        if technique:
-                            result_matches.append({
-                                "technique_id": technique_id,
-                                "technique_name": technique.get("name", ""),
-                                "similarity_score": float(score),
-                                "tactics": [t.get("name") for t in technique.get("tactics", [])]
-                            })
-                
-                # Sort matches by similarity score descending
-                result_matches.sort(key=lambda x: x["similarity_score"], reverse=True)
-                
-                # Take top 5 matches
-                top_matches = result_matches[:5]
-                
-                mappings.append({
-                    "result_index": i,
-                    "matches": top_matches
-                })
+            # Sort matches by similarity score descending
+            result_matches.sort(key=lambda x: x["similarity_score"], reverse=True)
             
-            return {
-                "mappings": mappings
+            # Take top 5 matches
+            yield {
+                "result_index": start_index + i,
+                "matches": result_matches[:5]
             }
-            
-        except Exception as e:
-            logger.error(f"Error mapping results to techniques: {str(e)}")
-            return {"mappings": [], "error": str(e)}
     
     def create_mindmap_data(self, results: List[Dict[str, Any]], 
                           mappings: Dict[str, Any]) -> Dict[str, Any]:
@@ -7,9 +7,10 @@ import json
 import re
 import networkx as nx
 import datetime
+import itertools
 import math
 from collections import defaultdict
-from typing import List, Dict, Any, Optional, Set, Tuple, Union
+from typing import Iterable, List, Dict, Any, Optional, Set, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -20,24 +21,44 @@ class Visualizer:
     """
     
     @staticmethod
-    def generate_pivot_mindmap(results: List[Dict[str, Any]], 
-                             fields_of_interest: Optional[List[str]] = None) -> Dict[str, Any]:
+    def generate_pivot_mindmap(results: Iterable[Dict[str, Any]], 
+                             fields_of_interest: Optional[List[str]] = None,
+                             sample_size: int = 1000) -> Dict[str, Any]:
         """
         Generate a pivot-based mind map visualization from query results
         
         Args:
-            results: List of result dictionaries
+            results: List of result dictionaries, or any iterable of them (e.g. a result
+                stream), which is read once
             fields_of_interest: Optional list of fields to include as pivots
+            sample_size: Results of an iterable used to detect important fields when
+                fields_of_interest is not given
             
         Returns:
             Dictionary with nodes and edges for visualization
         """
-        if not results:
-            return {"nodes": [], "edges": []}
-        
         # Detect important fields if not specified
         if not fields_of_interest:
-            fields_of_interest = Visualizer._detect_important_fields(results)
+            if isinstance(results, list):
+                fields_of_interest = Visualizer._detect_important_fields(results)
+            else:
+                results = iter(results)
+                sample = list(itertools.islice(results, sample_size))
+                fields_of_interest = Visualizer._detect_important_fields(sample)
+                results = itertools.chain(sample, results)
+        
+        # Count the distinct values of each field in one pass over the results
+        total = 0
+        value_counts = {field: {} for field in fields_of_interest}
+        for result in results:
+            total += 1
+            for field, field_values in value_counts.items():
+                if field in result and result[field]:
+                    value = str(result[field])
+                    field_values[value] = field_values.get(value, 0) + 1
+        
+        if not total:
+            return {"nodes": [], "edges": []}
         
         # Create a graph for visualization
         G = nx.Graph()
@@ -45,8 +66,8 @@ class Visualizer:
         # Create central node
         central_node = {
             "id": "center",
-            "label": f"Results ({len(results)})",
-            "title": f"{len(results)} total results",
+            "label": f"Results ({total})",
+            "title": f"{total} total results",
             "group": "center",
             "shape": "dot",
             "size": 25
@@ -83,17 +104,8 @@ class Visualizer:
             
             node_counter += 1
             
-            # Second level - distinct values for each field
-            field_values = {}
-            for result in results:
-                if field in result and result[field]:
-                    value = str(result[field])
-                    if value not in field_values:
-                        field_values[value] = 0
-                    field_values[value] += 1
-            
-            # Add value nodes with counts
-            for value, count in field_values.items():
+            # Second level - distinct values for each field, with counts
+            for value, count in value_counts[field].items():
                 # Create value node ID - ensure it's unique
                 short_value = value[:30] + "..." if len(value) > 30 else value
                 value_id = f"value_{node_counter}"
@@ -387,8 +399,8 @@ class Visualizer:
         # Add central results node
         central_node = {
             "id": "results",
-            "label": f"Results ({len(results)})",
-            "title": f"{len(results)} total results",
+            "label": f"Results ({total})",
+            "title": f"{total} total results",
             "group": "results"
         }
         nodes.append(central_node)
@@ -1185,24 +1197,23 @@ class Visualizer:
         }
     
     @staticmethod
-    def _detect_important_fields(results: List[Dict[str, Any]]) -> List[str]:
+    def _detect_important_fields(results: Iterable[Dict[str, Any]]) -> List[str]:
         """
         Detect important fields for pivoting based on result content
         
         Args:
-            results: List of result dictionaries
+            results: Iterable of result dictionaries, read once
             
         Returns:
             List of field names deemed important for pivoting
         """
-        if not results:
-            return []
-        
         # Count field occurrences and cardinality
+        total = 0
         field_counts = {}
         field_values = {}
         
         for result in results:
+            total += 1
             for field, value in result.items():
                 # Skip empty values and internal fields
                 if not value or field.startswith("_"):
@@ -1229,7 +1240,7 @@ class Visualizer:
             cardinality_ratio = field_cardinality[field]
             
             # High occurrence is good
-            occurrence_score = min(1.0, count / len(results))
+            occurrence_score = min(1.0, count / total)
             
             # Medium cardinality is good (not too many unique values, not too few)
             cardinality_score = 1.0 - abs(cardinality_ratio - 0.5) * 2.0
@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration.
+
+With PRELOAD_SNAPSHOT enabled (the default), the master process builds the Sigma rule,
+ATT&CK and TF-IDF snapshot once and every worker attaches to the memory-mapped file
+instead of loading and fitting everything again.
+"""
+
+import os
+
+PRELOAD_SNAPSHOT = os.environ.get("PRELOAD_SNAPSHOT", "true").lower() == "true"
+
+
+def on_starting(server):
+    """Build the shared snapshot before any worker is forked"""
+    if not PRELOAD_SNAPSHOT:
+        return
+
+    import config
+    from core.mitre_parser import MitreAttackParser
+    from core.shared_snapshot import build_shared_snapshot
+    from core.sigma_loader import SigmaLoader
+    from core.ttp_mapper import TTPMapper
+
+    try:
+        mitre_parser = MitreAttackParser()
+        sigma_loader = SigmaLoader(conversion_cache_file=None)
+        ttp_mapper = TTPMapper(mitre_parser)
+        if build_shared_snapshot(config.SHARED_SNAPSHOT_FILE, mitre_parser, sigma_loader, ttp_mapper):
+            # Inherited by the workers, which attach in app.py
+            os.environ["SHARED_SNAPSHOT_ATTACH"] = "true"
+    except Exception as e:
+        server.log.warning(f"Could not build shared snapshot ({e}), workers will load data themselves")
+
+
+def on_reload(server):
+    """Rebuild the snapshot on SIGHUP so the new workers see current data"""
+    on_starting(server)
@@ -4,6 +4,7 @@ Import Sigma rules from the official SigmaHQ repository.
 This script clones the repository and copies relevant rules to the local sigma_rules directory.
 """
 
+import argparse
 import os
 import shutil
 import logging
@@ -126,6 +127,27 @@ def cleanup(repo_dir: str = SIGMA_REPO_DIR) -> None:
     except Exception as e:
         logger.error(f"Error cleaning up: {e}")
 
+def build_rule_cache(rules_dir: str = SIGMA_RULES_DIR, workers: Optional[int] = None) -> int:
+    """
+    Parse the imported rules and prime the Sigma rule cache used at application startup.
+    
+    Args:
+        rules_dir: Directory containing the imported rules
+        workers: Number of parser processes (defaults to config.SIGMA_LOAD_WORKERS)
+        
+    Returns:
+        Number of rules loaded
+    """
+    import config
+    from core.sigma_loader import SigmaLoader
+    
+    if workers is None:
+        workers = config.SIGMA_LOAD_WORKERS
+    
+    logger.info(f"Building Sigma rule cache with {workers} worker processes")
+    loader = SigmaLoader(rules_dir=os.path.abspath(rules_dir), workers=workers)
+    return len(loader.rules)
+
 def main() -> int:
     """
     Main function to import Sigma rules.
@@ -133,6 +155,11 @@ def main() -> int:
     Returns:
         Exit code
     """
+    parser = argparse.ArgumentParser(description="Import Sigma rules from the SigmaHQ repository")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="Worker processes used to parse the imported rules (default: CPU count)")
+    args = parser.parse_args()
+    
     logger.info("Starting Sigma rules import")
     
     # Clone the repository
@@ -148,6 +175,10 @@ def main() -> int:
     
     if rule_count > 0:
         logger.info(f"Successfully imported {rule_count} Sigma rules")
+        
+        # Parse everything once now so the next application start is warm
+        loaded_count = build_rule_cache(workers=args.workers)
+        logger.info(f"Indexed {loaded_count} Sigma rules")
         return 0
     else:
         logger.error("No rules were imported")
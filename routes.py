@@ -3,7 +3,9 @@ import logging
 from typing import Dict, List, Optional, Any
 import config
 
-from app import app, mitre_parser, sigma_loader, splunk_query, field_mapper, splunk_connected, apt_manager, hunt_manager
+from core.circuit_breaker import CircuitOpenError
+from core.search_governor import SearchRejected
+from app import app, services, mitre_parser, sigma_loader, splunk_query, field_mapper, splunk_connected, apt_manager, hunt_manager, hunt_engine, hunt_scheduler, result_store
 from threading import Thread
 from flask import current_app
 from functools import wraps
@@ -21,13 +23,31 @@ def copy_current_request_context(f):
 def check_splunk_status():
     """Helper to check Splunk status without blocking"""
     global splunk_connected
+    splunk_connected = services.is_ready('splunk_query') and splunk_query.connected
     if not splunk_connected:
-        try:
-            splunk_connected = splunk_query.connect()
-        except:
-            splunk_connected = False
+        # Reconnect in the background; pages render in limited mode until it succeeds
+        services.start('splunk_connection', retry=True)
     return splunk_connected
 
+# Query parameters accepted as Sigma rule attribute filters (see SigmaLoader.find_rule_ids)
+RULE_FILTER_PARAMS = ('product', 'category', 'service', 'level', 'status', 'author', 'fields')
+
+def get_hunt_user() -> str:
+    """User a hunt's searches count against for the per-user concurrency limit"""
+    return request.headers.get('X-Remote-User') or request.remote_addr or 'default'
+
+def get_rule_filters(source) -> Dict[str, List[str]]:
+    """Extract Sigma rule attribute filters from request args or a JSON dict"""
+    filters = {}
+    for param in RULE_FILTER_PARAMS:
+        if hasattr(source, 'getlist'):
+            values = source.getlist(param)
+        else:
+            values = source.get(param)
+        if values:
+            filters[param] = values
+    return filters
+
 @app.route('/')
 def index():
     """Render the home page"""
@@ -99,6 +119,9 @@ def sigma_rule(rule_id):
     if not rule:
         return jsonify({'error': f'Rule {rule_id} not found'}), 404
 
+    # Copy so the loaded rule (and its SPL cache key) is left untouched
+    rule = dict(rule)
+
     # Try to convert to Splunk query
     rule['splunk_query'] = sigma_loader.convert_rule_to_splunk(rule_id)
 
@@ -109,14 +132,22 @@ def api_sigma_rules():
     """API endpoint to get all sigma rules"""
     technique_id = request.args.get('technique')
     search_query = request.args.get('search')
+    filters = get_rule_filters(request.args)
 
     if technique_id:
         rules = sigma_loader.get_rules_by_technique(technique_id)
     elif search_query:
         rules = sigma_loader.search_rules(search_query)
+    elif filters:
+        return jsonify(sigma_loader.find_rules(**filters))
     else:
         rules = sigma_loader.get_all_rules()
 
+    # Narrow technique/search results by attribute filters, e.g. ?product=windows&level=high&level=critical
+    if filters:
+        allowed = set(sigma_loader.find_rule_ids(**filters))
+        rules = [rule for rule in rules if rule.get('id') in allowed]
+
     return jsonify(rules)
 
 @app.route('/api/sigma/rule/<rule_id>')
@@ -290,23 +321,34 @@ def start_apt_hunt():
     hunt_id = hunt_manager.start_hunt(
         hunt_type="apt",
         target_id=data['apt_id'],
-        target_name=apt['name']
+        target_name=apt['name'],
+        incremental=bool(data.get('incremental', False))
     )
 
     # Start hunt in background
+    user = get_hunt_user()
+    use_cache = data.get('use_cache', True)
     def run_hunt():
+        # Convert every rule of the selected techniques in one batch
+        rule_ids = sigma_loader.get_rule_ids_by_techniques([t['id'] for t in data['techniques']])
+        queries = sigma_loader.convert_rules_to_splunk(rule_ids)['queries']
+
+        searches = []
         for technique in data['techniques']:
-            sigma_rules = sigma_loader.get_rules_by_technique(technique['id'])
-            for rule in sigma_rules:
-                query = sigma_loader.convert_rule_to_splunk(rule['id'])
+            for rule in sigma_loader.get_rules_by_technique(technique['id']):
+                query = queries.get(rule['id'])
                 if query:
-                    result = splunk_query.execute_query(query)
-                    hunt_manager.update_hunt_progress(hunt_id, {
+                    searches.append({
                         'query_id': rule['id'],
                         'technique_id': technique['id'],
-                        'matches': result.get('matches', [])
+                        'query': query,
+                        'logsource': rule.get('logsource')
                     })
 
+        # Results stream into the hunt progress as each search finishes
+        searches = hunt_manager.plan_incremental_searches(hunt_id, searches)
+        hunt_engine.run_hunt(hunt_id, searches, user=user, use_cache=use_cache)
+
     thread = Thread(target=run_hunt)
     thread.start()
 
@@ -350,9 +392,14 @@ def execute_query():
         query=query,
         earliest_time=earliest,
         latest_time=latest,
-        max_count=count
+        max_count=count,
+        use_cache=data.get('use_cache', True)
     )
 
+    if result.get('status') in ('busy', 'unavailable'):
+        # The search governor is backed up or Splunk is unreachable; tell the client when to try again
+        return jsonify(result), 503, {'Retry-After': str(result['retry_after'])}
+
     # Generate a unique ID for this result set
     import uuid
     import json
@@ -368,13 +415,7 @@ def execute_query():
         result['timestamp'] = datetime.datetime.now().isoformat()
         result['query'] = query
 
-        # Ensure results directory exists
-        results_dir = os.path.join(app.root_path, 'data', 'results')
-        os.makedirs(results_dir, exist_ok=True)
-
-        # Save result to JSON file
-        with open(os.path.join(results_dir, f"{result_id}.json"), 'w') as f:
-            json.dump(result, f)
+        result_store.save(result_id, result)
 
         # Add result ID to response
         result['result_id'] = result_id
@@ -388,6 +429,83 @@ def api_execute_query():
     """API endpoint to execute a Splunk query"""
     return execute_query()
 
+@app.route('/api/splunk/export', methods=['POST'])
+def export_query():
+    """Stream the results of a Splunk query straight into the result store, for result sets too large for memory"""
+    import uuid
+    import datetime
+
+    data = request.json
+    if not data or 'query' not in data:
+        return jsonify({'error': 'No query provided'}), 400
+
+    query = data['query']
+    result_id = str(uuid.uuid4())
+    metadata = {
+        'status': 'success',
+        'query': query,
+        'timestamp': datetime.datetime.now().isoformat()
+    }
+
+    try:
+        count = result_store.save_stream(result_id, metadata, splunk_query.stream_query(
+            query,
+            earliest_time=data.get('earliest', '-24h'),
+            latest_time=data.get('latest', 'now'),
+            max_count=data.get('count')
+        ))
+    except (SearchRejected, CircuitOpenError) as e:
+        status = 'busy' if isinstance(e, SearchRejected) else 'unavailable'
+        return jsonify({'status': status, 'error': str(e), 'query': query, 'retry_after': e.retry_after}), \
+            503, {'Retry-After': str(e.retry_after)}
+    except Exception as e:
+        logger.error(f"Error exporting Splunk query results: {str(e)}")
+        return jsonify({'status': 'error', 'error': str(e), 'query': query}), 500
+
+    return jsonify({**metadata, 'result_id': result_id, 'result_count': count})
+
+@app.route('/api/splunk/cache', methods=['GET', 'DELETE'])
+def result_cache_stats():
+    """Hit and miss statistics of the search result cache; DELETE empties it"""
+    cache = splunk_query.result_cache
+    if cache is None:
+        return jsonify({'enabled': False})
+    if request.method == 'DELETE':
+        cache.clear()
+    return jsonify({'enabled': True, **cache.stats()})
+
+@app.route('/api/splunk/pool')
+def splunk_pool_stats():
+    """Usage of the pool of Splunk sessions searches run on"""
+    pool = getattr(splunk_query, 'pool', None)
+    if pool is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **pool.stats()})
+
+@app.route('/api/splunk/governor')
+def search_governor_stats():
+    """Running and queued Splunk searches per priority class, with their wait times"""
+    governor = splunk_query.governor
+    if governor is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **governor.stats()})
+
+@app.route('/api/splunk/breaker')
+def circuit_breaker_stats():
+    """Whether searches fail fast because Splunk is unreachable, and since when"""
+    breaker = getattr(splunk_query, 'breaker', None)
+    if breaker is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **breaker.stats()})
+
+@app.route('/api/splunk/rewrites')
+def query_rewrite_report():
+    """Count-by-field queries answered with tstats instead of raw searches, and their speedup"""
+    rewriter = splunk_query.query_rewriter
+    if rewriter is None:
+        return jsonify({'enabled': False, 'queries': []})
+    return jsonify({'enabled': True, 'queries': rewriter.report()})
+
 @app.route('/splunk/rule/<rule_id>', methods=['POST'])
 def execute_rule(rule_id):
     """Execute a Sigma rule as a Splunk query"""
@@ -407,7 +525,8 @@ def execute_rule(rule_id):
         query=splunk_query_str,
         earliest_time=earliest,
         latest_time=latest,
-        max_count=count
+        max_count=count,
+        use_cache=data.get('use_cache', True)
     )
 
     # Add rule information to the result
@@ -482,6 +601,7 @@ def execute_hunt():
         earliest = request.args.get('earliest', '-24h')
         latest = request.args.get('latest', 'now')
         count = int(request.args.get('count', '100'))
+        use_cache = request.args.get('use_cache', 'true').lower() != 'false'
 
         if not technique_id:
             # Redirect to profile form
@@ -492,7 +612,8 @@ def execute_hunt():
             'technique_id': technique_id,
             'earliest': earliest,
             'latest': latest,
-            'count': count
+            'count': count,
+            'use_cache': use_cache
         }
     else:
         # For POST requests, use the JSON data
@@ -533,40 +654,42 @@ def execute_hunt():
             'technique': technique
         })
 
-    # Execute each rule
-    results = []
+    # Convert all rules for the technique in one batch
+    queries = sigma_loader.convert_technique_to_splunk(technique_id)['queries']
 
+    # Run the rules on the hunt engine, within the per-user and per-instance search limits
+    rule_results = {}
+    searches = []
     for rule in sigma_rules:
         rule_id = rule.get('id', '')
 
         if not rule_id:
             continue
 
-        # Convert to Splunk query
-        splunk_query_str = sigma_loader.convert_rule_to_splunk(rule_id)
-
-        if not splunk_query_str:
-            results.append({
-                'rule_id': rule_id,
-                'rule_title': rule.get('title', ''),
+        if not queries.get(rule_id):
+            rule_results[rule_id] = {
                 'status': 'error',
                 'error': 'Failed to convert rule to Splunk query'
-            })
+            }
             continue
 
-        # Execute query
-        result = splunk_query.execute_query(
-            query=splunk_query_str,
-            earliest_time=earliest,
-            latest_time=latest,
-            max_count=count
-        )
+        searches.append({'query_id': rule_id, 'query': queries[rule_id], 'logsource': rule.get('logsource')})
 
-        # Add rule information
-        result['rule_id'] = rule_id
-        result['rule_title'] = rule.get('title')
+    def on_result(search, result):
+        rule_results[search['query_id']] = result
 
-        results.append(result)
+    from core.search_governor import PRIORITY_INTERACTIVE
+    execution = hunt_engine.run_hunt(None, searches, user=get_hunt_user(), on_result=on_result,
+                                     priority=PRIORITY_INTERACTIVE, earliest_time=earliest, latest_time=latest,
+                                     max_count=count, use_cache=data.get('use_cache', True))
+    execution.wait()
+
+    # Add rule information, in the order of the rules
+    results = []
+    for rule in sigma_rules:
+        rule_id = rule.get('id', '')
+        if rule_id in rule_results:
+            results.append(dict(rule_results[rule_id], rule_id=rule_id, rule_title=rule.get('title', '')))
 
     # Prepare response
     response = {
@@ -750,15 +873,9 @@ def get_results(result_id):
     # In a production app, these would be stored in a database
     try:
         # Load results from saved JSON file (if exists)
-        results_dir = os.path.join(app.root_path, 'data', 'results')
-        os.makedirs(results_dir, exist_ok=True)
-
-        results_file = os.path.join(results_dir, f"{result_id}.json")
-
-        if os.path.exists(results_file):
-            with open(results_file, 'r') as f:
-                result_data = json.load(f)
+        result_data = result_store.load(result_id)
 
+        if result_data is not None:
             # Get the results list from the data
             results = result_data.get('results', [])
 
@@ -803,11 +920,7 @@ def page_not_found(e):
 def visualize_results(result_id):
     """Visualize query results"""
     # Check if result exists
-    import os
-    results_dir = os.path.join(app.root_path, 'data', 'results')
-    result_file = os.path.join(results_dir, f"{result_id}.json")
-
-    if not os.path.exists(result_file):
+    if not result_store.exists(result_id):
         flash(f'Results {result_id} not found', 'danger')
         return redirect(url_for('view_results'))
 
@@ -816,25 +929,15 @@ def visualize_results(result_id):
 @app.route('/api/visualize/pivot/<result_id>', methods=['GET', 'POST'])
 def api_visualize_pivot(result_id):
     """Generate pivot visualization for query results"""
-    # Load result data
-    import os
-    import json
+    # Load result metadata; the results themselves are read incrementally below
     from app import visualizer
 
-    results_dir = os.path.join(app.root_path, 'data', 'results')
-    result_file = os.path.join(results_dir, f"{result_id}.json")
-
-    if not os.path.exists(result_file):
+    result_data = result_store.load_metadata(result_id)
+    if result_data is None:
         return jsonify({'status': 'error', 'message': f'Results {result_id} not found'}), 404
 
     try:
-        with open(result_file, 'r') as f:
-            result_data = json.load(f)
-
-        # Get results
-        results = result_data.get('results', [])
-
-        if not results:
+        if not result_data.get('result_count'):
             return jsonify({
                 'status': 'error', 
                 'message': 'No results available for visualization'
@@ -850,23 +953,18 @@ def api_visualize_pivot(result_id):
             fields = []
             layout = 'physics'
 
-        # Generate visualization data
-        visualization = visualizer.generate_pivot_mindmap(results, fields)
-
-        # Detect all available fields
-        all_fields = set()
-        for result in results:
-            all_fields.update(result.keys())
-
-        # Remove internal fields
-        filtered_fields = [f for f in all_fields if not f.startswith('_')]
-
         # Select fields to include if none specified
         if not fields:
-            selected_fields = visualizer._detect_important_fields(results)
+            selected_fields = visualizer._detect_important_fields(result_store.iter_results(result_id))
         else:
             selected_fields = fields
 
+        # Generate visualization data
+        visualization = visualizer.generate_pivot_mindmap(result_store.iter_results(result_id), selected_fields)
+
+        # Remove internal fields
+        filtered_fields = [f for f in result_data.get('fields', []) if not f.startswith('_')]
+
         return jsonify({
             'status': 'success',
             'visualization': visualization,
@@ -981,25 +1079,15 @@ def api_visualize_ttp(result_id):
 @app.route('/api/visualize/timeline/<result_id>', methods=['GET', 'POST'])
 def api_visualize_timeline(result_id):
     """Generate timeline visualization for query results"""
-    # Load result data
-    import os
-    import json
+    # Load result metadata; the results themselves are read incrementally below
     from app import visualizer
 
-    results_dir = os.path.join(app.root_path, 'data', 'results')
-    result_file = os.path.join(results_dir, f"{result_id}.json")
-
-    if not os.path.exists(result_file):
+    result_data = result_store.load_metadata(result_id)
+    if result_data is None:
         return jsonify({'status': 'error', 'message': f'Results {result_id} not found'}), 404
 
     try:
-        with open(result_file, 'r') as f:
-            result_data = json.load(f)
-
-        # Get results
-        results = result_data.get('results', [])
-
-        if not results:
+        if not result_data.get('result_count'):
             return jsonify({
                 'status': 'error', 
                 'message': 'No results available for visualization'
@@ -1191,6 +1279,35 @@ def hunt_targets():
     else:
         return jsonify(mitre_parser.get_techniques())
 
+@app.route('/api/hunt/schedule', methods=['GET', 'POST'])
+def hunt_schedule():
+    """List scheduled hunts, or schedule the target of a hunt to run incrementally at an interval"""
+    if request.method == 'GET':
+        return jsonify(hunt_scheduler.get_scheduled_hunts())
+
+    data = request.json or {}
+    if 'hunt_id' not in data or 'interval' not in data:
+        return jsonify({'error': 'Missing hunt_id or interval'}), 400
+    filters = get_rule_filters(data['filters']) if data.get('filters') else None
+    scheduled = hunt_scheduler.schedule_hunt(data['hunt_id'], data['interval'], filters=filters,
+                                             max_iterations=data.get('max_iterations'),
+                                             earliest_time=data.get('earliest_time', '-24h'))
+    if not scheduled:
+        return jsonify({'error': 'Hunt not found, not a tactic or technique hunt, or invalid interval'}), 400
+    return jsonify({'success': True, 'hunt_id': data['hunt_id']})
+
+@app.route('/api/hunt/schedule/<hunt_id>', methods=['DELETE'])
+def unschedule_hunt(hunt_id):
+    """Stop running a scheduled hunt"""
+    if not hunt_scheduler.unschedule_hunt(hunt_id):
+        return jsonify({'error': 'Hunt not scheduled'}), 404
+    return jsonify({'success': True})
+
+@app.route('/api/hunt/engine')
+def hunt_engine_stats():
+    """Running and queued hunt searches per user"""
+    return jsonify(hunt_engine.stats())
+
 @app.route('/api/hunt/start', methods=['POST'])
 def start_hunt():
     """Start a new automated hunt"""
@@ -1206,39 +1323,27 @@ def start_hunt():
 
     target_name = target['name'] if target else target_id
 
-    # Start the hunt
-    hunt_id = hunt_manager.start_hunt(hunt_type, target_id, target_name)
+    # Optional rule attribute filters, e.g. {"product": "windows", "level": ["high", "critical"]}
+    filters = get_rule_filters(data.get('filters') or {})
+
+    # Start the hunt; an incremental hunt only searches the time since the last run of its target
+    incremental = bool(data.get('incremental', False))
+    hunt_id = hunt_manager.start_hunt(hunt_type, target_id, target_name, filters=filters, incremental=incremental)
 
     # Start background task
     import threading
+    user = get_hunt_user()
+    use_cache = data.get('use_cache', True)
     @copy_current_request_context
     def run_hunt():
-        # Get relevant Sigma rules
-        if hunt_type == 'tactic':
-            techniques = mitre_parser.get_techniques(target_id)
-            rules = []
-            for technique in techniques:
-                rules.extend(sigma_loader.get_rules_by_technique(technique['id']))
-        else:
-            rules = sigma_loader.get_rules_by_technique(target_id)
-
-        total_rules = len(rules)
-        for i, rule in enumerate(rules, 1):
-            # Convert rule to Splunk query
-            query = sigma_loader.convert_rule_to_splunk(rule['id'])
-            if not query:
-                continue
-
-            # Execute query
-            result = splunk_query.execute_query(query)
-
-            # Update hunt progress
-            hunt_manager.update_hunt_progress(hunt_id, {
-                'query_id': rule['id'],
-                'query': query,
-                'matches': result.get('results', []),
-                'progress': (i / total_rules) * 100
-            })
+        # Get relevant Sigma rules and convert them in one batch
+        from core.hunt_scheduler import build_hunt_searches
+        searches = build_hunt_searches(sigma_loader, mitre_parser, hunt_type, target_id, filters)
+        searches = hunt_manager.plan_incremental_searches(hunt_id, searches)
+
+        # Run the searches concurrently, fusing rules over the same data; results stream
+        # into the hunt progress as each finishes
+        hunt_engine.run_hunt(hunt_id, searches, user=user, use_cache=use_cache)
 
     thread = threading.Thread(target=run_hunt)
     thread.start()
@@ -0,0 +1,845 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the part of the Splunk management API the app uses, for offline
+benchmarking and tests.
+
+It implements login, server info, search/jobs create (normal, blocking and oneshot),
+status, results, summary and control, and the export endpoint, in the XML and JSON
+formats splunklib and the asyncio executor expect. Searches run against events
+loaded from recorded NDJSON files (one event per line), or from saved query results
+(JSON with a "results" list); events without an index take it from the file name.
+
+The search language is a subset: boolean search expressions (field=value with
+wildcards, field IN (...), bare terms, AND/OR/NOT, parentheses) followed by head,
+table, fields, stats count by, sort, rename, fieldsummary, tstats count and the
+eval ... searchmatch() tags of fused hunt searches. Other commands pass events
+through unchanged. Relative time ranges (-24h, now) are ignored, so recorded data of
+any age matches; absolute bounds in epoch seconds, as incremental hunts use, apply to
+events with a _time (epoch seconds or ISO 8601).
+
+Usage:
+    python splunk_standin.py --dataset events.ndjson --port 8089 --latency 0.005 --job-duration 0.5
+    SPLUNK_HOST=127.0.0.1 SPLUNK_PORT=8089 SPLUNK_SCHEME=http python main.py
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+_JOBS_PATH = re.compile(r'^/services(?:NS/[^/]+/[^/]+)?/search/(?:v2/)?jobs(?:/(?P<sid>[^/]+))?(?:/(?P<action>[\w.]+))?/?$')
+_TOKEN = re.compile(r'\s*(?:(?P<string>"(?:\\.|[^"\\])*")|(?P<paren>[(),])|(?P<op>!=|<=|>=|=|<|>)|(?P<word>[^\s()=!<>,"]+))')
+# Namespace of every job; splunklib addresses a job's endpoints through it
+_ACL = {'owner': 'nobody', 'app': 'search', 'sharing': 'global'}
+
+
+# ---------------------------------------------------------------------------
+# Search language subset
+# ---------------------------------------------------------------------------
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+@functools.lru_cache(maxsize=4096)
+def _pattern(value: str) -> re.Pattern:
+    """Case-insensitive matcher of a search value, where * matches anything"""
+    return re.compile('.*'.join(re.escape(part) for part in value.split('*')), re.IGNORECASE | re.DOTALL)
+
+
+def _values(event: Dict[str, Any], field: str) -> List[str]:
+    value = event.get(field)
+    if value is None:
+        return []
+    return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+
+
+def _compare(actual: str, op: str, expected: str) -> bool:
+    if op in ('=', '!='):
+        matched = _pattern(expected).fullmatch(actual) is not None
+        return matched if op == '=' else not matched
+    try:
+        left, right = float(actual), float(expected)
+    except ValueError:
+        left, right = actual, expected
+    return {'<': left < right, '>': left > right, '<=': left <= right, '>=': left >= right}[op]
+
+
+class _Parser:
+    """Recursive descent parser of search expressions into event predicates"""
+
+    def __init__(self, text: str):
+        self.tokens = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if not match or match.end() == position:
+                raise ValueError(f"Cannot parse search near: {text[position:position + 30]}")
+            kind = match.lastgroup
+            self.tokens.append((kind, match.group(kind)))
+            position = match.end()
+            while position < len(text) and text[position].isspace():
+                position += 1
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self) -> Tuple[Optional[str], Optional[str]]:
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self) -> Callable[[Dict[str, Any]], bool]:
+        if not self.tokens:
+            return lambda event: True
+        predicate = self.or_expression()
+        if self.position < len(self.tokens):
+            raise ValueError(f"Unexpected {self.peek()[1]} in search")
+        return predicate
+
+    def or_expression(self):
+        terms = [self.and_expression()]
+        while self.peek() == ('word', 'OR'):
+            self.take()
+            terms.append(self.and_expression())
+        return terms[0] if len(terms) == 1 else (lambda event: any(term(event) for term in terms))
+
+    def and_expression(self):
+        terms = [self.not_expression()]
+        while True:
+            kind, value = self.peek()
+            if kind is None or value in (')', 'OR'):
+                break
+            if (kind, value) == ('word', 'AND'):
+                self.take()
+            terms.append(self.not_expression())
+        return terms[0] if len(terms) == 1 else (lambda event: all(term(event) for term in terms))
+
+    def not_expression(self):
+        if self.peek() == ('word', 'NOT'):
+            self.take()
+            term = self.not_expression()
+            return lambda event: not term(event)
+        return self.atom()
+
+    def atom(self):
+        kind, value = self.take()
+        if (kind, value) == ('paren', '('):
+            expression = self.or_expression()
+            if self.take() != ('paren', ')'):
+                raise ValueError("Unbalanced parentheses in search")
+            return expression
+        if kind == 'word' and self.peek()[0] == 'op':
+            _, op = self.take()
+            _, expected = self.take()
+            field, expected = value, _unquote(expected or '')
+            if expected == '*' and op == '=':
+                return lambda event: bool(_values(event, field))
+            return lambda event: any(_compare(actual, op, expected) for actual in _values(event, field))
+        if kind == 'word' and self.peek() == ('word', 'IN'):
+            self.take()
+            if self.take() != ('paren', '('):
+                raise ValueError("Expected ( after IN")
+            options = []
+            while self.peek() != ('paren', ')'):
+                option_kind, option = self.take()
+                if option_kind is None:
+                    raise ValueError("Unterminated IN list")
+                if option_kind != 'paren':
+                    options.append(_unquote(option))
+            self.take()
+            field = value
+            return lambda event: any(_compare(actual, '=', option)
+                                     for actual in _values(event, field) for option in options)
+        if kind in ('word', 'string'):
+            term = f"*{_unquote(value)}*"
+            return lambda event: _compare(str(event.get('_raw', '')), '=', term)
+        raise ValueError(f"Unexpected {value} in search")
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_search(text: str) -> Callable[[Dict[str, Any]], bool]:
+    """Compile a search expression into a predicate on events"""
+    return _Parser(text).parse()
+
+
+def _split_pipeline(query: str) -> List[str]:
+    """Split a query into its commands at pipes outside quoted strings"""
+    commands, current, quoted, escaped = [], [], False, False
+    for char in query:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == '|' and not quoted:
+            commands.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    commands.append(''.join(current).strip())
+    return commands
+
+
+def _field_list(text: str) -> List[str]:
+    return [_unquote(field) for field in re.findall(r'"[^"]+"|[^\s,"]+', text)]
+
+
+def _stats_count(events: Iterable[Dict[str, Any]], by_fields: List[str], alias: str = 'count') -> List[Dict[str, Any]]:
+    counts: Counter = Counter()
+    for event in events:
+        groups = [_values(event, field) for field in by_fields]
+        if not all(groups):
+            continue
+        for key in _product(groups):
+            counts[key] += 1
+    if not by_fields:
+        return [{alias: str(sum(1 for _ in events) if not isinstance(events, list) else len(events))}]
+    return [dict(zip(by_fields, key), **{alias: str(count)}) for key, count in sorted(counts.items())]
+
+
+def _product(groups: List[List[str]]) -> Iterable[Tuple[str, ...]]:
+    if not groups:
+        yield ()
+        return
+    for value in groups[0]:
+        for rest in _product(groups[1:]):
+            yield (value,) + rest
+
+
+def _fieldsummary(events: List[Dict[str, Any]], maxvals: int) -> List[Dict[str, Any]]:
+    fields: Dict[str, Counter] = {}
+    counts: Counter = Counter()
+    for event in events:
+        for name in event:
+            counts[name] += 1
+            fields.setdefault(name, Counter()).update(_values(event, name))
+    rows = []
+    for name in sorted(fields):
+        values = fields[name]
+        rows.append({
+            'field': name,
+            'count': str(counts[name]),
+            'distinct_count': str(len(values)),
+            'is_exact': '1',
+            'values': json.dumps([{'value': value, 'count': count} for value, count in values.most_common(maxvals)]),
+        })
+    return rows
+
+
+_EVAL_TAG = re.compile(r'if\(searchmatch\(("(?:\\.|[^"\\])*")\),\s*("(?:\\.|[^"\\])*"),\s*null\(\)\)')
+
+
+def run_search(query: str, events: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Run a query against events.
+
+    Args:
+        query: SPL query in the supported subset
+        events: Events to search
+
+    Returns:
+        Tuple of the results, the number of events scanned and the number of events matched
+    """
+    commands = _split_pipeline(query.strip())
+    first = commands.pop(0)
+    if first.lower().startswith('search '):
+        first = first[7:]
+
+    if not first and commands and commands[0].lower().startswith('tstats'):
+        return _run_tstats(commands.pop(0), events, commands)
+
+    predicate = compile_search(first)
+    results = [event for event in events if predicate(event)]
+    matched = len(results)
+    head = re.match(r'head\s+(?:limit=)?(\d+)\s*$', commands[0], re.IGNORECASE) if commands else None
+    if head:
+        # Splunk stops reading events once head has what it needs
+        matched = min(matched, int(head.group(1)))
+    return _run_commands(commands, results), len(events), matched
+
+
+def _run_tstats(command: str, events: List[Dict[str, Any]], rest: List[str]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """tstats reads indexed fields or acceleration summaries, not events, so it scans nothing"""
+    match = re.match(r'tstats\s+(?:summariesonly=\S+\s+)?count(?:\(\))?(?:\s+as\s+(\w+))?'
+                     r'(?:\s+from\s+datamodel=(\S+))?(?:\s+where\s+(.*?))?(?:\s+by\s+(.+))?$', command, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Unsupported tstats command: {command}")
+    alias, datamodel, where, by = match.groups()
+    dataset = datamodel.rpartition('.')[2] + '.' if datamodel else ''
+
+    def strip_dataset(text: str) -> str:
+        return text.replace(dataset, '') if dataset else text
+
+    predicate = compile_search(strip_dataset(where or ''))
+    matched = [event for event in events if predicate(event)]
+    by_fields = _field_list(by or '')
+    results = _stats_count(matched, [strip_dataset(field) for field in by_fields], alias or 'count')
+    if dataset:
+        results = [{(dataset + key if key in [strip_dataset(f) for f in by_fields] else key): value
+                    for key, value in row.items()} for row in results]
+    return _run_commands(rest, results), 0, len(matched)
+
+
+def _run_commands(commands: List[str], results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for command in commands:
+        name, _, args = command.partition(' ')
+        name = name.lower()
+        args = args.strip()
+        if name == 'search':
+            predicate = compile_search(args)
+            results = [result for result in results if predicate(result)]
+        elif name == 'head':
+            limit = re.search(r'\d+', args)
+            results = results[:int(limit.group(0)) if limit else 10]
+        elif name in ('table', 'fields') and not args.startswith('-'):
+            fields = _field_list(args.lstrip('+ '))
+            results = [{field: result[field] for field in fields if field in result} for result in results]
+        elif name == 'stats':
+            match = re.match(r'count(?:\(\))?(?:\s+as\s+(\w+))?(?:\s+by\s+(.+))?$', args, re.IGNORECASE)
+            if match:
+                results = _stats_count(results, _field_list(match.group(2) or ''), match.group(1) or 'count')
+        elif name == 'sort':
+            for key in reversed(_field_list(re.sub(r'^\d+\s+', '', args))):
+                descending = key.startswith('-')
+                field = key.lstrip('+-')
+                results.sort(key=lambda result: _sort_key(result.get(field)), reverse=descending)
+        elif name == 'rename':
+            for old, new in re.findall(r'(\S+?)\s+AS\s+(\S+?)(?:,|\s|$)', args, re.IGNORECASE):
+                results = [{(new if key == old else key): value for key, value in result.items()} for result in results]
+        elif name == 'fieldsummary':
+            maxvals = re.search(r'maxvals=(\d+)', args)
+            results = _fieldsummary(results, int(maxvals.group(1)) if maxvals else 100)
+        elif name == 'eval' and 'searchmatch(' in args:
+            field = args.partition('=')[0].strip()
+            tags = [(compile_search(_unquote(search)), _unquote(tag)) for search, tag in _EVAL_TAG.findall(args)]
+            tagged = []
+            for result in results:
+                matched = [tag for predicate, tag in tags if predicate(result)]
+                if matched:
+                    result = dict(result, **{field: matched if len(matched) > 1 else matched[0]})
+                tagged.append(result)
+            results = tagged
+    return results
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    try:
+        return (0, float(value))
+    except (TypeError, ValueError):
+        return (1, str(value or ''))
+
+
+def _epoch(value: Any) -> Optional[float]:
+    """An absolute time in epoch seconds, or None for relative times such as -24h and now"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _event_time(event: Dict[str, Any]) -> Optional[float]:
+    value = event.get('_time')
+    seconds = _epoch(value)
+    if seconds is None and isinstance(value, str):
+        try:
+            seconds = datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return seconds
+
+
+def in_time_range(events: List[Dict[str, Any]], earliest: Optional[float],
+                  latest: Optional[float]) -> List[Dict[str, Any]]:
+    """Events with a _time in [earliest, latest); events without one are always in range"""
+    if earliest is None and latest is None:
+        return events
+    selected = []
+    for event in events:
+        seconds = _event_time(event)
+        if seconds is None or ((earliest is None or seconds >= earliest)
+                               and (latest is None or seconds < latest)):
+            selected.append(event)
+    return selected
+
+
+def load_dataset(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Load events from NDJSON files, saved query results or directories of either.
+
+    Args:
+        paths: Files or directories
+
+    Returns:
+        Events, each with at least _raw and index
+    """
+    events = []
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.endswith(('.ndjson', '.jsonl', '.json')))
+        else:
+            files.append(path)
+
+    for path in files:
+        index = os.path.splitext(os.path.basename(path))[0]
+        with open(path) as f:
+            if path.endswith('.json'):
+                loaded = json.load(f)
+                loaded = loaded.get('results', []) if isinstance(loaded, dict) else loaded
+            else:
+                loaded = (json.loads(line) for line in f if line.strip())
+            for event in loaded:
+                event.setdefault('index', index)
+                event.setdefault('_raw', " ".join(f"{key}={value}" for key, value in event.items()
+                                                   if not key.startswith('_')))
+                events.append(event)
+    return events
+
+
+# ---------------------------------------------------------------------------
+# Jobs and the REST API
+# ---------------------------------------------------------------------------
+
+class StandinJob:
+    """A search job whose results are computed at dispatch and released after its duration"""
+
+    def __init__(self, sid: str, query: str, results: List[Dict[str, Any]], scanned: int,
+                 matched: int, duration: float):
+        self.sid = sid
+        self.query = query
+        self.results = results
+        self.scan_count = scanned
+        self.event_count = matched
+        self.duration = duration
+        self.created = time.time()
+        self.started: Optional[float] = None
+
+    def progress(self, now: float) -> float:
+        if self.started is None:
+            return 0.0
+        if self.duration <= 0:
+            return 1.0
+        return min(1.0, (now - self.started) / self.duration)
+
+    def content(self, now: float) -> Dict[str, Any]:
+        """Job properties as Splunk's JSON output types them; the XML output writes booleans as 1/0"""
+        progress = self.progress(now)
+        done = progress >= 1.0
+        return {
+            'sid': self.sid,
+            'search': self.query,
+            'dispatchState': 'QUEUED' if self.started is None else ('DONE' if done else 'RUNNING'),
+            'isDone': done,
+            'isFailed': False,
+            'doneProgress': round(progress, 4),
+            'resultCount': len(self.results) if done else 0,
+            'scanCount': self.scan_count if done else int(self.scan_count * progress),
+            'eventCount': self.event_count if done else 0,
+            'runDuration': round(now - self.started, 3) if self.started else 0,
+        }
+
+
+class SplunkStandin:
+    """State of the stand-in: the events, the sessions and the search jobs"""
+
+    def __init__(self, events: List[Dict[str, Any]], latency: float = 0.0, job_duration: float = 0.5,
+                 scan_rate: float = 0.0, max_running_jobs: int = 0, version: str = "9.1.0"):
+        """
+        Initialize the stand-in.
+
+        Args:
+            events: Events searches run against
+            latency: Seconds added to every request
+            job_duration: Seconds a normal search job runs before it is done
+            scan_rate: Events scanned per second, adding scan_count / scan_rate to each
+                job's duration (0 disables it)
+            max_running_jobs: Jobs running at once; more are QUEUED like on a busy search
+                head (0 for no limit)
+            version: Splunk version reported by server/info (9.0.2 and later use search/v2)
+        """
+        self.events = events
+        self.latency = latency
+        self.job_duration = job_duration
+        self.scan_rate = scan_rate
+        self.max_running_jobs = max_running_jobs
+        self.version = version
+        self.sessions = set()
+        self.jobs: Dict[str, StandinJob] = {}
+        self.queue: Deque[StandinJob] = deque()
+        self.lock = threading.Lock()
+        self.requests = Counter()  # endpoint -> requests served
+        self.events_scanned = 0
+        self._searches: Dict[str, Tuple[List[Dict[str, Any]], int, int]] = {}
+
+    def search(self, query: str, earliest_time: Optional[str] = None,
+               latest_time: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int, int]:
+        """
+        Run a query over a time range, reusing the outcome of an earlier identical search.
+
+        Events only change through add_events, so each distinct search is only evaluated
+        once; how long Splunk would take is modelled by the job duration.
+        """
+        key = (query, _epoch(earliest_time), _epoch(latest_time))
+        outcome = self._searches.get(key)
+        if outcome is None:
+            outcome = run_search(query, in_time_range(self.events, key[1], key[2]))
+            with self.lock:
+                self._searches[key] = outcome
+        return outcome
+
+    def add_events(self, events: List[Dict[str, Any]]):
+        """Add newly arrived events, e.g. to exercise incremental hunts between runs"""
+        with self.lock:
+            self.events = self.events + list(events)
+            self._searches.clear()
+
+    def dispatch(self, query: str, earliest_time: Optional[str] = None,
+                 latest_time: Optional[str] = None) -> StandinJob:
+        results, scanned, matched = self.search(query, earliest_time, latest_time)
+        duration = self.job_duration + (scanned / self.scan_rate if self.scan_rate else 0.0)
+        job = StandinJob(uuid.uuid4().hex, query, results, scanned, matched, duration)
+        with self.lock:
+            self.events_scanned += scanned
+            self.jobs[job.sid] = job
+            self.queue.append(job)
+            self._advance(time.time())
+        return job
+
+    def status(self, sid: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self.lock:
+            self._advance(now)
+            job = self.jobs.get(sid)
+            return job.content(now) if job else None
+
+    def cancel(self, sid: str) -> bool:
+        with self.lock:
+            job = self.jobs.pop(sid, None)
+            if job in self.queue:
+                self.queue.remove(job)
+            return job is not None
+
+    def _advance(self, now: float):
+        """Start queued jobs while there are free slots; the caller holds the lock"""
+        running = sum(1 for job in self.jobs.values()
+                      if job.started is not None and job.progress(now) < 1.0)
+        while self.queue and (not self.max_running_jobs or running < self.max_running_jobs):
+            self.queue.popleft().started = now
+            running += 1
+
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "SplunkStandin/1.0"
+    # Headers and body go out in separate writes; with Nagle's algorithm the body of a
+    # kept-alive response would wait for the client's delayed ACK of the headers
+    disable_nagle_algorithm = True
+
+    @property
+    def standin(self) -> SplunkStandin:
+        return self.server.standin
+
+    def log_message(self, format, *args):
+        pass
+
+    def end_headers(self):
+        # splunklib closes the connection before reading the body unless it is kept alive
+        self.send_header('Connection', 'Keep-Alive')
+        super().end_headers()
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method: str):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = self.rfile.read(length).decode('utf-8')
+            params.update({key: values[-1] for key, values in parse_qs(body, keep_blank_values=True).items()})
+        json_output = params.get('output_mode') == 'json'
+
+        self.standin.requests[_endpoint(method, url.path)] += 1
+        if self.standin.latency:
+            time.sleep(self.standin.latency)
+
+        try:
+            if url.path == '/services/auth/login':
+                return self._login(params, json_output)
+            if not self._authorized():
+                return self._error(401, "call not properly authenticated", json_output)
+            if url.path.endswith('/server/info'):
+                return self._server_info(json_output)
+            match = _JOBS_PATH.match(url.path)
+            if not match:
+                return self._error(404, f"Unknown endpoint {url.path}", json_output)
+            sid, action = match.group('sid'), match.group('action')
+            if sid is None and method == 'POST':
+                return self._create_job(params, json_output)
+            if sid == 'export':
+                return self._export(params)
+            if sid is None:
+                return self._error(400, "Listing jobs is not supported", json_output)
+            if action is None:
+                if method == 'DELETE':
+                    self.standin.cancel(sid)
+                    return self._send(200, {}, json_output)
+                return self._job_status(sid, json_output)
+            if action in ('results', 'results_preview', 'events'):
+                return self._results(sid, params)
+            if action == 'summary':
+                return self._summary(sid)
+            if action == 'control':
+                if not self.standin.cancel(sid) and params.get('action') == 'cancel':
+                    return self._error(404, f"Unknown sid {sid}", json_output)
+                return self._send(200, {'messages': [{'type': 'INFO', 'text': 'Search job cancelled.'}]}, True)
+            return self._error(404, f"Unknown job endpoint {action}", json_output)
+        except ValueError as e:
+            return self._error(400, str(e), json_output)
+
+    def _authorized(self) -> bool:
+        header = self.headers.get('Authorization', '')
+        return header.startswith('Splunk ') and header[7:] in self.standin.sessions
+
+    def _login(self, params: Dict[str, str], json_output: bool):
+        session_key = uuid.uuid4().hex
+        self.standin.sessions.add(session_key)
+        if json_output:
+            return self._send(200, {'sessionKey': session_key}, True)
+        return self._send_xml(200, f"<response>\n  <sessionKey>{session_key}</sessionKey>\n</response>")
+
+    def _server_info(self, json_output: bool):
+        content = {'version': self.standin.version, 'serverName': 'splunk-standin'}
+        if json_output:
+            return self._send(200, {'entry': [{'name': 'server-info', 'content': content}]}, True)
+        return self._send_xml(200, _atom_feed('server-info', content))
+
+    def _create_job(self, params: Dict[str, str], json_output: bool):
+        query = params.get('search', '')
+        exec_mode = params.get('exec_mode', 'normal')
+        job = self.standin.dispatch(query, params.get('earliest_time'), params.get('latest_time'))
+        if exec_mode in ('oneshot', 'blocking'):
+            # The request stays open while the search runs, for its job duration and queueing
+            while True:
+                status = self.standin.status(job.sid)
+                if status is None or status['isDone']:
+                    break
+                time.sleep(0.01)
+        if exec_mode == 'oneshot':
+            self.standin.cancel(job.sid)
+            count = int(params.get('count') or 100)
+            return self._send(200, _results_payload(job.results[:count] if count else job.results, 0), True)
+        if json_output:
+            return self._send(201, {'sid': job.sid}, True)
+        return self._send_xml(201, f"<response>\n  <sid>{job.sid}</sid>\n</response>")
+
+    def _job_status(self, sid: str, json_output: bool):
+        content = self.standin.status(sid)
+        if content is None:
+            return self._error(404, f"Unknown sid {sid}", json_output)
+        if json_output:
+            return self._send(200, {'entry': [{'name': sid, 'content': content}]}, True)
+        return self._send_xml(200, _atom_entry(sid, content))
+
+    def _job(self, sid: str) -> Optional[StandinJob]:
+        with self.standin.lock:
+            return self.standin.jobs.get(sid)
+
+    def _results(self, sid: str, params: Dict[str, str]):
+        job = self._job(sid)
+        if job is None:
+            return self._error(404, f"Unknown sid {sid}", True)
+        status = self.standin.status(sid)
+        results = job.results if status and status['isDone'] else []
+        offset = int(params.get('offset') or 0)
+        count = int(params.get('count') or 100)
+        page = results[offset:offset + count] if count else results[offset:]
+        return self._send(200, _results_payload(page, offset), True)
+
+    def _summary(self, sid: str):
+        job = self._job(sid)
+        if job is None:
+            return self._error(404, f"Unknown sid {sid}", True)
+        fields = {}
+        for row in _fieldsummary(job.results, 10):
+            fields[row['field']] = {
+                'count': int(row['count']),
+                'distinct_count': int(row['distinct_count']),
+                'is_exact': True,
+                'modes': json.loads(row['values']),
+            }
+        return self._send(200, {'fields': fields}, True)
+
+    def _export(self, params: Dict[str, str]):
+        results, _, _ = self.standin.search(params.get('search', ''), params.get('earliest_time'),
+                                            params.get('latest_time'))
+        count = int(params.get('count') or 0)
+        if count:
+            results = results[:count]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for start in range(0, len(results), 1000):
+            lines = "".join(json.dumps({'preview': False, 'offset': start + i, 'result': result}) + "\n"
+                            for i, result in enumerate(results[start:start + 1000]))
+            self._write_chunk(lines.encode('utf-8'))
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+
+    def _error(self, status: int, message: str, json_output: bool):
+        if json_output:
+            return self._send(status, {'messages': [{'type': 'ERROR', 'text': message}]}, True)
+        return self._send_xml(status, f'<response>\n  <messages>\n    <msg type="ERROR">{escape(message)}</msg>\n'
+                                      f'  </messages>\n</response>')
+
+    def _send(self, status: int, payload: Dict[str, Any], json_output: bool):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json' if json_output else 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_xml(self, status: int, body: str):
+        data = ("<?xml version='1.0' encoding='UTF-8'?>\n" + body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _endpoint(method: str, path: str) -> str:
+    """Name of the endpoint a request is for, for the request counts"""
+    match = _JOBS_PATH.match(path)
+    if not match:
+        return path.rstrip('/').rsplit('/', 1)[-1]
+    sid, action = match.group('sid'), match.group('action')
+    if sid is None:
+        return 'create' if method == 'POST' else 'list'
+    return 'export' if sid == 'export' else action or ('cancel' if method == 'DELETE' else 'status')
+
+
+def _results_payload(results: List[Dict[str, Any]], offset: int) -> Dict[str, Any]:
+    fields = []
+    for result in results:
+        for name in result:
+            if name not in fields:
+                fields.append(name)
+    return {'preview': False, 'init_offset': offset, 'messages': [],
+            'fields': [{'name': name} for name in fields], 'results': results}
+
+
+def _atom_dict(content: Dict[str, Any]) -> str:
+    keys = "".join(f'<s:key name="{escape(str(key))}">'
+                   f'{_atom_dict(value) if isinstance(value, dict) else escape(_atom_value(value))}</s:key>'
+                   for key, value in content.items())
+    return f'<s:dict>{keys}</s:dict>'
+
+
+def _atom_value(value: Any) -> str:
+    return ('1' if value else '0') if isinstance(value, bool) else str(value)
+
+
+def _atom_entry(name: str, content: Dict[str, Any]) -> str:
+    return (f'<entry xmlns="http://www.w3.org/2005/Atom" xmlns:s="http://dev.splunk.com/ns/rest">'
+            f'<title>{escape(name)}</title><id>{escape(name)}</id>'
+            f'<link href="/services/search/jobs/{escape(name)}" rel="alternate"/>'
+            f'<content type="text/xml">{_atom_dict(dict(content, **{"eai:acl": _ACL}))}</content></entry>')
+
+
+def _atom_feed(name: str, content: Dict[str, Any]) -> str:
+    return (f'<feed xmlns="http://www.w3.org/2005/Atom" xmlns:s="http://dev.splunk.com/ns/rest">'
+            f'<title>{escape(name)}</title><entry><title>{escape(name)}</title><id>{escape(name)}</id>'
+            f'<content type="text/xml">{_atom_dict(content)}</content></entry></feed>')
+
+
+class StandinServer(ThreadingHTTPServer):
+    """HTTP server of a stand-in, one thread per connection"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], standin: SplunkStandin):
+        super().__init__(address, StandinRequestHandler)
+        self.standin = standin
+
+    def handle_error(self, request, client_address):
+        # Clients giving up on a request (e.g. a timed out search) are not server errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_standin(standin: SplunkStandin, host: str = "127.0.0.1", port: int = 0) -> StandinServer:
+    """
+    Serve a stand-in from a background thread.
+
+    Args:
+        standin: Stand-in state
+        host: Interface to listen on
+        port: Port to listen on (0 picks a free one; see server.server_address)
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    server = StandinServer((host, port), standin)
+    threading.Thread(target=server.serve_forever, name="splunk-standin", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Splunk management API")
+    parser.add_argument("--dataset", action="append", required=True,
+                        help="NDJSON events, saved query results or a directory of them (repeatable)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--job-duration", type=float, default=0.5, help="Seconds a search job runs")
+    parser.add_argument("--scan-rate", type=float, default=0.0,
+                        help="Events scanned per second, lengthening jobs that scan more (0 disables)")
+    parser.add_argument("--max-running-jobs", type=int, default=0,
+                        help="Jobs running at once before new ones are queued (0 for no limit)")
+    parser.add_argument("--version", default="9.1.0", help="Splunk version to report")
+    args = parser.parse_args()
+
+    events = load_dataset(args.dataset)
+    standin = SplunkStandin(events, latency=args.latency, job_duration=args.job_duration,
+                            scan_rate=args.scan_rate, max_running_jobs=args.max_running_jobs,
+                            version=args.version)
+    server = StandinServer((args.host, args.port), standin)
+    print(f"Serving {len(events)} events on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
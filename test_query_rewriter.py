@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Simple test script for the tstats query rewriter.
+"""
+
+from core.query_rewriter import QueryRewriter
+
+DATAMODEL_FIELDS = {
+    "process_name": "Endpoint.Processes.process_name",
+    "dest": "Endpoint.Processes.dest",
+    "user": "Authentication.Authentication.user",
+}
+
+class FakeSplunk:
+    """Answers tstats and raw searches with fixed group counts"""
+
+    def __init__(self, tstats_counts, raw_counts, tstats_status="success"):
+        self.tstats_counts = tstats_counts
+        self.raw_counts = raw_counts
+        self.tstats_status = tstats_status
+        self.queries = []
+
+    def execute_query(self, query, **kwargs):
+        self.queries.append(query)
+        if query.startswith("| tstats"):
+            counts, status, execution_time = self.tstats_counts, self.tstats_status, 0.5
+        else:
+            counts, status, execution_time = self.raw_counts, "success", 4.0
+        return {"status": status, "error": None if status == "success" else "tstats failed", "query": query,
+                "results": [{"host": host, "count": str(count)} for host, count in counts.items()],
+                "execution_time": execution_time}
+
+def main():
+    rewriter = QueryRewriter(indexed_fields=[], datamodel_fields=DATAMODEL_FIELDS, verify=False)
+
+    # Indexed fields are counted from the index
+    rewritten, kind = rewriter.rewrite("search index=main sourcetype=syslog | stats count by host | sort -count")
+    print(f"Indexed: {rewritten}")
+    assert kind == 'indexed'
+    assert rewritten == "| tstats count where index=main sourcetype=syslog by host | sort -count"
+
+    # Fields of one accelerated data model are counted from its summaries
+    rewritten, kind = rewriter.rewrite("index=edr process_name=cmd.exe | stats count by dest")
+    print(f"Data model: {rewritten}")
+    assert kind == 'datamodel'
+    assert rewritten == ("| tstats summariesonly=true count from datamodel=Endpoint.Processes "
+                         "where index=edr Processes.process_name=cmd.exe by Processes.dest "
+                         "| rename Processes.dest AS dest")
+
+    # Anything else runs as written
+    print("\nRejected:")
+    for query in ("index=main | stats count by process_name, user",
+                  "index=main | stats count by EventCode",
+                  "index=main EventCode=4688 | stats count by host",
+                  "index=main | stats dc(user) by host",
+                  "index=main | eval x=1 | stats count by host",
+                  'index=main "failed password" | stats count by host'):
+        rewritten, reason = rewriter.rewrite(query)
+        print(f"  {query} -> {reason}")
+        assert rewritten is None
+
+    # A tstats search that fails falls back to the raw search, and the query is not rewritten again
+    query = "index=main | stats count by host"
+    splunk = FakeSplunk({"web01": 3}, {"web01": 3}, tstats_status="error")
+    result = rewriter.execute(splunk, query)
+    assert 'rewrite' not in result and rewriter.report()[0]['status'] == 'rejected'
+    rewriter.execute(splunk, query)
+    assert [q.startswith("| tstats") for q in splunk.queries] == [True, False, False]
+
+    # Verifying compares the counts per group and measures the speedup
+    rewriter = QueryRewriter(indexed_fields=[], verify=True)
+    result = rewriter.execute(FakeSplunk({"web01": 3, "web02": 1}, {"web02": 1, "web01": 3}), query)
+    entry = rewriter.report()[0]
+    print(f"\nVerified: {entry['status']}, {entry['speedup']}x faster")
+    assert entry['status'] == 'accelerated' and entry['speedup'] == 8.0 and result['rewrite']['speedup'] == 8.0
+
+    rewriter = QueryRewriter(indexed_fields=[], verify=True)
+    result = rewriter.execute(FakeSplunk({"web01": 3}, {"web01": 4}), query)
+    entry = rewriter.report()[0]
+    print(f"Mismatch: {entry['status']} ({entry['reason']})")
+    assert entry['status'] == 'rejected' and 'rewrite' not in result
+
+    print("\nAll query rewriter checks passed")
+
+if __name__ == "__main__":
+    main()
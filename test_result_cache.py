@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Simple test script for search fingerprints and time window resolution of the result cache.
+"""
+
+import time
+
+from core.result_cache import ResultCache, resolve_time, search_fingerprint
+
+def main():
+    # Relative windows keep their meaning but are spelled one way
+    print("Relative windows:")
+    for value in ("-24h", "-1d", "-86400s", "-7d@d", "@w0", "now", None):
+        print(f"  {value!r} -> {resolve_time(value)!r}")
+    assert resolve_time("-24h") == resolve_time("-1d") == resolve_time("-86400s") == "-86400s"
+    assert resolve_time("-7d@d") == "-604800s@d"
+    assert resolve_time("-24h") != resolve_time("-24h@h")
+
+    # Absolute windows become epoch seconds, however they are written
+    print("\nAbsolute windows:")
+    epoch = int(time.mktime((2024, 1, 15, 10, 30, 0, 0, 0, -1)))
+    for value in (epoch, str(epoch), "01/15/2024:10:30:00", "2024-01-15T10:30:00"):
+        print(f"  {value!r} -> {resolve_time(value)!r}")
+        assert resolve_time(value) == epoch
+
+    # Real-time windows never repeat
+    try:
+        resolve_time("rt-5m")
+        raise AssertionError("real-time window resolved")
+    except ValueError as e:
+        print(f"\nReal-time window rejected: {e}")
+
+    # Fingerprints follow the resolved window and the normalized query
+    query = "index=main  sourcetype=WinEventLog | stats count by host"
+    relative = search_fingerprint(query, "-24h", "now", 100)
+    assert relative == search_fingerprint(f"search {query.replace('  ', ' ')}", "-1d", "now", 100)
+    assert relative != search_fingerprint(query, "-24h@h", "now", 100)
+    assert relative != search_fingerprint(query, "-24h", "now", 10)
+    absolute = search_fingerprint(query, "01/15/2024:10:30:00", "01/16/2024:10:30:00", 100)
+    assert absolute == search_fingerprint(query, "2024-01-15T10:30:00", "2024-01-16T10:30:00", 100)
+    assert absolute != relative
+    assert search_fingerprint(query, "rt-5m", "rt", 100) is None
+    print("\nFingerprints match for equivalent windows and differ otherwise")
+
+    # Relative windows keep receiving events; absolute windows in the past do not
+    cache = ResultCache(relative_ttl=60, absolute_ttl=3600, settle_time=300)
+    print(f"\nTTL relative: {cache.ttl('-24h', 'now')}s, absolute: {cache.ttl(epoch, epoch + 86400)}s, "
+          f"recent absolute: {cache.ttl(time.time() - 3600, time.time() - 60)}s, real-time: {cache.ttl('rt-5m', 'rt')}s")
+    assert cache.ttl("-24h", "now") == 60
+    assert cache.ttl(epoch, epoch + 86400) == 3600
+    assert cache.ttl(time.time() - 3600, time.time() - 60) == 60
+    assert cache.ttl("rt-5m", "rt") == 0
+
+    print("\nAll result cache checks passed")
+
+if __name__ == "__main__":
+    main()
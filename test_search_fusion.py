@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Simple test script for search fusion of hunt rules.
+"""
+
+from core.hunt_engine import HuntEngine
+from core.search_fusion import FUSION_TAG_FIELD, plan_fusion
+
+class FakeSplunk:
+    """Answers every search with the same events, each tagged with the rules it matches"""
+
+    def __init__(self, events, tags):
+        self.events = events
+        self.tags = tags
+        self.queries = []
+
+    def execute_query(self, query, max_count=1000, **kwargs):
+        self.queries.append(query)
+        results = [dict(event) for event in self.events]
+        if FUSION_TAG_FIELD not in query:
+            # A rule running unfused only gets the events it matches itself
+            results = [event for event in results if self.tags[query] in event.pop(FUSION_TAG_FIELD)]
+        results = results[:max_count]
+        return {"status": "success", "query": query, "results": results, "result_count": len(results),
+                "total_result_count": len(results), "scan_count": len(self.events)}
+
+def main():
+    searches = [
+        {'query_id': 'a', 'query': 'search index=win EventCode=4688 Image="*\\\\cmd.exe" | table Image'},
+        {'query_id': 'b', 'query': 'index=win EventCode=4688 CommandLine="*whoami*"'},
+        {'query_id': 'c', 'query': 'index=win EventCode=4688 CommandLine="*a|b*"'},
+        {'query_id': 'd', 'query': 'index=linux process=sshd'},
+        {'query_id': 'e', 'query': 'index=win EventCode=4688 | stats count by Image'},
+    ]
+
+    # Rules over the same data share a search; other commands and other data run alone
+    plan = plan_fusion(searches)
+    print(f"Plan: {plan.stats()}")
+    assert [[member['query_id'] for member in fused.members] for fused in plan.fused] == [['a', 'b', 'c']]
+    assert sorted(search['query_id'] for search in plan.single) == ['d', 'e']
+    fused = plan.fused[0]
+    print(f"Fused query: {fused.query}")
+    assert '| table' not in fused.query and fused.query.count(' OR ') == 2
+
+    chunks = plan_fusion(searches[:3], max_rules=2)
+    assert [len(chunk.members) for chunk in chunks.fused] == [2] and len(chunks.single) == 1
+
+    # An event matching several rules is reported for each of them
+    result = {"status": "success", "query": fused.query, "scan_count": 10, "results": [
+        {"_raw": "1", FUSION_TAG_FIELD: ["a", "b"]},
+        {"_raw": "2", FUSION_TAG_FIELD: "b"},
+        {"_raw": "3", FUSION_TAG_FIELD: ["c", "not-a-member"]},
+        {"_raw": "4"},
+    ]}
+    split = fused.split_results(result)
+    for query_id, rule_result in split.items():
+        print(f"Rule {query_id}: {[event['_raw'] for event in rule_result['results']]}")
+    assert [event['_raw'] for event in split['a']['results']] == ['1']
+    assert [event['_raw'] for event in split['b']['results']] == ['1', '2']
+    assert [event['_raw'] for event in split['c']['results']] == ['3']
+    assert all(FUSION_TAG_FIELD not in event for rule_result in split.values() for event in rule_result['results'])
+
+    # Each rule keeps at most max_count results but reports how many it matched
+    split = fused.split_results(result, max_count=1)
+    assert split['b']['result_count'] == 1 and split['b']['total_result_count'] == 2
+
+    # A fused search cut off at its limit runs its rules again unfused
+    noisy = [{"_raw": str(i), FUSION_TAG_FIELD: "a"} for i in range(10)] + [{"_raw": "x", FUSION_TAG_FIELD: "b"}]
+    splunk = FakeSplunk(noisy, {search['query']: search['query_id'] for search in searches})
+    engine = HuntEngine(splunk, max_concurrent=2, max_per_user=2)
+    results = {}
+    execution = engine.run_hunt(None, searches[:2], max_count=5,
+                                on_result=lambda search, res: results.update({search['query_id']: res}))
+    assert execution.wait(10)
+    engine.shutdown()
+    print(f"\nTruncated hunt: {len(splunk.queries)} searches, "
+          f"{ {query_id: res['result_count'] for query_id, res in results.items()} }, fusion {execution.fusion}")
+    assert len(splunk.queries) == 3 and execution.fusion['truncated'] == 1
+    assert results['a']['result_count'] == 5 and results['b']['result_count'] == 1
+
+    print("\nAll search fusion checks passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Simple test script for priority admission of the search governor.
+"""
+
+import threading
+import time
+
+from core.search_governor import (PRIORITY_BACKGROUND, PRIORITY_HUNT, PRIORITY_INTERACTIVE, SearchGovernor,
+                                  SearchRejected)
+
+def queue(governor, admitted, priority, group=None):
+    """Wait for a slot in a thread, recording the order searches are admitted in"""
+    def run():
+        governor.acquire(priority, group)
+        admitted.append(group or priority)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    time.sleep(0.05)
+    return thread
+
+def main():
+    governor = SearchGovernor(max_concurrent=3, reserved_interactive=1,
+                              queue_limits={PRIORITY_HUNT: 4, PRIORITY_BACKGROUND: 1}, queue_timeout=5)
+
+    # Hunts fill every slot but the one reserved for interactive searches
+    governor.acquire(PRIORITY_HUNT, "hunt-1")
+    governor.acquire(PRIORITY_HUNT, "hunt-1")
+    admitted = []
+    waiting = [queue(governor, admitted, PRIORITY_BACKGROUND),
+               queue(governor, admitted, PRIORITY_HUNT, "hunt-1"),
+               queue(governor, admitted, PRIORITY_HUNT, "hunt-1"),
+               queue(governor, admitted, PRIORITY_HUNT, "hunt-2")]
+    print(f"Running {governor.running}, queued {governor.stats()['queued']}")
+    assert governor.running == 2 and not admitted
+
+    # An interactive search takes the reserved slot at once
+    waited = governor.acquire(PRIORITY_INTERACTIVE)
+    print(f"Interactive search waited {waited:.3f}s")
+    assert waited < 0.05 and governor.running == 3
+
+    # A full queue turns searches away with a retry delay
+    try:
+        governor.acquire(PRIORITY_BACKGROUND)
+        raise AssertionError("background search admitted past its queue limit")
+    except SearchRejected as e:
+        print(f"Rejected: {e} (retry after {e.retry_after}s)")
+        assert e.retry_after >= 1
+
+    # Freed slots go to hunts before background searches, round-robin over hunts;
+    # the reserved slot stays free for interactive searches
+    for priority in (PRIORITY_HUNT, PRIORITY_HUNT, PRIORITY_INTERACTIVE, PRIORITY_HUNT, PRIORITY_HUNT):
+        governor.release(priority, 1.0)
+        time.sleep(0.05)
+    for thread in waiting:
+        thread.join(1)
+    print(f"Admitted in order: {admitted}")
+    assert admitted == ["hunt-1", "hunt-2", "hunt-1", PRIORITY_BACKGROUND]
+    assert governor.running == 2
+
+    # Searches waiting longer than queue_timeout are rejected
+    governor = SearchGovernor(max_concurrent=1, reserved_interactive=0, queue_timeout=0.1)
+    with governor.slot(PRIORITY_HUNT, "hunt-1"):
+        try:
+            governor.acquire(PRIORITY_HUNT, "hunt-2")
+            raise AssertionError("hunt search admitted while no slot was free")
+        except SearchRejected as e:
+            print(f"Timed out: {e}")
+    assert governor.running == 0 and governor.stats()['classes'][PRIORITY_HUNT]['timed_out'] == 1
+
+    print("\nAll search governor checks passed")
+
+if __name__ == "__main__":
+    main()